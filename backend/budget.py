@@ -0,0 +1,70 @@
+"""
+Global LLM call budget.
+
+A token bucket shared by everything that spends LLM calls *speculatively* —
+server-driven ticks and NPC openers prepared by /api/npc/prewarm — so
+background work can't eat the provider quota that player-initiated requests
+need. Player requests never wait on it.
+
+The bucket lives in the shared store (shared_store.py), so with several
+workers it is one budget for all of them rather than one per process.
+"""
+
+import os
+import time
+from typing import Optional
+
+from .log import get_logger
+from .shared_store import StoreBusy, get_store
+
+logger = get_logger("Budget")
+
+BUDGET_KEY = "budget:llm"
+
+
+class LLMBudget:
+    def __init__(self, calls_per_minute: float = None, burst: int = None, key: str = BUDGET_KEY):
+        self.calls_per_minute = calls_per_minute or float(os.getenv("LLM_BUDGET_PER_MINUTE", "30"))
+        self.burst = burst or int(os.getenv("LLM_BUDGET_BURST", "10"))
+        self.key = key
+        self.granted = 0  # this process's decisions
+        self.denied = 0
+
+    def _refilled(self, bucket: Optional[dict]) -> dict:
+        now = time.time()
+        if bucket is None:
+            return {"tokens": float(self.burst), "updated": now}
+        elapsed = max(0.0, now - bucket["updated"])
+        return {"tokens": min(self.burst, bucket["tokens"] + elapsed * self.calls_per_minute / 60.0), "updated": now}
+
+    def try_acquire(self, cost: float = 1.0) -> bool:
+        """Take `cost` calls from the bucket if available; never blocks."""
+        granted = False
+
+        def take(bucket: Optional[dict]) -> dict:
+            nonlocal granted
+            bucket = self._refilled(bucket)
+            granted = bucket["tokens"] >= cost
+            if granted:
+                bucket["tokens"] -= cost
+            return bucket
+
+        try:
+            get_store().update(self.key, take)
+        except StoreBusy as e:
+            logger.warning("LLM budget store busy, denying: %s", e)  # speculative work can wait
+        if granted:
+            self.granted += 1
+        else:
+            self.denied += 1
+        return granted
+
+    def available(self) -> float:
+        try:
+            return self._refilled(get_store().get(self.key))["tokens"]
+        except StoreBusy:
+            return 0.0
+
+
+# ── Module-level singleton ──────────────────────────────────────────────────────
+llm_budget = LLMBudget()
@@ -0,0 +1,80 @@
+"""
+Stop working on requests nobody is waiting for.
+
+`run_cancellable` runs a route's work as a task, and cancels it when either:
+  - the HTTP client disconnects (browser closed, fetch aborted), or
+  - a newer request with the same `supersede_key` arrives (a player's next
+    world tick makes the still-running previous one pointless).
+
+The cancellation propagates through the graph into the in-flight `ainvoke`
+calls, which close their HTTP requests, and into TTS downloads (see
+tts_service.agenerate_speech). Sync graph nodes already running in a worker
+thread finish, but no further node starts. Cancelled work is counted in
+npcs_cancelled_total, and LLM calls cut short show up as
+npcs_llm_calls_total{outcome="cancelled"}.
+
+Environment:
+    DISCONNECT_POLL_MS   how often to check for a disconnected client (default 250)
+"""
+
+import asyncio
+import os
+from typing import Awaitable, Optional
+
+from .log import get_logger
+from .metrics import WORK_CANCELLED
+
+logger = get_logger("Cancel")
+
+DISCONNECT_POLL = float(os.getenv("DISCONNECT_POLL_MS", "250")) / 1000.0
+
+_latest: dict[str, asyncio.Task] = {}
+
+
+class RequestCancelled(Exception):
+    """The work was cancelled; `status_code` is what the (absent) client would get."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+        self.status_code = 409 if reason == "superseded" else 499
+
+
+async def _wait_for_disconnect(http_request) -> None:
+    while not await http_request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL)
+
+
+async def run_cancellable(http_request, work: Awaitable, *, route: str, supersede_key: Optional[str] = None):
+    """Await `work`, cancelling it on client disconnect or supersession (raises RequestCancelled)."""
+    task = asyncio.ensure_future(work)
+    if supersede_key is not None:
+        previous = _latest.get(supersede_key)
+        _latest[supersede_key] = task
+        if previous is not None and not previous.done():
+            logger.info("Superseding in-flight %s for %s", route, supersede_key)
+            previous.cancel()
+
+    watcher = asyncio.ensure_future(_wait_for_disconnect(http_request))
+    try:
+        done, _ = await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        if task in done:
+            if task.cancelled():
+                WORK_CANCELLED.labels(route=route, reason="superseded").inc()
+                raise RequestCancelled("superseded")
+            return task.result()
+
+        logger.info("Client disconnected, cancelling %s", route)
+        task.cancel()
+        try:
+            await task
+        except (asyncio.CancelledError, Exception):
+            pass
+        WORK_CANCELLED.labels(route=route, reason="disconnect").inc()
+        raise RequestCancelled("disconnect")
+    finally:
+        watcher.cancel()
+        if not task.done():  # the handler itself was cancelled
+            task.cancel()
+        if supersede_key is not None and _latest.get(supersede_key) is task:
+            del _latest[supersede_key]
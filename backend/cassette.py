@@ -0,0 +1,283 @@
+"""
+Record/replay ("cassette") layer around the chat models of both pipelines.
+
+    LLM_CASSETTE=cassettes/scenarios.jsonl
+    LLM_CASSETTE_MODE=record    # call the real provider, append every exchange
+    LLM_CASSETTE_MODE=replay    # serve responses by prompt hash, never call a provider
+    LLM_CASSETTE_LATENCY=1      # in replay, sleep for the recorded latency
+
+A cassette is JSON Lines, one exchange per line: prompt hash, pipeline,
+provider, latency, response text and token usage — or the error the provider
+raised, so rate limits and retries replay too. The same prompt recorded
+several times (retries, repeated calls) is replayed in recorded order, the last
+answer repeating once they run out. A prompt missing from the cassette raises
+CassetteMiss rather than silently calling out.
+
+Summarise a cassette (calls, tokens, errors, latency) with:
+    python -m backend.cassette cassettes/scenarios.jsonl
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Optional
+
+from .log import get_logger
+
+logger = get_logger("Cassette")
+
+
+class CassetteMiss(LookupError):
+    """Replay found no recorded response for a prompt."""
+
+
+def _prompt_payload(prompt: Any) -> list:
+    """Canonical form of a str or message-list prompt: [[role, content], ...]."""
+    if isinstance(prompt, str):
+        return [["human", prompt]]
+    payload = []
+    for message in prompt:
+        role = getattr(message, "type", None) or type(message).__name__
+        payload.append([role, str(getattr(message, "content", message))])
+    return payload
+
+
+def prompt_hash(prompt: Any) -> str:
+    encoded = json.dumps(_prompt_payload(prompt), ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()[:32]
+
+
+def _usage_of(response) -> dict:
+    usage = getattr(response, "usage_metadata", None) or {}
+    return {k: usage[k] for k in ("input_tokens", "output_tokens", "total_tokens") if k in usage}
+
+
+def _replayed_error(entry: dict) -> Exception:
+    # Recreate an exception with the recorded class name so callers that
+    # classify by name (llm_client.is_rate_limit_error) behave the same.
+    error_type = type(entry["error_type"], (Exception,), {})
+    return error_type(entry["error"])
+
+
+class Cassette:
+    def __init__(self, path: str, mode: str, reproduce_latency: bool = False):
+        self.path = path
+        self.mode = mode
+        self.reproduce_latency = reproduce_latency
+        self._entries: dict[str, list[dict]] = {}
+        self._cursor: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        if mode == "replay":
+            self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"LLM cassette not found: {self.path}")
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries.setdefault(entry["key"], []).append(entry)
+        logger.info("Loaded %s | prompts=%s | exchanges=%s", self.path,
+                    len(self._entries), sum(len(v) for v in self._entries.values()))
+
+    def next_entry(self, key: str) -> dict:
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.misses += 1
+                raise CassetteMiss(f"No recorded response for prompt {key} in {self.path}")
+            index = self._cursor.get(key, 0)
+            self._cursor[key] = index + 1
+            self.hits += 1
+            return entries[min(index, len(entries) - 1)]
+
+    def append(self, entry: dict) -> None:
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self.recorded += 1
+
+
+class CassetteLLM:
+    """
+    Stands in for a LangChain chat model (invoke / ainvoke). `inner` is the
+    real model in record mode and None in replay mode.
+    """
+
+    def __init__(self, inner, cassette: Cassette, pipeline: str):
+        self.inner = inner
+        self.cassette = cassette
+        self.pipeline = pipeline
+
+    # ── Record ──
+
+    def _entry(self, key: str, prompt: Any, latency: float, response=None, error: Exception = None) -> dict:
+        from .llm_client import provider_of
+
+        entry = {
+            "key": key,
+            "pipeline": self.pipeline,
+            "provider": provider_of(self.inner) if self.inner is not None else "unknown",
+            "prompt_chars": sum(len(content) for _, content in _prompt_payload(prompt)),
+            "latency": round(latency, 4),
+        }
+        if error is not None:
+            entry["error_type"] = type(error).__name__
+            entry["error"] = str(error)
+        else:
+            entry["content"] = response.content
+            entry["usage"] = _usage_of(response)
+        return entry
+
+    def _record_sync(self, prompt):
+        key = prompt_hash(prompt)
+        start = time.perf_counter()
+        try:
+            response = self.inner.invoke(prompt)
+        except Exception as e:
+            self.cassette.append(self._entry(key, prompt, time.perf_counter() - start, error=e))
+            raise
+        self.cassette.append(self._entry(key, prompt, time.perf_counter() - start, response))
+        return response
+
+    async def _record_async(self, prompt):
+        key = prompt_hash(prompt)
+        start = time.perf_counter()
+        try:
+            response = await self.inner.ainvoke(prompt)
+        except Exception as e:
+            self.cassette.append(self._entry(key, prompt, time.perf_counter() - start, error=e))
+            raise
+        self.cassette.append(self._entry(key, prompt, time.perf_counter() - start, response))
+        return response
+
+    # ── Replay ──
+
+    @staticmethod
+    def _message(entry: dict):
+        from langchain_core.messages import AIMessage
+
+        usage = entry.get("usage") or {}
+        kwargs = {}
+        if "input_tokens" in usage:
+            kwargs["usage_metadata"] = {
+                "input_tokens": usage["input_tokens"],
+                "output_tokens": usage.get("output_tokens", 0),
+                "total_tokens": usage.get("total_tokens", usage["input_tokens"] + usage.get("output_tokens", 0)),
+            }
+        return AIMessage(content=entry["content"], **kwargs)
+
+    def _replay_sync(self, prompt):
+        entry = self.cassette.next_entry(prompt_hash(prompt))
+        if self.cassette.reproduce_latency:
+            time.sleep(entry["latency"])
+        if "error_type" in entry:
+            raise _replayed_error(entry)
+        return self._message(entry)
+
+    async def _replay_async(self, prompt):
+        entry = self.cassette.next_entry(prompt_hash(prompt))
+        if self.cassette.reproduce_latency:
+            await asyncio.sleep(entry["latency"])
+        if "error_type" in entry:
+            raise _replayed_error(entry)
+        return self._message(entry)
+
+    # ── LangChain surface used by the nodes ──
+
+    def invoke(self, prompt, *args, **kwargs):
+        if self.cassette.mode == "replay":
+            return self._replay_sync(prompt)
+        return self._record_sync(prompt)
+
+    async def ainvoke(self, prompt, *args, **kwargs):
+        if self.cassette.mode == "replay":
+            return await self._replay_async(prompt)
+        return await self._record_async(prompt)
+
+
+# ── Configuration ──
+
+_cassettes: dict[str, Cassette] = {}
+_cassettes_lock = threading.Lock()
+
+
+def cassette_mode() -> Optional[str]:
+    """"record", "replay" or None, from LLM_CASSETTE / LLM_CASSETTE_MODE."""
+    if not os.getenv("LLM_CASSETTE"):
+        return None
+    mode = os.getenv("LLM_CASSETTE_MODE", "replay").lower()
+    if mode not in ("record", "replay"):
+        raise ValueError(f"LLM_CASSETTE_MODE must be 'record' or 'replay', got '{mode}'")
+    return mode
+
+
+def get_cassette() -> Cassette:
+    """The process-wide cassette for LLM_CASSETTE (both pipelines share one file)."""
+    path = os.getenv("LLM_CASSETTE")
+    with _cassettes_lock:
+        cassette = _cassettes.get(path)
+        if cassette is None:
+            cassette = Cassette(
+                path,
+                cassette_mode(),
+                reproduce_latency=os.getenv("LLM_CASSETTE_LATENCY", "0").lower() in ("1", "true", "yes"),
+            )
+            _cassettes[path] = cassette
+        return cassette
+
+
+def with_cassette(llm, pipeline: str):
+    """Wrap `llm` for recording, or return it unchanged when no cassette is configured."""
+    mode = cassette_mode()
+    if mode is None:
+        return llm
+    logger.info("%s pipeline using LLM cassette %s | mode=%s", pipeline, os.getenv("LLM_CASSETTE"), mode)
+    return CassetteLLM(llm, get_cassette(), pipeline)
+
+
+# ── Cassette summary ──
+
+
+def summarize(path: str) -> dict:
+    summary: dict[str, dict] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            row = summary.setdefault(entry.get("pipeline", "?"), {
+                "calls": 0, "errors": 0, "rate_limited": 0, "input_tokens": 0, "output_tokens": 0, "latency_s": 0.0,
+            })
+            row["calls"] += 1
+            row["latency_s"] += entry.get("latency", 0.0)
+            if "error_type" in entry:
+                row["errors"] += 1
+                if "RateLimit" in entry["error_type"] or "429" in entry.get("error", ""):
+                    row["rate_limited"] += 1
+            usage = entry.get("usage") or {}
+            row["input_tokens"] += usage.get("input_tokens", 0)
+            row["output_tokens"] += usage.get("output_tokens", 0)
+    return summary
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("usage: python -m backend.cassette <cassette.jsonl>")
+    for pipeline, row in summarize(sys.argv[1]).items():
+        mean_latency = row["latency_s"] / row["calls"] if row["calls"] else 0.0
+        print(f"{pipeline:<8} calls={row['calls']} errors={row['errors']} rate_limited={row['rate_limited']} "
+              f"input_tokens={row['input_tokens']} output_tokens={row['output_tokens']} "
+              f"mean_latency={mean_latency:.2f}s")
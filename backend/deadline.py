@@ -0,0 +1,71 @@
+"""
+Per-request latency budgets.
+
+A route that wants a bounded answer wraps its work in `start_deadline(seconds)`.
+The Deadline travels in a ContextVar into graph worker threads, and every
+graph node checks it on entry (see metrics.timed_node). Once the budget is
+spent, the route answers from a local fallback without waiting for the graph.
+Nodes then raise DeadlineExceeded instead of starting more LLM work. The
+exception is a caller that set `keep_running` because it still wants the late
+result, such as a session that refreshes NPC memory from it.
+
+Environment:
+    NPC_LATENCY_BUDGET_MS   default budget for NPC turns; 0 = unbounded (default 0)
+"""
+
+import contextvars
+import os
+import time
+from typing import Optional
+
+NPC_LATENCY_BUDGET_MS = float(os.getenv("NPC_LATENCY_BUDGET_MS", "0"))
+
+_current: contextvars.ContextVar[Optional["Deadline"]] = contextvars.ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Raised by a graph node that starts after its request's budget is spent."""
+
+
+class Deadline:
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.expires = time.monotonic() + budget
+        self.keep_running = False
+
+    def remaining(self) -> float:
+        return self.expires - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+def budget_seconds(header_value: Optional[str], default_ms: float = NPC_LATENCY_BUDGET_MS) -> Optional[float]:
+    """Budget from an `X-Latency-Budget-Ms` style header, else the configured default; None = unbounded."""
+    ms = default_ms
+    if header_value:
+        try:
+            ms = float(header_value)
+        except ValueError:
+            pass
+    return ms / 1000.0 if ms > 0 else None
+
+
+def start_deadline(budget: Optional[float]) -> Optional[Deadline]:
+    """Attach a deadline `budget` seconds from now to the current context (None = no budget)."""
+    if budget is None:
+        return None
+    deadline = Deadline(budget)
+    _current.set(deadline)
+    return deadline
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+def check_deadline(where: str) -> None:
+    """Called on graph node entry: stop the run if nobody is waiting for its result any more."""
+    deadline = _current.get()
+    if deadline is not None and not deadline.keep_running and deadline.expired():
+        raise DeadlineExceeded(f"Latency budget of {deadline.budget * 1000:.0f} ms spent before {where}")
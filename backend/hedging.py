@@ -0,0 +1,151 @@
+"""
+Hedged LLM calls: cut tail latency caused by occasional provider stalls.
+
+Each call site (pipeline + node, e.g. npc.dialogue) keeps a window of its
+recent latencies: one sample per call, from the primary's start to the first
+usable answer, whichever backend gave it. A hedge that wins therefore still
+records how long the caller waited. Recording only the calls that complete
+would leave stalls out, and during a stall the window would fill with short
+samples and hedges would fire ever earlier. If a call has not returned after the LLM_HEDGE_PERCENTILE
+latency of that window, the same prompt is sent to a secondary backend — a
+second key, another provider, or simply another connection. Whichever answer
+arrives first is used and the other call is cancelled. Hedges are speculative
+work, so each one takes a token from the shared LLM budget (budget.py); when
+the budget is empty the call just keeps waiting on the primary.
+
+Only async calls are hedged (all graph nodes call `ainvoke_llm`): a losing
+sync call could not be cancelled, only abandoned.
+
+Environment:
+    LLM_HEDGE                 1 | 0   enable hedging (default 0)
+    LLM_HEDGE_PERCENTILE      latency percentile that triggers a hedge (default 95)
+    LLM_HEDGE_MIN_DELAY_MS    never hedge earlier than this (default 250)
+    LLM_HEDGE_MIN_SAMPLES     calls observed at a call site before it is hedged (default 20)
+    LLM_HEDGE_WINDOW          recent latencies kept per call site (default 200)
+"""
+
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+from .budget import llm_budget
+from .llm_client import call_site_var
+from .log import get_logger
+from .metrics import LLM_HEDGES
+
+logger = get_logger("Hedge")
+
+HEDGE_ENABLED = os.getenv("LLM_HEDGE", "0").lower() in ("1", "true", "yes")
+HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY_MS", "250")) / 1000.0
+HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+HEDGE_WINDOW = int(os.getenv("LLM_HEDGE_WINDOW", "200"))
+
+
+class LatencyWindow:
+    """The most recent call latencies of one call site."""
+
+    def __init__(self, size: int = HEDGE_WINDOW):
+        self._samples: deque = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Nearest-rank percentile, or None until HEDGE_MIN_SAMPLES calls were seen."""
+        with self._lock:
+            if len(self._samples) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))]
+
+
+class HedgedLLM:
+    """Wraps a chat model (`inner`) with a `secondary` one used for hedges."""
+
+    def __init__(self, inner, secondary, pipeline: str):
+        self.inner = inner
+        self.secondary = secondary
+        self.pipeline = pipeline
+        self._windows: dict[str, LatencyWindow] = {}
+        self._windows_lock = threading.Lock()
+
+    def _window(self, site: str) -> LatencyWindow:
+        with self._windows_lock:
+            window = self._windows.get(site)
+            if window is None:
+                window = self._windows[site] = LatencyWindow()
+            return window
+
+    def hedge_delay(self, site: str) -> Optional[float]:
+        """Seconds to wait on the primary before hedging; None = don't hedge yet."""
+        threshold = self._window(site).percentile(HEDGE_PERCENTILE)
+        return None if threshold is None else max(threshold, HEDGE_MIN_DELAY)
+
+    def invoke(self, prompt, *args, **kwargs):
+        return self.inner.invoke(prompt, *args, **kwargs)
+
+    async def ainvoke(self, prompt, *args, **kwargs):
+        site = call_site_var.get()
+        start = time.perf_counter()
+        try:
+            response = await self._ainvoke(prompt, site)
+        except asyncio.CancelledError:
+            raise  # the caller gave up; how long the provider would have taken is unknown
+        except Exception:
+            # A call that stalled until it failed was slow all the same
+            self._window(site).add(time.perf_counter() - start)
+            raise
+        self._window(site).add(time.perf_counter() - start)
+        return response
+
+    async def _ainvoke(self, prompt, site: str):
+        node = site.partition(".")[2] or site
+        delay = self.hedge_delay(site)
+        primary = asyncio.ensure_future(self.inner.ainvoke(prompt))
+        tasks = {primary}
+        try:
+            if delay is None:
+                return await primary
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return primary.result()
+
+            if not llm_budget.try_acquire():
+                LLM_HEDGES.labels(pipeline=self.pipeline, node=node, outcome="denied").inc()
+                return await primary
+
+            LLM_HEDGES.labels(pipeline=self.pipeline, node=node, outcome="fired").inc()
+            logger.debug("Hedging %s after %.0f ms", site, delay * 1000)
+            hedge = asyncio.ensure_future(self.secondary.ainvoke(prompt))
+            tasks.add(hedge)
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        outcome = "primary_won" if task is primary else "hedge_won"
+                        LLM_HEDGES.labels(pipeline=self.pipeline, node=node, outcome=outcome).inc()
+                        return task.result()
+            LLM_HEDGES.labels(pipeline=self.pipeline, node=node, outcome="both_failed").inc()
+            return primary.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+
+def with_hedging(llm, pipeline: str, make_secondary: Callable):
+    """Wrap `llm` for hedged calls when LLM_HEDGE is on; `make_secondary` builds the hedge backend."""
+    if not HEDGE_ENABLED:
+        return llm
+    secondary = make_secondary()
+    logger.info("%s pipeline hedging at p%g (min %.0f ms) to %s", pipeline, HEDGE_PERCENTILE,
+                HEDGE_MIN_DELAY * 1000, type(secondary).__name__)
+    return HedgedLLM(llm, secondary, pipeline)
@@ -0,0 +1,114 @@
+"""
+Single call path for every LLM request in both pipelines.
+
+Nodes call `invoke_llm` / `ainvoke_llm` instead of `llm.invoke` directly so
+that latency, outcome, token usage and rate limiting are recorded in one place,
+labelled by provider, model and call site (pipeline + node). Each call also shows
+up in the request's Server-Timing breakdown as `llm.<pipeline>.<node>`, so
+retried attempts are counted there. The call site is also published in
+`call_site_var` for wrappers that need it (hedging keeps latencies per site).
+Async calls cancelled mid-flight (client gone, tick superseded) are recorded
+with outcome="cancelled".
+"""
+
+import asyncio
+import contextvars
+import time
+
+from .metrics import LLM_CALLS, LLM_CALL_SECONDS, LLM_TOKENS
+from .timing import record_stage
+
+_PROVIDER_HINTS = ("mistral", "groq", "ollama", "openai", "stub")
+
+call_site_var: contextvars.ContextVar[str] = contextvars.ContextVar("llm_call_site", default="unknown")
+
+
+def provider_of(llm) -> str:
+    """Best-effort provider label for a LangChain chat model (or a wrapper around one)."""
+    name = type(llm).__name__.lower()
+    for hint in _PROVIDER_HINTS:
+        if hint in name:
+            return hint
+    inner = getattr(llm, "inner", None)
+    if inner is not None:
+        return provider_of(inner)
+    return name
+
+
+def model_of(llm) -> str:
+    """Model name of a LangChain chat model (or a wrapper around one), for metric labels."""
+    for attr in ("model_name", "model"):
+        value = getattr(llm, attr, None)
+        if isinstance(value, str) and value:
+            return value
+    inner = getattr(llm, "inner", None)
+    if inner is not None:
+        return model_of(inner)
+    return "unknown"
+
+
+def is_rate_limit_error(err: Exception) -> bool:
+    return "RateLimitError" in type(err).__name__ or "429" in str(err)
+
+
+def _record_tokens(provider: str, model: str, pipeline: str, response) -> None:
+    usage = getattr(response, "usage_metadata", None) or {}
+    prompt_tokens = usage.get("input_tokens")
+    completion_tokens = usage.get("output_tokens")
+    if prompt_tokens is None:
+        # Older integrations only report token_usage in response_metadata
+        token_usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+        prompt_tokens = token_usage.get("prompt_tokens")
+        completion_tokens = token_usage.get("completion_tokens")
+    if prompt_tokens:
+        LLM_TOKENS.labels(provider=provider, model=model, pipeline=pipeline, kind="prompt").inc(prompt_tokens)
+    if completion_tokens:
+        LLM_TOKENS.labels(provider=provider, model=model, pipeline=pipeline, kind="completion").inc(completion_tokens)
+
+
+def _record(provider: str, model: str, pipeline: str, node: str, start: float, outcome: str, response=None) -> None:
+    LLM_CALLS.labels(provider=provider, model=model, pipeline=pipeline, node=node, outcome=outcome).inc()
+    elapsed = time.perf_counter() - start
+    LLM_CALL_SECONDS.labels(provider=provider, model=model, pipeline=pipeline, node=node).observe(elapsed)
+    record_stage(f"llm.{pipeline}.{node}", elapsed)
+    if response is not None:
+        _record_tokens(provider, model, pipeline, response)
+
+
+def _outcome_for(err: Exception) -> str:
+    return "rate_limited" if is_rate_limit_error(err) else "error"
+
+
+def invoke_llm(llm, prompt, *, pipeline: str, node: str):
+    """Synchronous llm.invoke with metrics."""
+    provider, model = provider_of(llm), model_of(llm)
+    token = call_site_var.set(f"{pipeline}.{node}")
+    start = time.perf_counter()
+    try:
+        response = llm.invoke(prompt)
+    except Exception as e:
+        _record(provider, model, pipeline, node, start, _outcome_for(e))
+        raise
+    finally:
+        call_site_var.reset(token)
+    _record(provider, model, pipeline, node, start, "ok", response)
+    return response
+
+
+async def ainvoke_llm(llm, prompt, *, pipeline: str, node: str):
+    """Asynchronous llm.ainvoke with metrics."""
+    provider, model = provider_of(llm), model_of(llm)
+    token = call_site_var.set(f"{pipeline}.{node}")
+    start = time.perf_counter()
+    try:
+        response = await llm.ainvoke(prompt)
+    except asyncio.CancelledError:
+        _record(provider, model, pipeline, node, start, "cancelled")
+        raise
+    except Exception as e:
+        _record(provider, model, pipeline, node, start, _outcome_for(e))
+        raise
+    finally:
+        call_site_var.reset(token)
+    _record(provider, model, pipeline, node, start, "ok", response)
+    return response
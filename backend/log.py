@@ -0,0 +1,123 @@
+"""
+Structured, non-blocking logging.
+
+Every module gets a tagged logger (`get_logger("Route-NPC")` → "[Route-NPC]")
+and logs with lazy %-style arguments, so messages below the active level cost
+a level check and nothing else. Records go onto a bounded in-memory queue and a
+background thread formats and writes them, keeping stdout writes off the event
+loop; when the queue is full, records are dropped and counted instead of
+blocking the caller.
+
+Each record carries the correlation id of the request (or WebSocket session)
+it was emitted under — set by the HTTP middleware and the session socket
+through `request_id_var`, and carried into worker threads by contextvars.
+
+Environment:
+    LOG_LEVEL       DEBUG | INFO | WARNING | ERROR   (default INFO)
+    LOG_FORMAT      text | json                      (default text)
+    LOG_QUEUE_SIZE  records buffered before dropping (default 10000)
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+
+from .metrics import LOG_RECORDS_DROPPED
+
+ROOT_LOGGER = "npcs"
+
+request_id_var: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="-")
+
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "tag", "request_id"}
+
+_configured = False
+_configure_lock = threading.Lock()
+_listener: logging.handlers.QueueListener | None = None
+
+
+class _ContextFilter(logging.Filter):
+    """Stamp the caller's correlation id and short tag onto the record."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        name = record.name
+        record.tag = name[len(ROOT_LOGGER) + 1:] if name.startswith(ROOT_LOGGER + ".") else name
+        return True
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks: a full queue drops the record."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve %-args now (they may be mutated after we return) but leave
+        # traceback formatting to the listener thread.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra={...}` fields are included as-is."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": getattr(record, "tag", record.name),
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+TEXT_FORMAT = "%(asctime)s %(levelname)-7s [%(tag)s] [%(request_id)s] %(message)s"
+
+
+def configure_logging(level: str | None = None, fmt: str | None = None, stream=None) -> None:
+    """Install the queue handler and start the writer thread (idempotent)."""
+    global _configured, _listener
+    with _configure_lock:
+        if _configured:
+            return
+        level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+        fmt = (fmt or os.getenv("LOG_FORMAT", "text")).lower()
+
+        sink = logging.StreamHandler(stream or sys.stdout)
+        sink.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+
+        log_queue: queue.Queue = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+        handler = _DroppingQueueHandler(log_queue)
+        handler.addFilter(_ContextFilter())
+
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel(level)
+        root.addHandler(handler)
+        root.propagate = False
+
+        _listener = logging.handlers.QueueListener(log_queue, sink, respect_handler_level=False)
+        _listener.start()
+        atexit.register(_listener.stop)
+        _configured = True
+
+
+def get_logger(tag: str) -> logging.Logger:
+    """Logger whose records are tagged `[tag]`, e.g. get_logger("WO-Generate")."""
+    configure_logging()
+    return logging.getLogger(f"{ROOT_LOGGER}.{tag}")
@@ -1,17 +1,42 @@
 import os
-from fastapi import FastAPI
+import time
+import uuid
+from contextlib import asynccontextmanager
+
+_IMPORT_START = time.perf_counter()
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse
 from dotenv import load_dotenv
 
 load_dotenv()
 
 from .routes.npc import router as npc_router
 from .routes.world import router as world_router
+from .routes.session import router as session_router
+from .log import request_id_var
+from .metrics import HTTP_IN_FLIGHT, HTTP_REQUEST_SECONDS, render_metrics
+from .profiling import PROFILING_ENABLED, ProfilingMiddleware
+from .warmup import readiness, record_startup, start_warm_up
+from .wire import WireFormatMiddleware, orjson
+
+# Graphs and LLM clients are built lazily, so this is the whole cold-start import cost.
+record_startup("import", time.perf_counter() - _IMPORT_START)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_warm_up()  # graphs and provider connections, while the server already accepts requests
+    yield
+
 
 app = FastAPI(
     title="Game Backend API",
     description="NPC Brain Agent and Orchestrator",
     version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse if orjson is not None else JSONResponse,
 )
 
 app.add_middleware(
@@ -20,10 +45,49 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Request-ID", "X-Profile"],
 )
 
+# MessagePack bodies and gzip/zstd responses, negotiated per request (see wire.py)
+app.add_middleware(WireFormatMiddleware)
+
+# Added before track_requests so it runs inside it, with the request id already set.
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+
+def _metrics_path(path: str) -> str:
+    """Collapse per-session path segments so the path label stays low-cardinality."""
+    if path.startswith("/api/session/ws/"):
+        return "/api/session/ws"
+    return path
+
+
+@app.middleware("http")
+async def track_requests(request: Request, call_next):
+    path = _metrics_path(request.url.path)
+    in_flight = HTTP_IN_FLIGHT.labels(path=path)
+    in_flight.inc()
+    start = time.perf_counter()
+    status = "500"
+    # Correlation id for every log line of this request (honours an incoming X-Request-ID)
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex[:12]
+    token = request_id_var.set(request_id)
+    try:
+        response = await call_next(request)
+        status = str(response.status_code)
+        response.headers["X-Request-ID"] = request_id
+        return response
+    finally:
+        request_id_var.reset(token)
+        in_flight.dec()
+        HTTP_REQUEST_SECONDS.labels(method=request.method, path=path, status=status).observe(
+            time.perf_counter() - start)
+
+
 app.include_router(npc_router)
 app.include_router(world_router)
+app.include_router(session_router)
 
 
 @app.get("/")
@@ -34,14 +98,46 @@ async def root():
             "npc": "/api/npc",
             "world_orchestrate": "/api/world/orchestrate",
             "world_tick": "/api/world/tick",
+            "session_ws": "/api/session/ws/{session_id}",
             "docs": "/docs",
             "npc_health": "/api/npc/health",
             "world_health": "/api/world/health",
+            "ready": "/ready",
+            "metrics": "/metrics",
         },
     }
 
 
-if __name__ == "__main__":
+@app.get("/ready")
+async def ready():
+    """Readiness (unlike the /health liveness checks): 503 until the startup warm-up has built the graphs."""
+    body = readiness()
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of all in-process metrics."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+def serve() -> None:
+    """
+    Run the API under uvicorn on HOST:PORT. With WORKERS > 1 it runs that many
+    processes, which share sessions, world plans and the LLM budget through
+    SHARED_STORE (default: a SQLite file in the temp directory).
+    """
+    import tempfile
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="127.0.0.1", port=port)
+    host = os.getenv("HOST", "127.0.0.1")
+    workers = int(os.getenv("WORKERS", "1"))
+    if workers > 1:
+        os.environ.setdefault("SHARED_STORE", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'npcs-shared.db')}")
+        uvicorn.run("backend.main:app", host=host, port=port, workers=workers)
+    else:
+        uvicorn.run(app, host=host, port=port)
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,326 @@
+"""
+In-process metrics with a Prometheus text exposition at /metrics.
+
+Deliberately dependency-free: counters, gauges and histograms with labels,
+guarded by a lock so sync graph nodes running in worker threads can record
+too. Metrics are per process — with several workers, scrape each one.
+
+Usage:
+    from ..metrics import LLM_CALLS
+    LLM_CALLS.labels(provider="mistral", model="mistral-large-latest", pipeline="npc", node="dialogue", outcome="ok").inc()
+"""
+
+import asyncio
+import functools
+import inspect
+import math
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+from .deadline import check_deadline
+from .timing import record_stage
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0)
+BYTES_BUCKETS = (1_000, 5_000, 10_000, 25_000, 50_000, 100_000, 250_000, 500_000, 1_000_000)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: Optional[dict] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.extend(f'{n}="{_escape(v)}"' for n, v in extra.items())
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        return self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            children = sorted(self._children.items())
+        for key, child in children:
+            lines.extend(child._render(self.name, self.labelnames, key))
+        return lines
+
+
+class _ValueChild:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def _render(self, name, labelnames, key, suffix=""):
+        return [f"{name}{suffix}{_format_labels(labelnames, key)} {_format_value(self.value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _ValueChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _ValueChild()
+
+    def set(self, value: float) -> None:
+        self._default().set(value)
+
+
+class _HistogramChild:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.sum += value
+            self.count += 1
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+
+    def time(self):
+        return _Timer(self)
+
+    def _render(self, name, labelnames, key):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            labels = _format_labels(labelnames, key, {"le": _format_value(bound)})
+            lines.append(f"{name}_bucket{labels} {cumulative}")
+        labels = _format_labels(labelnames, key, {"le": "+Inf"})
+        lines.append(f"{name}_bucket{labels} {self.count}")
+        lines.append(f"{name}_sum{_format_labels(labelnames, key)} {_format_value(self.sum)}")
+        lines.append(f"{name}_count{_format_labels(labelnames, key)} {self.count}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default().observe(value)
+
+
+class _Timer:
+    def __init__(self, child: _HistogramChild):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+        self._collectors: list[Callable[[], list[str]]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], list[str]]) -> None:
+        """Add a callable producing extra exposition lines at scrape time."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                lines.extend(collector())
+            except Exception as e:
+                lines.append(f"# collector {getattr(collector, '__name__', collector)} failed: {type(e).__name__}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def _counter(name, doc, labels=()):
+    return REGISTRY.register(Counter(name, doc, labels))
+
+
+def _gauge(name, doc, labels=()):
+    return REGISTRY.register(Gauge(name, doc, labels))
+
+
+def _histogram(name, doc, labels=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, doc, labels, buckets))
+
+
+# ── Metric definitions ──────────────────────────────────────────────────────────
+
+GRAPH_NODE_SECONDS = _histogram(
+    "npcs_graph_node_seconds", "Wall time of each LangGraph node", ("pipeline", "node", "outcome"))
+
+LLM_CALLS = _counter(
+    "npcs_llm_calls_total", "LLM calls by provider, model and call site", ("provider", "model", "pipeline", "node", "outcome"))
+LLM_CALL_SECONDS = _histogram(
+    "npcs_llm_call_seconds", "LLM call latency", ("provider", "model", "pipeline", "node"))
+LLM_TOKENS = _counter(
+    "npcs_llm_tokens_total", "LLM tokens reported by the provider", ("provider", "model", "pipeline", "kind"))
+LLM_RETRIES = _counter(
+    "npcs_llm_retries_total", "LLM call retries", ("pipeline", "reason"))
+LLM_RATE_LIMIT_FALLBACKS = _counter(
+    "npcs_llm_rate_limit_fallbacks_total", "Responses replaced by a fallback after rate limiting", ("provider", "pipeline"))
+LLM_HEDGES = _counter(
+    "npcs_llm_hedges_total", "Hedged LLM calls (outcome=fired|denied|primary_won|hedge_won|both_failed)",
+    ("pipeline", "node", "outcome"))
+NPC_DEGRADED = _counter(
+    "npcs_npc_degraded_total", "NPC turns answered by the local fallback after the latency budget ran out", ("route",))
+NPC_PREWARM = _counter(
+    "npcs_npc_prewarm_total",
+    "Speculative NPC openers (outcome=speculated|denied|failed|hit|discarded)", ("outcome",))
+NPC_SUMMARIES = _counter(
+    "npcs_npc_summaries_total",
+    "Batched long-term memory summaries (outcome=queued|written|failed|applied)", ("outcome",))
+NPC_GOSSIP = _counter(
+    "npcs_npc_gossip_total",
+    "Gossip between NPCs (outcome=published|delivered|evicted|expired|folded)", ("outcome",))
+
+STARTUP_SECONDS = _gauge(
+    "npcs_startup_seconds", "Cold start cost: backend import, each lazy singleton's build, whole warm-up", ("phase",))
+
+WORK_CANCELLED = _counter(
+    "npcs_cancelled_total", "Requests whose work was cancelled (reason=disconnect|superseded)", ("route", "reason"))
+
+TTS_SECONDS = _histogram("npcs_tts_seconds", "Deepgram TTS request latency", ("model",))
+TTS_BYTES = _histogram("npcs_tts_bytes", "Audio bytes returned per TTS request", ("model",), BYTES_BUCKETS)
+TTS_REQUESTS = _counter("npcs_tts_requests_total", "TTS requests", ("model", "outcome"))
+
+CACHE_REQUESTS = _counter(
+    "npcs_cache_requests_total", "Cache and replay lookups (result=hit|miss)", ("cache", "result"))
+
+HTTP_IN_FLIGHT = _gauge("npcs_http_requests_in_flight", "Requests currently being handled", ("path",))
+HTTP_REQUEST_SECONDS = _histogram(
+    "npcs_http_request_seconds", "End-to-end request latency", ("method", "path", "status"))
+
+LOG_RECORDS_DROPPED = _counter(
+    "npcs_log_records_dropped_total", "Log records dropped because the log queue was full")
+
+
+# ── Helpers ─────────────────────────────────────────────────────────────────────
+
+def record_cache(cache: str, hit: bool, count: int = 1) -> None:
+    if count:
+        CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc(count)
+
+
+def timed_node(pipeline: str, node: str, fn: Callable) -> Callable:
+    """
+    Wrap a LangGraph node (sync or async) so every run lands in GRAPH_NODE_SECONDS
+    and in the request's Server-Timing breakdown as `pipeline.node`. A node does
+    not start once its request's latency budget has been given up on.
+    """
+    stage_name = f"{pipeline}.{node}"
+
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(state):
+            check_deadline(stage_name)
+            start = time.perf_counter()
+            outcome = "error"
+            try:
+                result = await fn(state)
+                outcome = "ok"
+                return result
+            except asyncio.CancelledError:
+                outcome = "cancelled"
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                GRAPH_NODE_SECONDS.labels(pipeline=pipeline, node=node, outcome=outcome).observe(elapsed)
+                record_stage(stage_name, elapsed)
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(state):
+        check_deadline(stage_name)
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            result = fn(state)
+            outcome = "ok"
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            GRAPH_NODE_SECONDS.labels(pipeline=pipeline, node=node, outcome=outcome).observe(elapsed)
+            record_stage(stage_name, elapsed)
+
+    # Sync nodes run in executor threads; let a request profiler follow them there.
+    from .profiling import profiled_in_thread
+    return profiled_in_thread(wrapper)
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
@@ -0,0 +1,82 @@
+"""
+Per-node model tiers.
+
+Each LLM call site can run on its own model. For example, the short JSON
+classification (npc.consciousness) and the memory summary (npc.summary) can use
+a small, fast model, while dialogue and orchestration keep the large one. A
+node is configured with
+
+    <PIPELINE>_LLM_<NODE>_PROVIDER / _MODEL / _TEMPERATURE / _MAX_TOKENS
+
+e.g. NPC_LLM_CONSCIOUSNESS_MODEL=mistral-small-latest or
+WORLD_LLM_GENERATE_ACTIONS_MAX_TOKENS=800. Anything left unset comes from the
+pipeline's model (LLM_PROVIDER / LLM_MODEL for NPCs, WORLD_LLM_PROVIDER /
+WORLD_LLM_MODEL for the orchestrator). Setting only _PROVIDER selects that
+provider's default model. Nodes that resolve to the same settings share one
+client.
+
+LLM metrics carry a `model` label (see llm_client.model_of), so each tier has
+its own call, latency and token series.
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional
+
+from .log import get_logger
+
+logger = get_logger("Tiers")
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    provider: str
+    model: str
+    temperature: float
+    max_tokens: Optional[int] = None
+
+
+def node_spec(pipeline: str, node: str, base: ModelSpec, default_model: Callable[[str], str]) -> ModelSpec:
+    """`base` with the <PIPELINE>_LLM_<NODE>_* overrides applied."""
+    prefix = f"{pipeline.upper()}_LLM_{node.upper()}_"
+    provider = (os.getenv(prefix + "PROVIDER") or base.provider).lower()
+    model = os.getenv(prefix + "MODEL") or (base.model if provider == base.provider else default_model(provider))
+    temperature = os.getenv(prefix + "TEMPERATURE")
+    max_tokens = os.getenv(prefix + "MAX_TOKENS")
+    return ModelSpec(
+        provider=provider,
+        model=model,
+        temperature=float(temperature) if temperature else base.temperature,
+        max_tokens=int(max_tokens) if max_tokens else base.max_tokens,
+    )
+
+
+class ModelTiers:
+    """The chat model of every node of one pipeline; `build(spec)` makes each distinct one."""
+
+    def __init__(
+        self,
+        pipeline: str,
+        nodes: Iterable[str],
+        base: ModelSpec,
+        default_model: Callable[[str], str],
+        build: Callable[[ModelSpec], object],
+    ):
+        self.pipeline = pipeline
+        self.specs = {node: node_spec(pipeline, node, base, default_model) for node in nodes}
+        built: dict[ModelSpec, object] = {}
+        self._llms = {}
+        for node, spec in self.specs.items():
+            if spec not in built:
+                built[spec] = build(spec)
+            self._llms[node] = built[spec]
+        if len(built) > 1:
+            logger.info("%s model tiers | %s", pipeline, " | ".join(
+                f"{node}={spec.provider}:{spec.model}" for node, spec in self.specs.items()))
+
+    def for_node(self, node: str):
+        return self._llms[node]
+
+    def distinct(self) -> list:
+        """Each configured chat model once."""
+        return list({id(llm): llm for llm in self._llms.values()}.values())
@@ -1,15 +1,18 @@
-from .graph import create_npc_graph, npc_graph
+from .graph import create_npc_graph, npc_graph, npc_executor
 from .state import NPCState, Memory, Event
 from .output_schema import NPCResponse
 from .trigger_system import TriggerSystem
+from .crowd import run_crowd_reaction
 
 __all__ = [
     "create_npc_graph",
     "npc_graph",
+    "npc_executor",
     "NPCState",
     "Memory",
     "Event",
     "NPCResponse",
     "TriggerSystem",
+    "run_crowd_reaction",
 ]
 
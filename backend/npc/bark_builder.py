@@ -0,0 +1,205 @@
+"""
+Build the bark library that barks.py serves (BARK_LIBRARY).
+
+Each NPC type is a template in npcs.json, played with the persona of its
+first instance. For each type and each event in the vocabulary, one LLM call
+(the npc `bark` model tier) writes --variants lines per emotion. Every line
+is cleaned and trimmed the same way live dialogue is. It is then synthesized
+with generate_speech in each voice that instances of that type use.
+
+The event vocabulary has three sources:
+  - DEFAULT_EVENTS
+  - the trigger_event names listed in the orchestrator prompt
+  - an optional --events JSON file of the form {"name": ["keyword", ...]}
+
+Usage (from the project root; uses LLM_PROVIDER / NPC_LLM_BARK_* and DEEPGRAM_API_KEY):
+    python -m backend.npc.bark_builder --out barks
+    python -m backend.npc.bark_builder --out barks --types guard,merchant --events events.json --variants 3
+    python -m backend.npc.bark_builder --out barks --no-audio        # lines only, audio stays live
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import re
+import sys
+from datetime import datetime, timezone
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, _project_root)
+
+from backend.log import get_logger  # noqa: E402
+from backend.llm_client import ainvoke_llm  # noqa: E402
+from backend.npc.barks import AUDIO_FILE, INDEX_FILE, LIBRARY_VERSION, bark_key  # noqa: E402
+from backend.npc.crowd import VALID_EMOTIONS  # noqa: E402
+from backend.npc.fallback import NPC_CONFIG_PATH  # noqa: E402
+from backend.npc.graph import npc_executor  # noqa: E402
+from backend.npc.nodes import _trim_dialogue  # noqa: E402
+from backend.npc.prompts import SYSTEM_BARK_LINES  # noqa: E402
+from backend.npc.tts_service import _resolve_deepgram_model, clean_dialogue, generate_speech  # noqa: E402
+from backend.world_orchestrator.prompts import SYSTEM_PROMPT  # noqa: E402
+
+logger = get_logger("Bark-Builder")
+
+# Event name -> keywords that identify it in a send_to_npc event text.
+DEFAULT_EVENTS = {
+    "festival": ["festival", "celebration", "feast", "carnival"],
+    "storm": ["storm", "thunderstorm", "thunder", "lightning", "blizzard", "gale"],
+    "lockdown": ["lockdown", "curfew", "gates are closed", "gates closed"],
+    "fire": ["fire", "blaze", "flames", "burning"],
+    "raid": ["raid", "bandits", "ambush", "marauders"],
+    "theft": ["theft", "thief", "stolen", "pickpocket"],
+    "monster": ["monster", "beast", "wolves", "creature"],
+    "caravan": ["caravan", "market day", "traders arrive"],
+}
+
+
+def prompt_events() -> dict[str, list[str]]:
+    """The trigger_event names the orchestrator prompt offers, e.g. "city_lockdown" -> ["city lockdown"]."""
+    block = re.search(r"trigger_event\n(.*?)\n\d+\. ", SYSTEM_PROMPT, re.DOTALL)
+    names = re.findall(r'"([a-z]+(?:_[a-z]+)+|[a-z]+)"', block.group(1).split("location")[0]) if block else []
+    return {name: [name.replace("_", " "), name] for name in names}
+
+
+def load_vocabulary(path: str = None) -> dict[str, list[str]]:
+    events = {name: list(keywords) for name, keywords in DEFAULT_EVENTS.items()}
+    for name, keywords in prompt_events().items():
+        events.setdefault(name, keywords)
+    if path:
+        with open(path, encoding="utf-8") as f:
+            for name, keywords in json.load(f).items():
+                events[name] = list(keywords)
+    return events
+
+
+def load_personas(types: list[str] = None) -> dict[str, dict]:
+    """{npc type: {"persona": str, "voices": [voice_id, ...]}} from the npcs.json templates and instances."""
+    with open(NPC_CONFIG_PATH, encoding="utf-8") as f:
+        config = json.load(f)
+    personas = {
+        name: {"persona": f"A {name} in a small medieval village.", "voices": []}
+        for name in config.get("templates") or {}
+    }
+    seen_persona = set()
+    for npc in (config.get("instances") or []) + (config.get("deferredNpcs") or []):
+        entry = personas.get(npc.get("template"))
+        if entry is None:
+            continue
+        if npc.get("npc_identity") and npc["template"] not in seen_persona:
+            entry["persona"] = npc["npc_identity"]
+            seen_persona.add(npc["template"])
+        if npc.get("voice_id") and npc["voice_id"] not in entry["voices"]:
+            entry["voices"].append(npc["voice_id"])
+    if types:
+        personas = {name: personas[name] for name in types if name in personas}
+    return personas
+
+
+def _parse_lines(raw: str, emotions: list[str]) -> dict[str, list[str]]:
+    match = re.search(r"\{[\s\S]*\}", raw)
+    if not match:
+        raise ValueError("No JSON object in bark response")
+    lines = json.loads(match.group(0)).get("lines")
+    if not isinstance(lines, dict):
+        raise ValueError("Bark response has no 'lines' object")
+    result = {}
+    for emotion in emotions:
+        cleaned = [_trim_dialogue(clean_dialogue(line)) for line in lines.get(emotion) or [] if isinstance(line, str)]
+        cleaned = [line for line in dict.fromkeys(cleaned) if line]
+        if cleaned:
+            result[emotion] = cleaned
+    return result
+
+
+async def _generate(llm, npc_type: str, persona: str, event: str, emotions: list[str], variants: int) -> dict:
+    prompt = SYSTEM_BARK_LINES.format(
+        npc_type=npc_type,
+        persona=persona,
+        event=event.replace("_", " "),
+        variants=variants,
+        emotions=", ".join(emotions),
+    )
+    response = await ainvoke_llm(llm, prompt, pipeline="npc", node="bark")
+    return _parse_lines(response.content, emotions)
+
+
+async def build(args) -> None:
+    personas = load_personas(args.types.split(",") if args.types else None)
+    events = load_vocabulary(args.events)
+    emotions = sorted(VALID_EMOTIONS)
+    llm = npc_executor.get().llm_for("bark")
+    semaphore = asyncio.Semaphore(args.concurrency)
+    logger.info("Building barks | types=%s | events=%s | emotions=%s | variants=%s",
+                len(personas), len(events), len(emotions), args.variants)
+
+    async def lines_for(npc_type: str, event: str) -> dict:
+        async with semaphore:
+            try:
+                return await _generate(llm, npc_type, personas[npc_type]["persona"], event, emotions, args.variants)
+            except Exception as e:
+                logger.warning("No lines for %s / %s: %s: %s", npc_type, event, type(e).__name__, e)
+                return {}
+
+    jobs = [(npc_type, event) for npc_type in personas for event in events]
+    generated = dict(zip(jobs, await asyncio.gather(*(lines_for(*job) for job in jobs))))
+
+    # One synthesis per distinct (line, voice model)
+    speech_jobs: dict[tuple[str, str], str] = {}
+    if not args.no_audio:
+        for (npc_type, _), by_emotion in generated.items():
+            for line in (line for lines in by_emotion.values() for line in lines):
+                for voice in personas[npc_type]["voices"] or [None]:
+                    speech_jobs.setdefault((line, _resolve_deepgram_model(voice)), voice)
+
+    async def speak(key: tuple[str, str]):
+        async with semaphore:
+            return await asyncio.to_thread(generate_speech, key[0], speech_jobs[key])
+
+    audio_urls = dict(zip(speech_jobs, await asyncio.gather(*(speak(key) for key in speech_jobs))))
+
+    os.makedirs(args.out, exist_ok=True)
+    spans: dict[tuple[str, str], list[int]] = {}
+    with open(os.path.join(args.out, AUDIO_FILE), "wb") as audio_file:
+        for key, url in audio_urls.items():
+            if url:
+                audio = base64.b64decode(url.split(",", 1)[1])
+                spans[key] = [audio_file.tell(), len(audio)]
+                audio_file.write(audio)
+
+    barks: dict[str, list[dict]] = {}
+    for (npc_type, event), by_emotion in generated.items():
+        models = [_resolve_deepgram_model(voice) for voice in personas[npc_type]["voices"] or [None]]
+        for emotion, lines in by_emotion.items():
+            barks[bark_key(npc_type, emotion, event)] = [
+                {"dialogue": line, "audio": {model: spans[(line, model)] for model in models if (line, model) in spans}}
+                for line in lines
+            ]
+
+    index = {
+        "version": LIBRARY_VERSION,
+        "built": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "events": {name: {"keywords": keywords} for name, keywords in events.items()},
+        "barks": barks,
+    }
+    with open(os.path.join(args.out, INDEX_FILE), "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=1, ensure_ascii=False)
+
+    print(f"Wrote {args.out}: {len(barks)} keys, {sum(map(len, barks.values()))} lines, "
+          f"{len(spans)}/{len(speech_jobs)} audio clips, {sum(length for _, length in spans.values())} audio bytes")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", required=True, help="library directory to write (then set BARK_LIBRARY to it)")
+    parser.add_argument("--types", help="comma-separated NPC types (npcs.json templates); default all")
+    parser.add_argument("--events", help='JSON file of extra events: {"name": ["keyword", ...]}')
+    parser.add_argument("--variants", type=int, default=2, help="lines per (type, emotion, event)")
+    parser.add_argument("--concurrency", type=int, default=4, help="LLM / TTS calls in flight")
+    parser.add_argument("--no-audio", action="store_true", help="skip TTS; served barks then synthesize live")
+    asyncio.run(build(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
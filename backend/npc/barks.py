@@ -0,0 +1,134 @@
+"""
+Pre-generated NPC barks for common world events.
+
+bark_builder.py runs offline. It generates short reaction lines for every
+(npc type, emotion, event) in its vocabulary and synthesizes their audio. The
+result is a directory with two files:
+    index.json   events with their keywords, plus bark entries keyed "type|EMOTION|event"
+    audio.bin    the MP3s back to back. An entry points into it with
+                 {voice model: [offset, length]}
+
+With BARK_LIBRARY pointing at such a directory, world ticks serve
+send_to_npc directives from the library. The directive's event text has to
+mention one of an event's keywords, and the library has to hold lines for the
+NPC's type and current emotion. The NPC then answers with one of those lines
+instead of a graph run, along with its audio when it was recorded in the
+NPC's voice. Everything else is generated live as before. A lookup is one
+regex scan of the event text plus a dict access, and audio is read from a
+memory map. Hits and misses are counted in npcs_cache_requests_total{cache="bark_library"}.
+
+Environment:
+    BARK_LIBRARY   library directory written by bark_builder.py (default unset: off)
+"""
+
+import base64
+import json
+import mmap
+import os
+import re
+import zlib
+from typing import Optional
+
+from ..log import get_logger
+from ..metrics import record_cache
+from ..warmup import Lazy
+from .nodes import remember_interaction
+from .tts_service import _resolve_deepgram_model
+
+logger = get_logger("NPC-Barks")
+
+INDEX_FILE = "index.json"
+AUDIO_FILE = "audio.bin"
+LIBRARY_VERSION = 1
+
+
+def bark_key(npc_type: str, emotion: str, event: str) -> str:
+    return f"{npc_type.lower()}|{emotion.upper()}|{event}"
+
+
+class BarkLibrary:
+    """A library directory written by bark_builder.py, loaded for lookups."""
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, INDEX_FILE), encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("version") != LIBRARY_VERSION:
+            raise ValueError(f"Bark library {path} has version {index.get('version')}, expected {LIBRARY_VERSION}")
+        self.path = path
+        self.events: dict[str, dict] = index["events"]
+        self.barks: dict[str, list[dict]] = index["barks"]
+
+        self._keyword_event: dict[str, str] = {}
+        for name, event in self.events.items():
+            for keyword in event["keywords"]:
+                self._keyword_event.setdefault(keyword.lower(), name)
+        # Longest keywords first, so "city lockdown" wins over "lockdown".
+        alternatives = sorted(self._keyword_event, key=len, reverse=True)
+        self._pattern = re.compile(
+            r"\b(" + "|".join(map(re.escape, alternatives)) + r")\b", re.IGNORECASE) if alternatives else None
+
+        self._audio = b""
+        audio_path = os.path.join(path, AUDIO_FILE)
+        if os.path.exists(audio_path) and os.path.getsize(audio_path) > 0:
+            with open(audio_path, "rb") as f:
+                self._audio = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        logger.info("Loaded bark library %s | events=%s | keys=%s | lines=%s | audio=%s bytes",
+                    path, len(self.events), len(self.barks), sum(map(len, self.barks.values())), len(self._audio))
+
+    def match_event(self, event_text: str) -> Optional[str]:
+        if self._pattern is None:
+            return None
+        match = self._pattern.search(event_text)
+        return self._keyword_event[match.group(1).lower()] if match else None
+
+    def lookup(self, npc_id: str, npc_type: str, emotion: str, event_text: str) -> Optional[dict]:
+        """A bark entry for this NPC and event, or None. Stable per (npc, event text)."""
+        event = self.match_event(event_text)
+        entries = self.barks.get(bark_key(npc_type, emotion, event)) if event and npc_type else None
+        record_cache("bark_library", hit=bool(entries))
+        if not entries:
+            return None
+        return entries[zlib.crc32(f"{npc_id}:{event_text}".encode()) % len(entries)]
+
+    def audio_url(self, entry: dict, voice_id: Optional[str]) -> Optional[str]:
+        """The entry's audio as a data URL if it was recorded with this voice."""
+        span = (entry.get("audio") or {}).get(_resolve_deepgram_model(voice_id))
+        if not span:
+            return None
+        offset, length = span
+        return "data:audio/mp3;base64," + base64.b64encode(self._audio[offset:offset + length]).decode("ascii")
+
+
+def bark_turn(library: BarkLibrary, npc_id: str, npc_data: dict, event_text: str) -> Optional[dict]:
+    """
+    The graph-shaped output (dialogue, emotion, trust_score, action_trigger,
+    memory, audio_url) of a bark for this directive, or None to react live.
+    Emotion and trust stay as they are, and the event is folded into memory.
+    """
+    emotion = npc_data.get("emotion", "NEUTRAL")
+    entry = library.lookup(npc_id, npc_data.get("type", ""), emotion, event_text)
+    if entry is None:
+        return None
+    trust_score = npc_data.get("trust_score", 5)
+    return {
+        "dialogue": entry["dialogue"],
+        "emotion": emotion,
+        "trust_score": trust_score,
+        "action_trigger": "NONE",
+        "audio_url": library.audio_url(entry, npc_data.get("voice_id")),
+        "memory": remember_interaction(npc_data.get("memory") or {}, event_text, emotion, trust_score),
+    }
+
+
+def _load_library() -> Optional[BarkLibrary]:
+    path = os.getenv("BARK_LIBRARY")
+    if not path:
+        return None
+    try:
+        return BarkLibrary(path)
+    except (OSError, ValueError, KeyError) as e:
+        logger.error("Could not load bark library %s, reacting live: %s: %s", path, type(e).__name__, e)
+        return None
+
+
+bark_library = Lazy("bark_library", _load_library)
@@ -0,0 +1,36 @@
+"""
+Conversation context for NPC prompts.
+
+Only the last HISTORY_LINES entries of `conversation_history` reach a prompt,
+so only those are rendered. The cost per turn stays constant however long the
+session gets. node_perceive renders the block once per turn into
+`conversation_context`, and both LLM nodes (consciousness and dialogue) use
+that string.
+
+Session state (routes/session.py) keeps the last HISTORY_KEEP entries per NPC.
+That is enough for the prompt window, and the state stays bounded when it is
+written to the shared store after every turn.
+
+Environment:
+    NPC_HISTORY_LINES   earlier lines of the conversation shown in NPC prompts (default 10)
+"""
+
+import os
+
+HISTORY_LINES = int(os.getenv("NPC_HISTORY_LINES", "10"))
+HISTORY_KEEP = max(20, 2 * HISTORY_LINES)
+
+EMPTY_CONVERSATION = "(conversation just started)"
+
+
+def history_line(entry: dict) -> str:
+    label = "[You said]" if entry.get("role", "unknown") == "npc" else "[Player said]"
+    return f"{label} {entry.get('content', '')}"
+
+
+def render_history(history: list[dict]) -> str:
+    """The prompt block for everything before the latest entry (the current player action)."""
+    earlier = history[-HISTORY_LINES - 1:-1]
+    if not earlier:
+        return EMPTY_CONVERSATION
+    return "\n".join(history_line(entry) for entry in earlier)
@@ -0,0 +1,159 @@
+"""
+Crowd reactions: many NPCs react to the same event in a single LLM call.
+
+A wildcard send_to_npc directive ("npc_id": "all") used to fan out into one full
+graph run per matched NPC, each repeating the same event text and prompt
+scaffolding (2-3 LLM calls apiece). Here every matched NPC's persona, trust and
+emotion go into one prompt, and the model returns a list of per-NPC reactions.
+Keyword triggers still take priority over the model, exactly like the
+consciousness node, and each reaction is folded into that NPC's memory.
+"""
+
+import asyncio
+import json
+import os
+import re
+
+from ..llm_client import ainvoke_llm
+from ..log import get_logger
+from .nodes import _trim_dialogue, remember_interaction
+from .output_schema import NPCResponse
+from .prompts import SYSTEM_CROWD_REACTION, CROWD_NPC_BLOCK
+
+VALID_EMOTIONS = {"ANGRY", "HAPPY", "NEUTRAL", "SUSPICIOUS", "GRATEFUL", "SAD", "CONFUSED", "EXCITED"}
+
+logger = get_logger("NPC-Crowd")
+
+CROWD_MODE_ENABLED = os.getenv("NPC_CROWD_MODE", "1").lower() not in ("0", "false", "no")
+CROWD_MIN_SIZE = int(os.getenv("NPC_CROWD_MIN_SIZE", "2"))
+CROWD_MAX_BATCH = int(os.getenv("NPC_CROWD_MAX_BATCH", "12"))
+
+
+def _memory_line(memory: dict) -> str:
+    summary = memory.get("long_term_summary") or ""
+    recent = memory.get("relationship_history", [])[-2:]
+    parts = [summary] if summary else []
+    parts.extend(recent)
+    return " / ".join(parts) if parts else "(nothing notable yet)"
+
+
+def _build_prompt(event_text: str, npcs: dict[str, dict], world_state: dict) -> str:
+    npc_blocks = "\n".join(
+        CROWD_NPC_BLOCK.format(
+            npc_id=npc_id,
+            persona=npc_data.get("npc_identity", "A generic NPC"),
+            trust_score=npc_data.get("trust_score", 5),
+            emotion=npc_data.get("emotion", "NEUTRAL"),
+            memory=_memory_line(npc_data.get("memory") or {}),
+        )
+        for npc_id, npc_data in npcs.items()
+    )
+    return SYSTEM_CROWD_REACTION.format(
+        event=event_text,
+        location=world_state.get("location", "unknown"),
+        weather=world_state.get("weather", "clear"),
+        time_of_day=world_state.get("time_of_day", "noon"),
+        tension_level=world_state.get("tension_level", 0),
+        npc_blocks=npc_blocks,
+    )
+
+
+def _parse_reactions(raw: str) -> list[dict]:
+    """Pull the reactions list out of the model output, tolerating code fences."""
+    match = re.search(r"\{[\s\S]*\}", raw)
+    if not match:
+        raise ValueError("No JSON object in crowd reaction response")
+    parsed = json.loads(match.group(0))
+    reactions = parsed.get("reactions")
+    if not isinstance(reactions, list):
+        raise ValueError("Crowd reaction response has no 'reactions' list")
+    return [r for r in reactions if isinstance(r, dict)]
+
+
+def _apply_reaction(executor, npc_id: str, npc_data: dict, reaction: dict, event_text: str) -> dict:
+    """
+    Turn one raw reaction into the same fields a graph run produces
+    (dialogue, emotion, trust_score, action_trigger, memory), validated
+    through NPCResponse.
+    """
+    triggers = executor.trigger_system.get_all_triggers(event_text)
+    current_emotion = npc_data.get("emotion", "NEUTRAL")
+    current_trust = npc_data.get("trust_score", 5)
+
+    emotion_trigger = triggers.get("emotion_trigger")
+    if emotion_trigger:
+        emotion = emotion_trigger["emotion"]
+        trust_delta = emotion_trigger["trust_delta"]
+    else:
+        emotion = str(reaction.get("emotion", "")).upper()
+        if emotion not in VALID_EMOTIONS:
+            emotion = current_emotion
+        try:
+            trust_delta = max(-2, min(2, int(reaction.get("trust_delta", 0))))
+        except (TypeError, ValueError):
+            trust_delta = 0
+
+    trust_score = max(0, min(10, current_trust + trust_delta))
+    output = NPCResponse(
+        dialogue=_trim_dialogue(str(reaction.get("dialogue", ""))),
+        emotion=emotion,
+        trust_score=trust_score,
+        action_trigger=triggers.get("action_trigger") or "NONE",
+        audio_url=None,
+    )
+    result = output.model_dump()
+    result["memory"] = remember_interaction(
+        npc_data.get("memory") or {}, event_text, output.emotion, output.trust_score,
+    )
+    result["internal_reasoning"] = reaction.get("reasoning", "")
+    return result
+
+
+async def _react_chunk(executor, event_text: str, npcs: dict[str, dict], world_state: dict) -> dict[str, dict]:
+    prompt = _build_prompt(event_text, npcs, world_state)
+    logger.debug("Calling LLM for %s NPC(s) | prompt_len=%s", len(npcs), len(prompt))
+    response = await ainvoke_llm(executor.llm_for("crowd"), prompt, pipeline="npc", node="crowd")
+    reactions = _parse_reactions(response.content)
+
+    results: dict[str, dict] = {}
+    for reaction in reactions:
+        npc_id = str(reaction.get("npc_id", ""))
+        if npc_id not in npcs or npc_id in results:
+            continue
+        try:
+            results[npc_id] = _apply_reaction(executor, npc_id, npcs[npc_id], reaction, event_text)
+        except Exception as e:
+            logger.warning("[%s] Invalid reaction dropped: %s: %s", npc_id, type(e).__name__, e)
+    return results
+
+
+async def run_crowd_reaction(executor, event_text: str, npcs: dict[str, dict], world_state: dict) -> dict[str, dict]:
+    """
+    React every NPC in `npcs` (npc_id -> tick NPC data) to `event_text`.
+
+    NPCs are packed NPC_CROWD_MAX_BATCH to a prompt; chunks run concurrently.
+    Returns npc_id -> graph-shaped output for every NPC the model answered for.
+    NPCs missing from the result (dropped by the model, invalid output or a
+    failed chunk) should be handled by the caller, e.g. with a full graph run.
+    """
+    ids = list(npcs.keys())
+    chunks = [
+        {npc_id: npcs[npc_id] for npc_id in ids[i:i + CROWD_MAX_BATCH]}
+        for i in range(0, len(ids), CROWD_MAX_BATCH)
+    ]
+    logger.info("Crowd reaction | npcs=%s | llm_calls=%s | event='%s'", len(ids), len(chunks), event_text)
+
+    chunk_results = await asyncio.gather(
+        *(_react_chunk(executor, event_text, chunk, world_state) for chunk in chunks),
+        return_exceptions=True,
+    )
+
+    results: dict[str, dict] = {}
+    for chunk_result in chunk_results:
+        if isinstance(chunk_result, Exception):
+            logger.warning("Chunk failed: %s: %s", type(chunk_result).__name__, chunk_result, exc_info=chunk_result)
+            continue
+        results.update(chunk_result)
+
+    logger.info("Done | reacted=%s/%s", len(results), len(ids))
+    return results
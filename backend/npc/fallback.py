@@ -0,0 +1,100 @@
+"""
+Local NPC turn for when the latency budget runs out (see backend/deadline.py).
+
+No LLM is involved. Emotion and trust come from the keyword triggers alone, the
+same rules the consciousness node gives priority to. The line is the NPC's own
+`dialogue.greeting` (first exchange) or one of its `dialogue.idle` lines from
+the frontend's npcs.json, so a degraded reply still sounds like that character
+instead of the client's generic mock responses. The interaction is folded into
+memory the same way crowd reactions do it.
+"""
+
+import json
+import os
+import zlib
+from functools import lru_cache
+
+from ..log import get_logger
+from .nodes import remember_interaction
+from .state import NPCState
+
+logger = get_logger("NPC-Fallback")
+
+NPC_CONFIG_PATH = os.getenv(
+    "NPC_CONFIG_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "..", "frontend", "public", "npcs.json"),
+)
+
+DEFAULT_LINES = {
+    "greeting": "Well met, traveler.",
+    "idle": ["Hm. Give me a moment.", "Strange days, these.", "Mind how you go."],
+}
+
+
+def _merge_dialogue(template: dict, overrides: dict) -> dict:
+    dialogue = {**(template.get("dialogue") or {}), **((overrides or {}).get("dialogue") or {})}
+    return {
+        "greeting": dialogue.get("greeting") or DEFAULT_LINES["greeting"],
+        "idle": list(dialogue.get("idle") or DEFAULT_LINES["idle"]),
+    }
+
+
+@lru_cache(maxsize=1)
+def persona_lines() -> tuple[dict[str, dict], dict[str, dict]]:
+    """({npc_id: lines}, {template name: lines}) from npcs.json; empty if it can't be read."""
+    try:
+        with open(NPC_CONFIG_PATH, encoding="utf-8") as f:
+            config = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning("Could not load NPC dialogue lines from %s: %s", NPC_CONFIG_PATH, e)
+        return {}, {}
+
+    templates = config.get("templates") or {}
+    by_template = {name: _merge_dialogue(template, {}) for name, template in templates.items()}
+    by_npc = {}
+    for npc in (config.get("instances") or []) + (config.get("deferredNpcs") or []):
+        template = templates.get(npc.get("template"), {})
+        by_npc[npc["id"]] = _merge_dialogue(template, npc.get("overrides"))
+    logger.info("Loaded fallback lines | npcs=%s | templates=%s", len(by_npc), len(by_template))
+    return by_npc, by_template
+
+
+def _lines_for(npc_id: str, npc_identity: str) -> dict:
+    by_npc, by_template = persona_lines()
+    if npc_id in by_npc:
+        return by_npc[npc_id]
+    # NPCs spawned by the orchestrator aren't in npcs.json; match on their type.
+    haystack = f"{npc_id} {npc_identity}".lower()
+    for name, lines in by_template.items():
+        if name in haystack:
+            return lines
+    return DEFAULT_LINES
+
+
+def fallback_turn(executor, state: NPCState) -> dict:
+    """The fields a graph run produces (dialogue, emotion, trust_score, action_trigger, memory), without an LLM."""
+    player_action = state["recent_events"][-1]["action"] if state["recent_events"] else ""
+    triggers = executor.trigger_system.get_all_triggers(player_action)
+
+    emotion = state["emotion"]
+    trust_score = state["trust_score"]
+    emotion_trigger = triggers.get("emotion_trigger")
+    if emotion_trigger:
+        emotion = emotion_trigger["emotion"]
+        trust_score = max(0, min(10, trust_score + emotion_trigger["trust_delta"]))
+
+    lines = _lines_for(state["npc_id"], state["npc_identity"])
+    history = state.get("conversation_history") or []
+    if not history:
+        dialogue = lines["greeting"]
+    else:
+        # Stable pick, so retries of the same turn get the same line.
+        dialogue = lines["idle"][zlib.crc32(f"{player_action}:{len(history)}".encode()) % len(lines["idle"])]
+
+    return {
+        "dialogue": dialogue,
+        "emotion": emotion,
+        "trust_score": trust_score,
+        "action_trigger": triggers.get("action_trigger") or "NONE",
+        "memory": remember_interaction(state["memory"], player_action, emotion, trust_score),
+    }
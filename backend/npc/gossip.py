@@ -0,0 +1,318 @@
+"""
+Gossip: NPCs hear about what the player did to others, without LLM calls.
+
+Before this, news only spread when the orchestrator sent a send_to_npc
+directive, and every directive cost a full graph run. GossipBus is an
+in-process publish/subscribe bus, one channel per session. Player actions and
+NPC outcomes (a chat that changed someone's mood, a reaction to a world
+event) are published to it. Every NPC on the session's roster subscribes with
+a bounded inbox of NPC_GOSSIP_INBOX items. When the inbox is full, the oldest
+item goes first.
+
+Whether an NPC hears an item at all depends on two factors:
+  - location: full weight at the same place, or within NPC_GOSSIP_RADIUS for
+    "x,z" positions; NPC_GOSSIP_DISTANT of it elsewhere or when unknown
+  - relationship: NPC_GOSSIP_KIN times more when the news is about an NPC of
+    the same type (guards care about guards)
+
+Items weaker than NPC_GOSSIP_MIN_WEIGHT are not delivered. Heard items fade
+with a half-life of NPC_GOSSIP_HALF_LIFE seconds. Nothing happens to the NPC
+until its next turn. Then take_gossip folds the strongest items that are
+still above the threshold, at most NPC_GOSSIP_FOLD of them, into memory as
+"Heard: ..." entries. They go into relationship_history, which the dialogue
+prompt shows, and into the log that memory_index.py recalls from. Gossip
+therefore surfaces in that NPC's next LLM turn and adds no calls. The inbox
+is only emptied (ack_gossip) once the turn's memory has reached the client or
+session. A turn that fails or is cancelled leaves it queued for the next one.
+
+Clients that send no session id all share the implicit "default" session,
+so gossip is not spread there. A channel is dropped when its websocket
+session closes, or once nothing has touched it for NPC_GOSSIP_IDLE seconds.
+
+The bus lives in the worker process. With several workers, an item reaches
+the NPCs of sessions served by the worker that published it. Counts are in
+npcs_npc_gossip_total{outcome}.
+
+Environment:
+    NPC_GOSSIP              1 | 0  spread gossip (default 1)
+    NPC_GOSSIP_INBOX        items an NPC can hold between turns (default 16)
+    NPC_GOSSIP_FOLD         items folded into memory per turn (default 3)
+    NPC_GOSSIP_HALF_LIFE    seconds for heard news to lose half its weight (default 300)
+    NPC_GOSSIP_MIN_WEIGHT   weight below which news is not heard / forgotten (default 0.3)
+    NPC_GOSSIP_RADIUS       distance counting as "here" for "x,z" locations (default 30)
+    NPC_GOSSIP_DISTANT      weight factor for news from elsewhere (default 0.25)
+    NPC_GOSSIP_KIN          weight factor for news about an NPC of the same type (default 1.5)
+    NPC_GOSSIP_IDLE         seconds after which an untouched session's channel is dropped (default 1800)
+"""
+
+import math
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+from ..metrics import NPC_GOSSIP
+from .memory_index import append_log
+
+GOSSIP_ENABLED = os.getenv("NPC_GOSSIP", "1").lower() not in ("0", "false", "no")
+INBOX_SIZE = int(os.getenv("NPC_GOSSIP_INBOX", "16"))
+FOLD_PER_TURN = int(os.getenv("NPC_GOSSIP_FOLD", "3"))
+HALF_LIFE = float(os.getenv("NPC_GOSSIP_HALF_LIFE", "300"))
+MIN_WEIGHT = float(os.getenv("NPC_GOSSIP_MIN_WEIGHT", "0.3"))
+RADIUS = float(os.getenv("NPC_GOSSIP_RADIUS", "30"))
+DISTANT = float(os.getenv("NPC_GOSSIP_DISTANT", "0.25"))
+KIN = float(os.getenv("NPC_GOSSIP_KIN", "1.5"))
+IDLE_TIMEOUT = float(os.getenv("NPC_GOSSIP_IDLE", "1800"))
+
+PLAYER_ACTION_WEIGHT = 0.6  # heard nearby only
+CHAT_EVENT_PREFIX = "said to "
+SHARED_SESSION = "default"  # every client without a session id; gossip would cross players
+SWEEP_INTERVAL = 60.0
+
+
+@dataclass(slots=True)
+class Gossip:
+    text: str
+    subject: Optional[str]  # the NPC the news is about, if any
+    weight: float
+    at: float = field(default_factory=time.monotonic)
+
+
+@dataclass(slots=True)
+class _Subscriber:
+    location: str
+    point: Optional[tuple[float, float]]
+    npc_type: str
+    inbox: deque
+
+
+def _point(location: str) -> Optional[tuple[float, float]]:
+    """(x, z) for the frontend's "x,z" locations; None for named places."""
+    x, sep, z = location.partition(",")
+    if not sep:
+        return None
+    try:
+        return float(x), float(z)
+    except ValueError:
+        return None
+
+
+class GossipBus:
+    """Per-session channels with one bounded inbox per subscribed NPC."""
+
+    def __init__(self, inbox_size: int = INBOX_SIZE, idle_timeout: float = IDLE_TIMEOUT):
+        self.inbox_size = inbox_size
+        self.idle_timeout = idle_timeout
+        self._channels: dict[str, dict[str, _Subscriber]] = {}
+        self._touched: dict[str, float] = {}
+        self._swept = time.monotonic()
+
+    def _touch(self, session_id: str) -> None:
+        now = time.monotonic()
+        self._touched[session_id] = now
+        if now - self._swept >= SWEEP_INTERVAL:
+            self._swept = now
+            for idle in [s for s, at in self._touched.items() if now - at > self.idle_timeout]:
+                self.drop(idle)
+
+    def drop(self, session_id: str) -> None:
+        """Forget the session's channel and everything queued in it."""
+        self._touched.pop(session_id, None)
+        self._channels.pop(session_id, None)
+
+    def sync(self, session_id: str, npcs: dict[str, dict]) -> None:
+        """Subscribe the session's roster (npc_id -> NPC data) and drop NPCs no longer on it."""
+        self._touch(session_id)
+        channel = self._channels.setdefault(session_id, {})
+        for npc_id in [npc_id for npc_id in channel if npc_id not in npcs]:
+            del channel[npc_id]
+        for npc_id, npc_data in npcs.items():
+            location = str(npc_data.get("location") or "")
+            npc_type = str(npc_data.get("type") or "")
+            subscriber = channel.get(npc_id)
+            if subscriber is None:
+                channel[npc_id] = _Subscriber(location, _point(location), npc_type, deque(maxlen=self.inbox_size))
+            elif subscriber.location != location or subscriber.npc_type != npc_type:
+                subscriber.location, subscriber.point, subscriber.npc_type = location, _point(location), npc_type
+
+    def publish(self, session_id: str, text: str, subject: Optional[str] = None,
+                location: Optional[str] = None, weight: float = 1.0) -> int:
+        """
+        Deliver news to every subscriber of the session that would care
+        (see module docstring). `location` defaults to the subject's. Returns
+        how many inboxes received it.
+        """
+        channel = self._channels.get(session_id)
+        if not channel:
+            return 0
+        self._touch(session_id)
+        about = channel.get(subject) if subject else None
+        if location is None and about is not None:
+            location = about.location
+        point = _point(location) if location else None
+        kin_type = about.npc_type if about is not None else ""
+        item = Gossip(text, subject, weight)  # shared by every inbox, next to each one's weight
+
+        delivered = evicted = 0
+        for npc_id, subscriber in channel.items():
+            if npc_id == subject:
+                continue
+            if not location or not subscriber.location:
+                reach = DISTANT
+            elif location == subscriber.location:
+                reach = 1.0
+            elif point is not None and subscriber.point is not None:
+                distance = math.dist(point, subscriber.point)
+                reach = 1.0 if distance <= RADIUS else max(DISTANT, RADIUS / distance)
+            else:
+                reach = DISTANT
+            if kin_type and subscriber.npc_type == kin_type:
+                reach *= KIN
+            if weight * reach < MIN_WEIGHT:
+                continue
+            inbox = subscriber.inbox
+            if len(inbox) == inbox.maxlen:
+                evicted += 1
+            inbox.append((weight * reach, item))
+            delivered += 1
+
+        NPC_GOSSIP.labels(outcome="published").inc()
+        if delivered:
+            NPC_GOSSIP.labels(outcome="delivered").inc(delivered)
+        if evicted:
+            NPC_GOSSIP.labels(outcome="evicted").inc(evicted)
+        return delivered
+
+    def peek(self, session_id: str, npc_id: str, limit: int = FOLD_PER_TURN) -> list[Gossip]:
+        """
+        The `limit` strongest items in the NPC's inbox still above MIN_WEIGHT,
+        oldest first. The inbox keeps them until ack(); an inbox holding only
+        forgotten items is emptied.
+        """
+        subscriber = self._channels.get(session_id, {}).get(npc_id)
+        if subscriber is None or not subscriber.inbox:
+            return []
+        self._touch(session_id)
+        now = time.monotonic()
+        heard = []
+        for heard_weight, item in subscriber.inbox:
+            weight = heard_weight * 0.5 ** ((now - item.at) / HALF_LIFE)
+            if weight >= MIN_WEIGHT:
+                heard.append(Gossip(item.text, item.subject, weight, item.at))
+        if not heard:
+            NPC_GOSSIP.labels(outcome="expired").inc(len(subscriber.inbox))
+            subscriber.inbox.clear()
+            return []
+        heard = sorted(heard, key=lambda item: item.weight, reverse=True)[:limit]
+        return sorted(heard, key=lambda item: item.at)
+
+    def ack(self, session_id: str, npc_id: str, read_at: float) -> None:
+        """Empty the NPC's inbox of everything published up to `read_at`; later news stays."""
+        subscriber = self._channels.get(session_id, {}).get(npc_id)
+        if subscriber is None:
+            return
+        kept = [(weight, item) for weight, item in subscriber.inbox if item.at > read_at]
+        expired = sum(1 for weight, item in subscriber.inbox
+                      if item.at <= read_at and weight * 0.5 ** ((read_at - item.at) / HALF_LIFE) < MIN_WEIGHT)
+        subscriber.inbox.clear()
+        subscriber.inbox.extend(kept)
+        if expired:
+            NPC_GOSSIP.labels(outcome="expired").inc(expired)
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._channels),
+            "subscribers": sum(map(len, self._channels.values())),
+            "queued": sum(len(s.inbox) for channel in self._channels.values() for s in channel.values()),
+        }
+
+
+def fold_gossip(memory: dict, heard: list[Gossip]) -> dict:
+    """Memory with each heard item appended to relationship_history and the log."""
+    if not heard:
+        return memory
+    relationship_history = list(memory.get("relationship_history", []))
+    log = memory.get("log")
+    for item in heard:
+        line = f"Heard: {item.text}"
+        relationship_history.append(line)
+        log = append_log(log, line)
+    NPC_GOSSIP.labels(outcome="folded").inc(len(heard))
+    return {**memory, "relationship_history": relationship_history[-10:], "log": log}
+
+
+def take_gossip(session_id: str, npc_id: str, npc_data: dict) -> tuple[dict, Optional[float]]:
+    """
+    NPC data with the gossip it heard since its last turn folded into memory,
+    and when it was read (None if nothing was). Pass that to ack_gossip once
+    the turn's memory is kept; until then the gossip stays in the inbox.
+    """
+    if not GOSSIP_ENABLED or session_id == SHARED_SESSION:
+        return npc_data, None
+    read_at = time.monotonic()
+    heard = gossip_bus.peek(session_id, npc_id)
+    if not heard:
+        return npc_data, None
+    return {**npc_data, "memory": fold_gossip(npc_data.get("memory") or {}, heard)}, read_at
+
+
+def ack_gossip(session_id: str, npc_id: str, read_at: Optional[float]) -> None:
+    """Forget the gossip take_gossip folded in, now that the memory holding it is kept."""
+    if read_at is not None:
+        gossip_bus.ack(session_id, npc_id, read_at)
+
+
+def sync_roster(session_id: str, npcs: dict[str, dict]) -> None:
+    if GOSSIP_ENABLED and session_id != SHARED_SESSION:
+        gossip_bus.sync(session_id, npcs)
+
+
+def publish_player_events(session_id: str, events: list, npcs: dict[str, dict]) -> None:
+    """
+    Publish the player events a world tick consumes. Each is about the first
+    roster NPC it mentions, if any. Chat lines ("said to <npc>: ...") are
+    skipped because the chat route already published them with the NPC's
+    reaction (publish_outcome).
+    """
+    if not GOSSIP_ENABLED or session_id == SHARED_SESSION:
+        return
+    for event in events:
+        if not isinstance(event, dict) or event.get("source") != "player":
+            continue
+        action = str(event.get("action") or "")
+        if not action or action.startswith(CHAT_EVENT_PREFIX):
+            continue
+        subject = next((npc_id for npc_id in npcs if npc_id in action), None)
+        gossip_bus.publish(session_id, f"the player {action}", subject=subject, weight=PLAYER_ACTION_WEIGHT)
+
+
+def publish_outcome(session_id: str, npc_id: str, cause: str, before: dict, emotion: str, trust_score: int) -> None:
+    """
+    Publish how an NPC came out of a turn. The weight grows with the change in
+    trust and mood. Only a turn that changed both travels beyond the
+    neighbourhood.
+    """
+    if not GOSSIP_ENABLED or session_id == SHARED_SESSION:
+        return
+    trust_delta = trust_score - before.get("trust_score", 5)
+    mood_changed = emotion != before.get("emotion", "NEUTRAL")
+    weight = 0.5 + 0.25 * abs(trust_delta) + (0.5 if mood_changed else 0.0)
+    if trust_delta < 0:
+        feeling = "now trusts the player less"
+    elif trust_delta > 0:
+        feeling = "now trusts the player more"
+    else:
+        feeling = "feels the same about the player"
+    mood = f" and is {emotion.lower()}" if mood_changed else ""
+    gossip_bus.publish(session_id, f"{cause}; {npc_id} {feeling}{mood}", subject=npc_id, weight=weight)
+
+
+def publish_chat(session_id: str, npc_id: str, said: str, before: dict, emotion: str, trust_score: int) -> None:
+    """publish_outcome for a player's chat line, quoting it."""
+    quote = said if len(said) <= 80 else said[:79].rstrip() + "…"
+    publish_outcome(session_id, npc_id, f'the player told {npc_id} "{quote}"', before, emotion, trust_score)
+
+
+# ── Module-level singleton ──────────────────────────────────────────────────────
+gossip_bus = GossipBus()
@@ -1,19 +1,23 @@
-from langgraph.graph import StateGraph, START, END
 from .state import NPCState
 from .nodes import NodeExecutor
+from ..log import get_logger
+from ..metrics import timed_node
+from ..warmup import Lazy
 
+logger = get_logger("NPC-Graph")
 
-def _build_npc_graph(temperature: float = 0.7):
-    """Build and compile the NPC graph. Called once at module load."""
-    executor = NodeExecutor(temperature=temperature)
+
+def _build_npc_graph(executor: NodeExecutor):
+    """Build and compile the NPC graph. Called once, on first use."""
+    from langgraph.graph import StateGraph, START, END
 
     graph = StateGraph(NPCState)
 
-    graph.add_node("perceive", executor.node_perceive)
-    graph.add_node("evaluate_consciousness", executor.node_evaluate_consciousness)
-    graph.add_node("update_memory", executor.node_update_memory)
-    graph.add_node("generate_response", executor.node_generate_response)
-    graph.add_node("validate_output", executor.node_validate_output)
+    graph.add_node("perceive", timed_node("npc", "perceive", executor.node_perceive))
+    graph.add_node("evaluate_consciousness", timed_node("npc", "evaluate_consciousness", executor.node_evaluate_consciousness))
+    graph.add_node("update_memory", timed_node("npc", "update_memory", executor.node_update_memory))
+    graph.add_node("generate_response", timed_node("npc", "generate_response", executor.node_generate_response))
+    graph.add_node("validate_output", timed_node("npc", "validate_output", executor.node_validate_output))
 
     graph.add_edge(START, "perceive")
     graph.add_edge("perceive", "evaluate_consciousness")
@@ -31,13 +35,17 @@ def _build_npc_graph(temperature: float = 0.7):
     return compiled_graph
 
 
-# ── Module-level singleton ──────────────────────────────────────────────────
+# ── Module-level singletons ─────────────────────────────────────────────────
 # Each invocation is stateless — the frontend sends the full NPC state every call.
-print("[NPC-Graph] Building singleton NPC graph...")
-npc_graph = _build_npc_graph()
-print("[NPC-Graph] Singleton NPC graph ready.")
+# Built on first use (or by the startup warm-up), not at import: see backend/warmup.py.
+npc_executor = Lazy(  # shared with non-graph callers (crowd reactions, fallback turns)
+    "npc_executor",
+    lambda: NodeExecutor(temperature=0.7),
+    models=lambda executor: [("npc", llm) for llm in executor.tiers.distinct()],
+)
+npc_graph = Lazy("npc_graph", lambda: _build_npc_graph(npc_executor.get()))
 
 
 def create_npc_graph(temperature: float = 0.7):
     """Backward-compatible wrapper — returns the module-level singleton."""
-    return npc_graph
+    return npc_graph.get()
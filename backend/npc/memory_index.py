@@ -0,0 +1,210 @@
+"""
+Relevant-memory retrieval for NPC prompts.
+
+Besides the short, capped lists in Memory, each NPC keeps `log`: one entry per
+interaction, appended and never rewritten (log_entry). The log only drops its
+oldest entries in chunks once it passes NPC_MEMORY_LOG_MAX. The whole log rides
+on every /react and, for each active NPC, on every /tick, so the cap stays at a
+few hundred entries. Prompts no longer have to rely on the most recent entries
+alone. `recall` ranks the whole log against the current player action with
+BM25 and returns the best matches, oldest first, up to NPC_MEMORY_RECALL_K
+entries and about NPC_MEMORY_RECALL_TOKENS tokens. So "you threatened the
+guard earlier" still comes up fifty turns later.
+
+The index (MemoryIndex) is pure Python and incremental. Adding an entry only
+touches the postings of its own terms, and a query only walks the postings of
+its terms. Indexes are cached per player session and NPC
+(NPC_MEMORY_INDEX_CACHE, LRU). The log arrives with every request, so a cached
+index is reused only when the log still starts with exactly the entries it
+has indexed, and new entries are then added to it. Any other log, for example
+one whose oldest entries were dropped, gets a fresh index. A cached index is
+shared by concurrent turns, so it is only extended or searched under its lock.
+
+Environment:
+    NPC_MEMORY_RECALL_K        most memories recalled into a prompt (default 5)
+    NPC_MEMORY_RECALL_TOKENS   token budget of the recalled block, ~4 chars/token (default 200)
+    NPC_MEMORY_LOG_MAX         entries kept in an NPC's log (default 300)
+    NPC_MEMORY_INDEX_CACHE     NPC indexes kept in memory per process (default 256)
+"""
+
+import heapq
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Optional
+
+from ..metrics import record_cache
+
+RECALL_K = int(os.getenv("NPC_MEMORY_RECALL_K", "5"))
+RECALL_TOKENS = int(os.getenv("NPC_MEMORY_RECALL_TOKENS", "200"))
+LOG_MAX = int(os.getenv("NPC_MEMORY_LOG_MAX", "300"))
+INDEX_CACHE_SIZE = int(os.getenv("NPC_MEMORY_INDEX_CACHE", "256"))
+
+NOTHING_RECALLED = "(nothing comes to mind)"
+
+_TOKEN = re.compile(r"[a-z0-9']+")
+_STOPWORDS = frozenset("""
+    a about after again all am an and any are as at be been before being but by can could did do does
+    for from had has have he her here him his how i i'm if in into is it it's its just me more my no not
+    now of on or our out over she so some than that the their them then there these they this to too up
+    us very was we were what when where which who why will with would you you're your
+    emotion trust action
+""".split())
+_SUFFIXES = ("ing", "ed", "es", "s")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lower-cased words without stopwords or numbers, with common suffixes stripped."""
+    terms = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in _STOPWORDS or token.isdigit():
+            continue
+        for suffix in _SUFFIXES:
+            if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+                token = token[:-len(suffix)]
+                break
+        terms.append(token)
+    return terms
+
+
+def log_entry(player_action: str, emotion: str, trust_score: int) -> str:
+    """One log line, in the same format as relationship_history."""
+    return f"Action: {player_action} | Emotion: {emotion} | Trust: {trust_score}/10"
+
+
+def append_log(log: Optional[list[str]], entry: str) -> list[str]:
+    """The log with `entry` appended. Past LOG_MAX, the oldest tenth is dropped at once."""
+    log = list(log or [])
+    log.append(entry)
+    if len(log) > LOG_MAX:
+        log = log[len(log) - LOG_MAX + LOG_MAX // 10:]
+    return log
+
+
+class MemoryIndex:
+    """Okapi BM25 over a growing list of documents."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.docs: list[str] = []
+        self._lengths: list[int] = []
+        self._total_length = 0
+        self._postings: dict[str, dict[int, int]] = {}  # term -> {doc id: term frequency}
+        self._norm_cache: list[float] = []
+        self.lock = threading.Lock()  # held to extend or search an index shared through the cache
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def add(self, text: str) -> None:
+        doc_id = len(self.docs)
+        terms = tokenize(text)
+        self.docs.append(text)
+        self._lengths.append(len(terms))
+        self._total_length += len(terms)
+        for term, tf in Counter(terms).items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+
+    def _norms(self) -> list[float]:
+        """Per-doc length normalisation k1 * (1 - b + b * len / avg len), recomputed after adds."""
+        if len(self._norm_cache) != len(self.docs):
+            scale = self.k1 * self.b / ((self._total_length / len(self.docs)) or 1.0)
+            base = self.k1 * (1.0 - self.b)
+            self._norm_cache = [base + scale * length for length in self._lengths]
+        return self._norm_cache
+
+    def search(self, query: str, k: int) -> list[tuple[int, float]]:
+        """The k best (doc id, score) pairs for `query`; ties go to the more recent doc."""
+        n = len(self.docs)
+        matched = [postings for postings in map(self._postings.get, set(tokenize(query))) if postings]
+        if not matched or k <= 0:
+            return []
+        norms = self._norms()
+        weights = [math.log(1.0 + (n - len(p) + 0.5) / (len(p) + 0.5)) * (self.k1 + 1.0) for p in matched]
+
+        if sum(map(len, matched)) < n // 4:
+            # Rare terms: accumulate only the docs they occur in.
+            scores: dict[int, float] = {}
+            get = scores.get
+            for weight, postings in zip(weights, matched):
+                for doc_id, tf in postings.items():
+                    scores[doc_id] = get(doc_id, 0.0) + weight * tf / (tf + norms[doc_id])
+            return heapq.nlargest(k, scores.items(), key=lambda item: (item[1], item[0]))
+
+        # Common terms touch most docs; a flat array is cheaper than a dict.
+        acc = [0.0] * n
+        for weight, postings in zip(weights, matched):
+            for doc_id, tf in postings.items():
+                acc[doc_id] += weight * tf / (tf + norms[doc_id])
+        best = heapq.nlargest(k, range(n - 1, -1, -1), key=acc.__getitem__)
+        return [(doc_id, acc[doc_id]) for doc_id in best if acc[doc_id] > 0.0]
+
+
+_indexes: "OrderedDict[tuple[str, str], MemoryIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def index_for(session_id: str, npc_id: str, log: list[str]) -> MemoryIndex:
+    """
+    The cached index of this player's NPC log, brought up to date, or a new
+    one. A cached index only ever grows, so its first len(log) entries stay
+    this log even if a concurrent turn extends it further.
+    """
+    key = (session_id, npc_id)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+    reusable = False
+    if index is not None:
+        with index.lock:
+            indexed = len(index)
+            reusable = indexed <= len(log) and index.docs == log[:indexed]
+            if reusable:
+                for entry in log[indexed:]:
+                    index.add(entry)
+    record_cache("memory_index", hit=reusable)
+    if reusable:
+        return index
+
+    index = MemoryIndex()
+    for entry in log:
+        index.add(entry)
+    with _indexes_lock:
+        _indexes[key] = index
+        _indexes.move_to_end(key)
+        while len(_indexes) > INDEX_CACHE_SIZE:
+            _indexes.popitem(last=False)
+    return index
+
+
+def recall(session_id: str, npc_id: str, memory: dict, query: str,
+           k: int = None, token_budget: int = None) -> list[str]:
+    """Log entries most relevant to `query`, oldest first, within k entries and the token budget."""
+    log = memory.get("log") or []
+    if not log or not query:
+        return []
+    k = RECALL_K if k is None else k
+    budget = RECALL_TOKENS if token_budget is None else token_budget
+    index = index_for(session_id, npc_id, log)
+    with index.lock:
+        hits = index.search(query, k)
+    chosen = []
+    for doc_id, _ in hits:
+        if doc_id >= len(log):
+            continue  # added by a concurrent, later turn
+        cost = len(index.docs[doc_id]) // 4 + 1
+        if cost > budget:
+            continue
+        budget -= cost
+        chosen.append(doc_id)
+    return [index.docs[doc_id] for doc_id in sorted(chosen)]
+
+
+def render_recall(session_id: str, npc_id: str, memory: dict, query: str) -> str:
+    """The prompt block of recalled memories."""
+    recalled = recall(session_id, npc_id, memory, query)
+    return "\n".join(f"- {entry}" for entry in recalled) if recalled else NOTHING_RECALLED
@@ -1,21 +1,34 @@
 import os
-import traceback
 import urllib.request
 import re
-from langchain_ollama import ChatOllama
-from langchain_core.output_parsers import StrOutputParser, JsonOutputParser
 from .state import NPCState, Memory, Event
 from .trigger_system import TriggerSystem
+from .context import render_history
+from .memory_index import NOTHING_RECALLED, append_log, log_entry, render_recall
+from .summarizer import SUMMARY_BATCHING, SUMMARY_KEEP, SUMMARY_THRESHOLD, apply_summary, memory_summarizer
 from .output_schema import NPCResponse
+from ..cassette import cassette_mode, with_cassette
+from ..hedging import with_hedging
+from ..llm_client import ainvoke_llm
+from ..log import get_logger
+from ..model_tiers import ModelSpec, ModelTiers
 from .prompts import (
     SYSTEM_EVALUATE_CONSCIOUSNESS,
     SYSTEM_GENERATE_RESPONSE,
     SYSTEM_VALIDATE,
 )
+from dataclasses import replace
 from datetime import datetime
 from typing import Optional
 import json
 
+init_log = get_logger("NPC-Init")
+perceive_log = get_logger("NPC-Perceive")
+consciousness_log = get_logger("NPC-Consciousness")
+memory_log = get_logger("NPC-Memory")
+response_log = get_logger("NPC-Response")
+validate_log = get_logger("NPC-Validate")
+
 
 def _trim_dialogue(text: str, max_sentences: int = 2, max_chars: int = 240) -> str:
     """Constrain dialogue to a few sentences and length to keep replies short."""
@@ -29,94 +42,185 @@ def _trim_dialogue(text: str, max_sentences: int = 2, max_chars: int = 240) -> s
     return trimmed
 
 
+def remember_interaction(memory: dict, player_action: str, emotion: str, trust_score: int) -> Memory:
+    """
+    Fold one interaction into memory without any LLM call: append to short-term
+    memory and the log and, when the NPC is not neutral, to relationship history.
+    A finished batched summary is folded in; starting one is left to the next
+    full graph run (node_update_memory).
+    """
+    memory = apply_summary(memory)
+    short_term = list(memory.get("short_term", []))
+    short_term.append(f"[Trust: {trust_score}/10] {player_action}")
+
+    relationship_history = list(memory.get("relationship_history", []))
+    if emotion != "NEUTRAL" or trust_score != 5:
+        relationship_history.append(
+            f"Action: {player_action} | Emotion: {emotion} | Trust: {trust_score}/10"
+        )
+
+    remembered = {
+        "short_term": short_term[-10:],
+        "long_term_summary": memory.get("long_term_summary", ""),
+        "relationship_history": relationship_history[-10:],
+        "log": append_log(memory.get("log"), log_entry(player_action, emotion, trust_score)),
+    }
+    if memory.get("pending_summary"):
+        remembered["pending_summary"] = memory["pending_summary"]
+    return remembered
+
+
 def _is_ollama_available(base_url: str) -> bool:
     """Quick HTTP check to see if Ollama is running."""
     try:
         with urllib.request.urlopen(f"{base_url}/api/tags", timeout=3) as resp:
             return resp.status == 200
     except Exception as e:
-        print(f"[NPC-Init] Ollama health check failed: {type(e).__name__}: {e}")
+        init_log.warning("Ollama health check failed: %s: %s", type(e).__name__, e)
         return False
 
 
-def _make_groq_llm(model: str, temperature: float):
-    """Create a Groq LLM instance using GROQ_API_KEY from env."""
+def _model_kwargs(max_tokens: Optional[int]) -> dict:
+    return {} if max_tokens is None else {"max_tokens": max_tokens}
+
+
+def _make_groq_llm(model: str, temperature: float, api_key: str = None, max_tokens: Optional[int] = None):
+    """Create a Groq LLM instance using GROQ_API_KEY from env (unless a key is given)."""
     from langchain_groq import ChatGroq
-    api_key = os.getenv("GROQ_API_KEY")
+    api_key = api_key or os.getenv("GROQ_API_KEY")
     if not api_key:
-        print(f"[NPC-Init] ERROR: GROQ_API_KEY is not set in .env")
+        init_log.error("GROQ_API_KEY is not set in .env")
         raise EnvironmentError("GROQ_API_KEY is not set. Add it to your .env file.")
-    print(f"[NPC-Init] Using Groq | model={model}")
-    return ChatGroq(model=model, api_key=api_key, temperature=temperature)
+    init_log.info("Using Groq | model=%s", model)
+    return ChatGroq(model=model, api_key=api_key, temperature=temperature, **_model_kwargs(max_tokens))
 
 
 MISTRAL_DEFAULT_MODEL = "mistral-large-latest"
 
 
-def _make_mistral_llm(model: str, temperature: float):
-    """Create a Mistral AI LLM instance using MISTRAL_API_KEY from env."""
+def _make_mistral_llm(model: str, temperature: float, api_key: str = None, max_tokens: Optional[int] = None):
+    """Create a Mistral AI LLM instance using MISTRAL_API_KEY from env (unless a key is given)."""
     from langchain_mistralai import ChatMistralAI
-    api_key = os.getenv("MISTRAL_API_KEY")
+    api_key = api_key or os.getenv("MISTRAL_API_KEY")
     if not api_key:
-        print(f"[NPC-Init] ERROR: MISTRAL_API_KEY is not set in .env")
+        init_log.error("MISTRAL_API_KEY is not set in .env")
         raise EnvironmentError("MISTRAL_API_KEY is not set. Add it to your .env file.")
-    print(f"[NPC-Init] Using Mistral | model={model}")
-    return ChatMistralAI(model=model, api_key=api_key, temperature=temperature)
+    init_log.info("Using Mistral | model=%s", model)
+    return ChatMistralAI(model=model, api_key=api_key, temperature=temperature, **_model_kwargs(max_tokens))
 
 
 GROQ_DEFAULT_MODEL = "llama-3.3-70b-versatile"
 
+# Call sites of the NPC pipeline, each of which can get its own model tier
+NPC_LLM_NODES = ("consciousness", "summary", "dialogue", "crowd", "bark")
+
+
+def _default_model(provider: str, llm_model: str) -> str:
+    """The model a provider uses when none is configured for it explicitly."""
+    if provider == "groq":
+        return os.getenv("GROQ_MODEL", GROQ_DEFAULT_MODEL)
+    if provider == "mistral":
+        return os.getenv("MISTRAL_MODEL", MISTRAL_DEFAULT_MODEL)
+    if provider == "stub":
+        return "stub"
+    return llm_model
+
+
+def _make_llm(spec: ModelSpec, hedge: bool = False):
+    """
+    Build an NPC chat model for `spec`. With hedge=True this is the secondary
+    backend for hedged calls: it uses LLM_HEDGE_API_KEY when set (a second key
+    for the same provider), and the stub draws from another seed so that its
+    stalls are independent of the primary's.
+    """
+    provider, temperature, max_tokens = spec.provider, spec.temperature, spec.max_tokens
+    api_key = os.getenv("LLM_HEDGE_API_KEY") if hedge else None
+    if provider == "groq":
+        return _make_groq_llm(model=spec.model, temperature=temperature, api_key=api_key, max_tokens=max_tokens)
+    elif provider == "mistral":
+        return _make_mistral_llm(model=spec.model, temperature=temperature, api_key=api_key, max_tokens=max_tokens)
+    elif provider == "openai":
+        from langchain_openai import ChatOpenAI
+        return ChatOpenAI(model=spec.model, temperature=temperature, **_model_kwargs(max_tokens))
+    elif provider == "stub":
+        from ..stub_llm import StubChatModel
+        init_log.info("Using offline stub model (load testing) | model=%s", spec.model)
+        if hedge:
+            return StubChatModel(model=spec.model, seed=int(os.getenv("STUB_LLM_SEED", "0")) + 1)
+        return StubChatModel(model=spec.model)
+    elif provider == "ollama":
+        base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+        init_log.info("Checking Ollama availability at %s...", base_url)
+        if _is_ollama_available(base_url):
+            init_log.info("Ollama is available, connecting")
+            from langchain_ollama import ChatOllama
+            extra = {} if max_tokens is None else {"num_predict": max_tokens}
+            return ChatOllama(model=spec.model, base_url=base_url, temperature=temperature, **extra)
+        else:
+            init_log.warning("Ollama not reachable at %s, falling back to Groq", base_url)
+            return _make_groq_llm(
+                model=os.getenv("GROQ_MODEL", GROQ_DEFAULT_MODEL),
+                temperature=temperature,
+                max_tokens=max_tokens,
+            )
+    else:
+        init_log.error("Unknown LLM provider '%s'", provider)
+        raise ValueError(f"Unknown LLM provider: '{provider}'. Supported: ollama, groq, openai")
+        raise ValueError(f"Unknown LLM provider: '{provider}'. Supported: ollama, groq, mistral, openai")
+
 
 class NodeExecutor:
     def __init__(self, llm_model: str = None, temperature: float = 0.7):
         provider = os.getenv("LLM_PROVIDER", "ollama").lower()
         llm_model = llm_model or os.getenv("LLM_MODEL", "llama2")
 
-        print(f"[NPC-Init] Initializing NodeExecutor | provider={provider} | model={llm_model}")
-
-        if provider == "groq":
-            self.llm = _make_groq_llm(
-                model=os.getenv("GROQ_MODEL", GROQ_DEFAULT_MODEL),
-                temperature=temperature,
-            )
-        elif provider == "mistral":
-            self.llm = _make_mistral_llm(
-                model=os.getenv("MISTRAL_MODEL", MISTRAL_DEFAULT_MODEL),
-                temperature=temperature,
-            )
-        elif provider == "openai":
-            from langchain_openai import ChatOpenAI
-            self.llm = ChatOpenAI(model=llm_model, temperature=temperature)
-        elif provider == "ollama":
-            base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
-            print(f"[NPC-Init] Checking Ollama availability at {base_url}...")
-            if _is_ollama_available(base_url):
-                print(f"[NPC-Init] Ollama is available, connecting")
-                self.llm = ChatOllama(model=llm_model, base_url=base_url, temperature=temperature)
-            else:
-                print(f"[NPC-Init] Ollama not reachable at {base_url}, falling back to Groq")
-                self.llm = _make_groq_llm(
-                    model=os.getenv("GROQ_MODEL", GROQ_DEFAULT_MODEL),
-                    temperature=temperature,
-                )
-        else:
-            print(f"[NPC-Init] ERROR: Unknown LLM provider '{provider}'")
-            raise ValueError(f"Unknown LLM provider: '{provider}'. Supported: ollama, groq, openai")
-            raise ValueError(f"Unknown LLM provider: '{provider}'. Supported: ollama, groq, mistral, openai")
-
+        init_log.info("Initializing NodeExecutor | provider=%s | model=%s", provider, llm_model)
+
+        if cassette_mode() == "replay":
+            init_log.info("Replaying LLM cassette, no provider is contacted")
+
+        self._base_spec = ModelSpec(provider, _default_model(provider, llm_model), temperature)
+        self._llm_model = llm_model
+        self.tiers = ModelTiers(
+            "npc",
+            NPC_LLM_NODES,
+            self._base_spec,
+            lambda p: _default_model(p, llm_model),
+            self._build_llm,
+        )
+        self.llm = self.tiers.for_node("dialogue")
         self.trigger_system = TriggerSystem()
-        print(f"[NPC-Init] NodeExecutor ready")
+        init_log.info("NodeExecutor ready")
+
+    def _hedge_spec(self, spec: ModelSpec) -> ModelSpec:
+        """LLM_HEDGE_PROVIDER / LLM_HEDGE_MODEL redirect hedges of the pipeline's own model only."""
+        if spec != self._base_spec:
+            return spec
+        provider = os.getenv("LLM_HEDGE_PROVIDER", spec.provider).lower()
+        model = os.getenv("LLM_HEDGE_MODEL") or (
+            spec.model if provider == spec.provider else _default_model(provider, self._llm_model))
+        return replace(spec, provider=provider, model=model)
+
+    def _build_llm(self, spec: ModelSpec):
+        if cassette_mode() == "replay":
+            return with_cassette(None, "npc")
+        llm = with_hedging(_make_llm(spec), "npc", lambda: _make_llm(self._hedge_spec(spec), hedge=True))
+        return with_cassette(llm, "npc")
+
+    def llm_for(self, node: str):
+        """The chat model configured for call site `node` (see model_tiers)."""
+        return self.tiers.for_node(node)
 
     def node_perceive(self, state: NPCState) -> dict:
         npc_id = state.get("npc_id", "unknown")
-        print(f"[NPC-Perceive] [{npc_id}] Starting perception node")
+        perceive_log.debug("[%s] Starting perception node", npc_id)
         try:
             player_action = state["recent_events"][-1]["action"] if state["recent_events"] else "unknown"
-            print(f"[NPC-Perceive] [{npc_id}] Player action: '{player_action}'")
+            perceive_log.debug("[%s] Player action: '%s'", npc_id, player_action)
 
             # Keyword-based trigger detection (no LLM call — saves ~25% of budget)
             triggers = self.trigger_system.get_all_triggers(player_action)
-            print(f"[NPC-Perceive] [{npc_id}] Triggers detected: {triggers}")
+            perceive_log.debug("[%s] Triggers detected: %s", npc_id, triggers)
 
             new_history = state["conversation_history"].copy()
             new_history.append({
@@ -126,19 +230,25 @@ class NodeExecutor:
                 "triggers": triggers,
             })
 
-            print(f"[NPC-Perceive] [{npc_id}] Done")
+            # A batched summary finished since the last turn (summarizer.py)
+            memory = apply_summary(state["memory"])
+
+            perceive_log.debug("[%s] Done", npc_id)
             return {
+                "memory": memory,
                 "conversation_history": new_history,
+                "conversation_context": render_history(new_history),
+                # Past interactions relevant to this action, retrieved once for both LLM nodes
+                "recalled_memories": render_recall(state.get("session_id", "default"), npc_id, memory, player_action),
                 "recent_events": state["recent_events"],
             }
         except Exception as e:
-            print(f"[NPC-Perceive] [{npc_id}] ERROR: {type(e).__name__}: {e}")
-            print(traceback.format_exc())
+            perceive_log.error("[%s] Failed: %s: %s", npc_id, type(e).__name__, e, exc_info=True)
             raise
 
-    def node_evaluate_consciousness(self, state: NPCState) -> dict:
+    async def node_evaluate_consciousness(self, state: NPCState) -> dict:
         npc_id = state.get("npc_id", "unknown")
-        print(f"[NPC-Consciousness] [{npc_id}] Starting consciousness evaluation | trust={state.get('trust_score')} | emotion={state.get('emotion')}")
+        consciousness_log.debug("[%s] Starting consciousness evaluation | trust=%s | emotion=%s", npc_id, state.get("trust_score"), state.get("emotion"))
         try:
             player_action = state["conversation_history"][-1]["content"]
             triggers = state["conversation_history"][-1].get("triggers", {})
@@ -146,15 +256,8 @@ class NodeExecutor:
             memory = state["memory"]
             recent_history = "\n".join(memory.get("relationship_history", [])[-5:])
 
-            # Build conversation context so the LLM knows what was already said
-            conv_history = state.get("conversation_history", [])
-            conv_lines = []
-            for entry in conv_history[:-1]:  # exclude the latest (already in player_action)
-                role = entry.get("role", "unknown")
-                content = entry.get("content", "")
-                label = "[You said]" if role == "npc" else "[Player said]"
-                conv_lines.append(f"{label} {content}")
-            conv_history_str = "\n".join(conv_lines[-10:]) if conv_lines else "(conversation just started)"
+            # Rendered once per turn by node_perceive so the LLM knows what was already said
+            conv_history_str = state.get("conversation_context") or render_history(state["conversation_history"])
 
             prompt = SYSTEM_EVALUATE_CONSCIOUSNESS.format(
                 trust_score=state["trust_score"],
@@ -163,13 +266,14 @@ class NodeExecutor:
                 player_action=player_action,
                 recent_events=", ".join([e["action"] for e in state["recent_events"][-3:]]),
                 memory=memory["long_term_summary"],
+                recalled_memories=state.get("recalled_memories") or NOTHING_RECALLED,
                 conversation_history=conv_history_str,
             )
 
-            print(f"[NPC-Consciousness] [{npc_id}] Calling LLM...")
-            response = self.llm.invoke(prompt)
+            consciousness_log.debug("[%s] Calling LLM...", npc_id)
+            response = await ainvoke_llm(self.llm_for("consciousness"), prompt, pipeline="npc", node="consciousness")
             reasoning_raw = response.content
-            print(f"[NPC-Consciousness] [{npc_id}] LLM response received, len={len(reasoning_raw)}")
+            consciousness_log.debug("[%s] LLM response received, len=%s", npc_id, len(reasoning_raw))
 
             # Parse structured JSON from the LLM response
             lm_trust_delta = 0
@@ -183,24 +287,24 @@ class NodeExecutor:
                     lm_trust_delta = max(-2, min(2, int(parsed.get("trust_delta", 0))))
                     lm_emotion = parsed.get("emotion")
                     reasoning = parsed.get("reasoning", reasoning_raw)
-                    print(f"[NPC-Consciousness] [{npc_id}] Parsed JSON | trust_delta={lm_trust_delta} | emotion={lm_emotion}")
+                    consciousness_log.debug("[%s] Parsed JSON | trust_delta=%s | emotion=%s", npc_id, lm_trust_delta, lm_emotion)
                 else:
-                    print(f"[NPC-Consciousness] [{npc_id}] No JSON found in LLM response, defaulting trust_delta=0")
+                    consciousness_log.debug("[%s] No JSON found in LLM response, defaulting trust_delta=0", npc_id)
             except (json.JSONDecodeError, ValueError, TypeError) as parse_err:
-                print(f"[NPC-Consciousness] [{npc_id}] JSON parse failed ({parse_err}), defaulting trust_delta=0")
+                consciousness_log.warning("[%s] JSON parse failed (%s), defaulting trust_delta=0", npc_id, parse_err)
 
             emotion_trigger = triggers.get("emotion_trigger")
             if emotion_trigger:
                 new_emotion = emotion_trigger["emotion"]
                 trust_delta = emotion_trigger["trust_delta"]
-                print(f"[NPC-Consciousness] [{npc_id}] Emotion trigger fired: emotion={new_emotion} | trust_delta={trust_delta}")
+                consciousness_log.debug("[%s] Emotion trigger fired: emotion=%s | trust_delta=%s", npc_id, new_emotion, trust_delta)
             else:
                 # Use LLM-parsed emotion if available, otherwise keep current
                 new_emotion = lm_emotion if lm_emotion else state["emotion"]
                 trust_delta = lm_trust_delta
 
             new_trust = max(0, min(10, state["trust_score"] + trust_delta))
-            print(f"[NPC-Consciousness] [{npc_id}] Result: emotion={new_emotion} | trust {state['trust_score']} -> {new_trust}")
+            consciousness_log.debug("[%s] Result: emotion=%s | trust %s -> %s", npc_id, new_emotion, state["trust_score"], new_trust)
 
             return {
                 "trust_score": new_trust,
@@ -208,13 +312,12 @@ class NodeExecutor:
                 "internal_reasoning": reasoning,
             }
         except Exception as e:
-            print(f"[NPC-Consciousness] [{npc_id}] ERROR: {type(e).__name__}: {e}")
-            print(traceback.format_exc())
+            consciousness_log.error("[%s] Failed: %s: %s", npc_id, type(e).__name__, e, exc_info=True)
             raise
 
-    def node_update_memory(self, state: NPCState) -> dict:
+    async def node_update_memory(self, state: NPCState) -> dict:
         npc_id = state.get("npc_id", "unknown")
-        print(f"[NPC-Memory] [{npc_id}] Updating memory")
+        memory_log.debug("[%s] Updating memory", npc_id)
         try:
             memory = state["memory"]
             player_action = state["conversation_history"][-1]["content"]
@@ -224,8 +327,15 @@ class NodeExecutor:
 
             # ── Long-term summary generation ──────────────────────────────
             long_term_summary = memory.get("long_term_summary", "")
-            if len(short_term) >= 8:
-                to_summarize = short_term[:-4]
+            pending_summary = memory.get("pending_summary")
+            if len(short_term) >= SUMMARY_THRESHOLD and SUMMARY_BATCHING:
+                # Queued for the next cross-NPC batch; a later turn applies it (summarizer.py)
+                pending_summary = memory_summarizer.submit(
+                    state.get("session_id", "default"), npc_id, long_term_summary,
+                    short_term[:-SUMMARY_KEEP], self.llm_for("summary"))
+                memory_log.debug("[%s] Summary queued | key=%s", npc_id, pending_summary)
+            elif len(short_term) >= SUMMARY_THRESHOLD:
+                to_summarize = short_term[:-SUMMARY_KEEP]
                 summary_prompt = (
                     "You are summarizing an NPC's memory of interactions with a player.\n"
                     f"Previous summary: {long_term_summary or 'None yet.'}\n"
@@ -236,13 +346,13 @@ class NodeExecutor:
                     "Do NOT include any JSON or markdown — just plain sentences."
                 )
                 try:
-                    print(f"[NPC-Memory] [{npc_id}] Generating long-term summary from {len(to_summarize)} entries")
-                    response = self.llm.invoke(summary_prompt)
+                    memory_log.debug("[%s] Generating long-term summary from %s entries", npc_id, len(to_summarize))
+                    response = await ainvoke_llm(self.llm_for("summary"), summary_prompt, pipeline="npc", node="summary")
                     long_term_summary = response.content.strip()
-                    short_term = short_term[-4:]  # keep only recent entries
-                    print(f"[NPC-Memory] [{npc_id}] Summary generated, len={len(long_term_summary)}")
+                    short_term = short_term[-SUMMARY_KEEP:]  # keep only recent entries
+                    memory_log.debug("[%s] Summary generated, len=%s", npc_id, len(long_term_summary))
                 except Exception as summary_err:
-                    print(f"[NPC-Memory] [{npc_id}] Summary generation failed: {summary_err}")
+                    memory_log.warning("[%s] Summary generation failed: %s", npc_id, summary_err)
 
             short_term = short_term[-10:]
 
@@ -257,62 +367,58 @@ class NodeExecutor:
                 "short_term": short_term,
                 "long_term_summary": long_term_summary,
                 "relationship_history": relationship_history,
+                "log": append_log(
+                    memory.get("log"), log_entry(player_action, state["emotion"], state["trust_score"])),
             }
+            if pending_summary:
+                updated_memory["pending_summary"] = pending_summary
 
-            print(f"[NPC-Memory] [{npc_id}] Memory updated | short_term_count={len(short_term)} | history_count={len(relationship_history)} | has_summary={bool(long_term_summary)}")
+            memory_log.debug("[%s] Memory updated | short_term_count=%s | history_count=%s | log_count=%s | has_summary=%s", npc_id, len(short_term), len(relationship_history), len(updated_memory["log"]), bool(long_term_summary))
             return {"memory": updated_memory}
         except Exception as e:
-            print(f"[NPC-Memory] [{npc_id}] ERROR: {type(e).__name__}: {e}")
-            print(traceback.format_exc())
+            memory_log.error("[%s] Failed: %s: %s", npc_id, type(e).__name__, e, exc_info=True)
             raise
 
-    def node_generate_response(self, state: NPCState) -> dict:
+    async def node_generate_response(self, state: NPCState) -> dict:
         npc_id = state.get("npc_id", "unknown")
-        print(f"[NPC-Response] [{npc_id}] Generating response | emotion={state.get('emotion')} | trust={state.get('trust_score')}")
+        response_log.debug("[%s] Generating response | emotion=%s | trust=%s", npc_id, state.get("emotion"), state.get("trust_score"))
         try:
             player_action = state["conversation_history"][-1]["content"]
             memory = state["memory"]
             recent_history = "\n".join(memory.get("relationship_history", [])[-3:])
 
-            # Build conversation context so the LLM doesn't repeat greetings
-            conv_history = state.get("conversation_history", [])
-            conv_lines = []
-            for entry in conv_history[:-1]:  # exclude the latest (already in player_action)
-                role = entry.get("role", "unknown")
-                content = entry.get("content", "")
-                label = "[You said]" if role == "npc" else "[Player said]"
-                conv_lines.append(f"{label} {content}")
-            conv_history_str = "\n".join(conv_lines[-10:]) if conv_lines else "(conversation just started)"
+            # Same block as the consciousness prompt, so the LLM doesn't repeat greetings
+            conv_history_str = state.get("conversation_context") or render_history(state["conversation_history"])
 
             prompt = SYSTEM_GENERATE_RESPONSE.format(
                 persona=state["npc_identity"],
                 trust_score=state["trust_score"],
                 emotion=state["emotion"],
                 relationship_history=recent_history,
+                recalled_memories=state.get("recalled_memories") or NOTHING_RECALLED,
                 player_action=player_action,
                 conversation_history=conv_history_str,
             )
 
-            print(f"[NPC-Response] [{npc_id}] Calling LLM...")
-            response = self.llm.invoke(prompt)
+            response_log.debug("[%s] Calling LLM...", npc_id)
+            response = await ainvoke_llm(self.llm_for("dialogue"), prompt, pipeline="npc", node="dialogue")
             dialogue = _trim_dialogue(response.content)
-            print(f"[NPC-Response] [{npc_id}] LLM response received, len={len(dialogue)}")
+            response_log.debug("[%s] LLM response received, len=%s", npc_id, len(dialogue))
 
             action_trigger = state["conversation_history"][-1]["triggers"].get("action_trigger", "NONE")
-            print(f"[NPC-Response] [{npc_id}] action_trigger={action_trigger}")
+            response_log.debug("[%s] action_trigger=%s", npc_id, action_trigger)
 
             return {
                 "dialogue": dialogue,
                 "action_trigger": action_trigger or "NONE",
             }
         except Exception as e:
-            print(f"[NPC-Response] [{npc_id}] ERROR: {type(e).__name__}: {e}")
-            print(traceback.format_exc())
+            response_log.error("[%s] Failed: %s: %s", npc_id, type(e).__name__, e, exc_info=True)
             raise
 
     def node_validate_output(self, state: NPCState) -> dict:
         npc_id = state.get("npc_id", "unknown")
-        print(f"[NPC-Validate] [{npc_id}] Validating output")
+        validate_log.debug("[%s] Validating output", npc_id)
         try:
             output = NPCResponse(
                 dialogue=state["dialogue"],
@@ -321,8 +427,8 @@ class NodeExecutor:
                 action_trigger=state["action_trigger"],
                 audio_url=None,
             )
-            print(f"[NPC-Validate] [{npc_id}] Validation PASSED | emotion={output.emotion} | trust={output.trust_score}")
+            validate_log.debug("[%s] Validation PASSED | emotion=%s | trust=%s", npc_id, output.emotion, output.trust_score)
             return {"validation_status": "VALID", "output": output.model_dump()}
         except Exception as e:
-            print(f"[NPC-Validate] [{npc_id}] Validation FAILED: {type(e).__name__}: {e}")
+            validate_log.warning("[%s] Validation FAILED: %s: %s", npc_id, type(e).__name__, e)
             return {"validation_status": "INVALID", "error": str(e)}
\ No newline at end of file
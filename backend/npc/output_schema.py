@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Any, Dict, Optional
 
 
 class NPCResponse(BaseModel):
@@ -8,6 +8,9 @@ class NPCResponse(BaseModel):
     trust_score: int = Field(..., ge=0, le=10, description="Trust score from 0-10")
     action_trigger: str = Field(default="NONE", description="Action trigger (ATTACK, PUNCH, WALK_AWAY, GIVE_ITEM, NONE, etc)")
     audio_url: Optional[str] = Field(default=None, description="ElevenLabs TTS audio URL")
+    memory: Optional[Dict[str, Any]] = Field(default=None, description="NPC memory after this turn, to send back with the NPC's next request")
+    degraded: bool = Field(default=False, description="True when the latency budget ran out and the reply came from the local fallback")
+    timings: Optional[Dict[str, Any]] = Field(default=None, description="Per-stage wall time in ms (DEBUG_TIMINGS=1 only)")
 
     class Config:
         json_schema_extra = {
@@ -0,0 +1,145 @@
+"""
+Speculative NPC openers, prepared while the player walks up to an NPC.
+
+The frontend calls /api/npc/prewarm when the player comes within an NPC's
+interactDistance, before they press E. The route builds the NPC graph if it
+is not built yet. Budget permitting, it also runs the NPC's first turn ahead
+of time for a plain greeting (SPECULATIVE_GREETING), TTS included. The result
+is stored under a fingerprint of what the first /react sends about the NPC:
+identity, voice, trust, emotion, memory and the conversation so far (the
+greeting the client seeds it with). World state is left out, so a tick in
+between does not throw the opener away.
+
+If the first /react for that NPC state is a short greeting ("hi", "hello
+there", "good evening"), the stored response is served as it is. Any other
+first message discards it. A speculation that is still running is awaited
+rather than started again. Prepared openers expire after NPC_PREWARM_TTL
+seconds. They live in the shared store, so with several workers the prewarm
+and the first message may land on different processes.
+
+Each speculation takes SPECULATION_COST calls from the global LLM budget
+(budget.py), the same bucket server ticks use. When the bucket is empty,
+nothing is speculated. Outcomes are counted in npcs_npc_prewarm_total, and
+the hit rate is hit / speculated.
+
+Environment:
+    NPC_PREWARM       1 | 0  allow speculative openers (default 1)
+    NPC_PREWARM_TTL   seconds a prepared opener stays usable (default 120)
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+from typing import Awaitable, Callable, Optional
+
+from ..budget import llm_budget
+from ..log import get_logger
+from ..metrics import NPC_PREWARM
+from ..shared_store import StoreBusy, get_store
+
+logger = get_logger("NPC-Prewarm")
+
+PREWARM_ENABLED = os.getenv("NPC_PREWARM", "1").lower() in ("1", "true", "yes")
+PREWARM_TTL = float(os.getenv("NPC_PREWARM_TTL", "120"))
+
+SPECULATIVE_GREETING = "Hello."
+SPECULATION_COST = 2  # consciousness + dialogue
+
+# Request fields an opener depends on; the key is a hash of these.
+KEY_FIELDS = ("npc_id", "npc_identity", "voice_id", "memory", "trust_score", "emotion", "conversation_history")
+
+_GREETING = re.compile(
+    r"^\W*(hi|hello|hey|hiya|howdy|greetings|hail|yo|salutations|well met|"
+    r"good (morning|afternoon|evening|day))\b",
+    re.IGNORECASE,
+)
+_GREETING_MAX_WORDS = 5
+
+_inflight: dict[str, asyncio.Task] = {}
+
+
+def is_greeting(text: str) -> bool:
+    """A short hello with nothing else to answer ("hi!", "hello there", "good evening, captain")."""
+    return bool(_GREETING.match(text)) and len(text.split()) <= _GREETING_MAX_WORDS and "?" not in text
+
+
+def is_opening(history: list[dict]) -> bool:
+    """True until the player has said anything (the client seeds the history with the NPC's greeting)."""
+    return not any(entry.get("role") == "player" for entry in history)
+
+
+def opener_key(npc: dict) -> str:
+    raw = json.dumps({field: npc.get(field) for field in KEY_FIELDS}, sort_keys=True, separators=(",", ":"))
+    return "prewarm:" + hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def speculate(key: str, produce: Callable[[], Awaitable[dict]]) -> str:
+    """
+    Start preparing the opener stored under `key` in the background. Returns
+    ready (already prepared), pending (being prepared), denied (no LLM budget)
+    or disabled.
+    """
+    if not PREWARM_ENABLED:
+        return "disabled"
+    if key in _inflight:
+        return "pending"
+    if get_store().get(key) is not None:
+        return "ready"
+    if not llm_budget.try_acquire(SPECULATION_COST):
+        NPC_PREWARM.labels(outcome="denied").inc()
+        return "denied"
+    NPC_PREWARM.labels(outcome="speculated").inc()
+    task = asyncio.create_task(_prepare(key, produce))
+    _inflight[key] = task
+    task.add_done_callback(lambda _: _inflight.pop(key, None))
+    return "pending"
+
+
+async def _prepare(key: str, produce: Callable[[], Awaitable[dict]]) -> Optional[dict]:
+    try:
+        response = await produce()
+    except Exception as e:
+        NPC_PREWARM.labels(outcome="failed").inc()
+        logger.warning("Speculative opener failed: %s: %s", type(e).__name__, e)
+        return None
+    try:
+        get_store().set(key, response, ttl=PREWARM_TTL)
+    except StoreBusy as e:
+        logger.warning("Speculative opener not stored: %s", e)
+    return response
+
+
+def _discard(key: str) -> None:
+    try:
+        get_store().delete(key)
+    except StoreBusy as e:
+        logger.warning("Prepared opener %s left to expire: %s", key, e)  # its TTL removes it
+
+
+async def claim(key: str, player_action: str) -> Optional[dict]:
+    """
+    The opener prepared under `key` if the player's first message is a
+    greeting, waiting for it if it is still being prepared. A first message
+    that is not a greeting discards the opener. Returns None if there is
+    nothing to serve.
+    """
+    task = _inflight.get(key)
+    store = get_store()
+    if not is_greeting(player_action):
+        if task is not None:
+            task.cancel()
+            NPC_PREWARM.labels(outcome="discarded").inc()
+        elif store.get(key) is not None:
+            _discard(key)
+            NPC_PREWARM.labels(outcome="discarded").inc()
+        return None
+
+    response = await asyncio.shield(task) if task is not None else store.get(key)
+    if response is None:
+        return None
+    _discard(key)
+    NPC_PREWARM.labels(outcome="hit").inc()
+    logger.debug("Serving prepared opener %s", key)
+    return response
@@ -16,6 +16,8 @@ Conversation so far:
 Player Action: {player_action}
 Recent Events: {recent_events}
 Long-term Memory: {memory}
+Past moments this reminds you of:
+{recalled_memories}
 
 Based on this, reason through:
 1. Does this action increase or decrease trust? By how much (0 to ±2)?
@@ -31,6 +33,8 @@ Identity: {persona}
 Trust Score: {trust_score}/10
 Current Emotion: {emotion}
 Recent Relationship Events: {relationship_history}
+Past moments this reminds you of:
+{recalled_memories}
 
 Conversation so far:
 {conversation_history}
@@ -56,3 +60,63 @@ Ensure the output is valid JSON with the required fields:
 - audio_url: optional string or null
 
 If invalid, return an error message. If valid, return 'VALID'."""
+
+SYSTEM_CROWD_REACTION = """You are voicing several NPCs in a game who all witness the same event at once.
+Each NPC reacts independently, in their own voice, based on their persona, trust in the player and current emotion.
+
+Event everyone just witnessed: {event}
+Where: {location} | Weather: {weather} | Time: {time_of_day} | Tension: {tension_level}/10
+
+NPCs present:
+{npc_blocks}
+
+For EACH NPC above, decide:
+1. How the event shifts their trust in the player (integer -2 to +2).
+2. Which emotion they now feel (one of: ANGRY, HAPPY, NEUTRAL, SUSPICIOUS, GRATEFUL, SAD, CONFUSED, EXCITED).
+3. One short line of in-character dialogue (1-2 sentences, under ~220 characters, no name prefix, no quotes, no gestures).
+
+NPCs should not all say the same thing — let their personalities show.
+
+You MUST respond with ONLY a valid JSON object, no extra text:
+{{"reactions": [{{"npc_id": "<id>", "reasoning": "<1 sentence>", "trust_delta": <integer>, "emotion": "<EMOTION>", "dialogue": "<line>"}}, ...]}}"""
+
+CROWD_NPC_BLOCK = """- npc_id: {npc_id}
+  Persona: {persona}
+  Trust: {trust_score}/10 | Emotion: {emotion}
+  Remembers: {memory}"""
+
+SYSTEM_SUMMARIZE_BATCH = """You are summarizing several NPCs' memories of their interactions with a player.
+Each memory belongs to one NPC only. Never mix up what happened to different NPCs.
+
+Memories:
+{npc_blocks}
+
+For EACH memory above, write a concise 2-3 sentence summary of the overall relationship and key events,
+folding the new interactions into the previous summary. Include trust trends and notable moments.
+Plain sentences only, no markdown.
+
+You MUST respond with ONLY a valid JSON object, no extra text:
+{{"summaries": [{{"ref": <ref number>, "summary": "<2-3 sentences>"}}, ...]}}"""
+
+SUMMARY_NPC_BLOCK = """- ref: {ref} (NPC {npc_id})
+  Previous summary: {previous}
+  New interactions:
+{entries}"""
+
+SYSTEM_BARK_LINES = """You are writing short spoken reactions ("barks") for an NPC in a game.
+They will be played whenever this kind of NPC witnesses the event below.
+
+NPC type: {npc_type}
+Persona: {persona}
+Event they just witnessed: {event}
+
+For EACH emotion below, write {variants} different lines this NPC might say while feeling that emotion.
+Emotions: {emotions}
+
+Rules for every line:
+- One sentence, under ~120 characters, spoken aloud by the NPC.
+- No name prefix, no quotation marks, no gestures or stage directions.
+- Don't address the player by name and don't mention specific other characters.
+
+You MUST respond with ONLY a valid JSON object, no extra text:
+{{"lines": {{"<EMOTION>": ["<line>", ...], ...}}}}"""
@@ -1,4 +1,4 @@
-from typing import TypedDict, Optional
+from typing import NotRequired, TypedDict, Optional
 from datetime import datetime
 
 
@@ -12,10 +12,13 @@ class Memory(TypedDict):
     short_term: list[str]
     long_term_summary: str
     relationship_history: list[str]
+    log: NotRequired[list[str]]  # every interaction, append-only; see memory_index.py
+    pending_summary: NotRequired[str]  # key of a batched summary in progress; see summarizer.py
 
 
 class NPCState(TypedDict):
     npc_id: str
+    session_id: NotRequired[str]  # player session; scopes per-player caches such as the memory index
     npc_identity: str
     voice_id: Optional[str]
     memory: Memory
@@ -24,6 +27,8 @@ class NPCState(TypedDict):
     world_state: dict
     recent_events: list[Event]
     conversation_history: list[dict]
+    conversation_context: Optional[str]  # rendered prompt block, see context.py
+    recalled_memories: Optional[str]  # rendered prompt block, see memory_index.py
     internal_reasoning: Optional[str]
     dialogue: Optional[str]
     action_trigger: Optional[str]
@@ -0,0 +1,249 @@
+"""
+Long-term memory summaries, batched across NPCs.
+
+node_update_memory used to summarize inline: whenever an NPC's short-term
+memory reached SUMMARY_THRESHOLD entries, it made one LLM call for that NPC
+alone. When a world directive sets off dozens of NPCs, that is dozens of
+small calls. Now the turn only queues a job and moves on. The job holds the
+previous summary and every short-term entry except the SUMMARY_KEEP most
+recent.
+
+MemorySummarizer collects jobs from all NPCs and sessions. It packs up to
+NPC_SUMMARY_BATCH of them into one structured prompt that returns one summary
+per NPC. A full batch is sent at once. Otherwise the batch is sent once its
+oldest job has waited NPC_SUMMARY_MAX_WAIT seconds.
+
+Results go to the shared store under the job's key, and memory keeps that
+key as `pending_summary`. The key covers the player session, the NPC, the
+previous summary and every entry, so no other player's memory can match it.
+The NPC's next turn (apply_summary) writes the summary to `long_term_summary`
+and drops the summarized entries from the front of `short_term`, the same end
+state the inline call produced one turn earlier. They are dropped by position,
+so a later entry with the same text as a summarized one stays. Applying does not consume the summary.
+Any copy of the memory that still holds the key gets the same result, such as
+a fallback reply computed next to the graph run. The summary expires after
+NPC_SUMMARY_TTL. With several workers, a summary written by one worker is
+picked up by whichever worker serves the NPC next.
+
+An NPC has at most one job per session. A turn that comes before the queued
+job is sent replaces it with a job over its own, longer list of entries.
+While a job is being summarized, later turns wait for it.
+
+Jobs are counted in npcs_npc_summaries_total{outcome}. stats() reports the
+LLM calls the batches made and the calls saved compared with one call per
+NPC.
+
+Environment:
+    NPC_SUMMARY_BATCHING    1 | 0  batch summaries in the background; 0 summarizes inline (default 1)
+    NPC_SUMMARY_BATCH       most NPC summaries per LLM call (default 8)
+    NPC_SUMMARY_MAX_WAIT    seconds a queued summary waits for its batch to fill (default 2)
+    NPC_SUMMARY_TTL         seconds a written summary waits for the NPC's next turn (default 3600)
+"""
+
+import asyncio
+import contextvars
+import hashlib
+import json
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from ..llm_client import ainvoke_llm
+from ..log import get_logger
+from ..metrics import NPC_SUMMARIES
+from ..shared_store import StoreBusy, get_store
+from .prompts import SUMMARY_NPC_BLOCK, SYSTEM_SUMMARIZE_BATCH
+
+logger = get_logger("NPC-Summarizer")
+
+SUMMARY_BATCHING = os.getenv("NPC_SUMMARY_BATCHING", "1").lower() not in ("0", "false", "no")
+SUMMARY_BATCH = max(1, int(os.getenv("NPC_SUMMARY_BATCH", "8")))
+SUMMARY_MAX_WAIT = float(os.getenv("NPC_SUMMARY_MAX_WAIT", "2"))
+SUMMARY_TTL = float(os.getenv("NPC_SUMMARY_TTL", "3600"))
+
+SUMMARY_THRESHOLD = 8  # short-term entries that call for a summary
+SUMMARY_KEEP = 4       # most recent entries left out of it
+
+
+def summary_key(session_id: str, npc_id: str, previous: str, entries: list[str]) -> str:
+    raw = json.dumps([session_id, npc_id, previous, entries], separators=(",", ":"))
+    return "summary:" + hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class SummaryJob:
+    key: str
+    session_id: str
+    npc_id: str
+    previous: str
+    entries: list[str]
+    llm: Any
+    queued_at: float = field(default_factory=time.monotonic)
+
+
+def _build_prompt(jobs: list[SummaryJob]) -> str:
+    blocks = "\n".join(
+        SUMMARY_NPC_BLOCK.format(
+            ref=ref,
+            npc_id=job.npc_id,
+            previous=job.previous or "None yet.",
+            entries="\n".join(f"    {entry}" for entry in job.entries),
+        )
+        for ref, job in enumerate(jobs, 1)
+    )
+    return SYSTEM_SUMMARIZE_BATCH.format(npc_blocks=blocks)
+
+
+def _parse_summaries(raw: str) -> dict[int, str]:
+    """ref -> summary from the model output, tolerating code fences."""
+    match = re.search(r"\{[\s\S]*\}", raw)
+    if not match:
+        raise ValueError("No JSON object in summary response")
+    summaries = json.loads(match.group(0)).get("summaries")
+    if not isinstance(summaries, list):
+        raise ValueError("Summary response has no 'summaries' list")
+    parsed = {}
+    for item in summaries:
+        try:
+            ref, text = int(item["ref"]), str(item["summary"]).strip()
+        except (KeyError, TypeError, ValueError):
+            continue
+        if text:
+            parsed.setdefault(ref, text)
+    return parsed
+
+
+class MemorySummarizer:
+    """Queue of pending NPC summaries, flushed on size or age."""
+
+    def __init__(self, batch_size: int = SUMMARY_BATCH, max_wait: float = SUMMARY_MAX_WAIT):
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self._pending: dict[str, SummaryJob] = {}
+        self._inflight: set[str] = set()
+        self._by_npc: dict[tuple[str, str], str] = {}  # (session, npc) -> key of its queued or in-flight job
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+        # This process's totals; one call per NPC would have cost `jobs` calls.
+        self.jobs = 0
+        self.summaries = 0
+        self.llm_calls = 0
+
+    def submit(self, session_id: str, npc_id: str, previous: str, entries: list[str], llm) -> str:
+        """Queue a summary of `entries` folded into `previous`. Returns the key it will be stored under."""
+        key = summary_key(session_id, npc_id, previous, entries)
+        if key in self._pending or key in self._inflight or get_store().get(key) is not None:
+            return key
+        current = self._by_npc.get((session_id, npc_id))
+        if current in self._inflight:
+            return current  # applied on a later turn, which then queues what is left
+        job = SummaryJob(key, session_id, npc_id, previous, list(entries), llm)
+        replaced = self._pending.pop(current, None) if current else None
+        if replaced is not None:
+            job.queued_at = replaced.queued_at  # keeps its place in the batch
+        else:
+            NPC_SUMMARIES.labels(outcome="queued").inc()
+        self._pending[key] = job
+        self._by_npc[(session_id, npc_id)] = key
+        self._schedule()
+        return key
+
+    def _schedule(self) -> None:
+        if not self._pending:
+            return
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._timer is None:
+            oldest = min(job.queued_at for job in self._pending.values())
+            delay = max(0.0, oldest + self.max_wait - time.monotonic())
+            self._timer = asyncio.get_running_loop().call_later(delay, self._flush)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        jobs = list(self._pending.values())[:self.batch_size]
+        for job in jobs:
+            del self._pending[job.key]
+            self._inflight.add(job.key)
+        # A fresh context: the batch belongs to no single request (deadline, timing, profiler).
+        task = asyncio.create_task(self._summarize(jobs), context=contextvars.Context())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        self._schedule()
+
+    async def _summarize(self, jobs: list[SummaryJob]) -> None:
+        prompt = _build_prompt(jobs)
+        logger.debug("Summarizing %s NPC memories in one call | prompt_len=%s", len(jobs), len(prompt))
+        self.jobs += len(jobs)
+        self.llm_calls += 1
+        try:
+            response = await ainvoke_llm(jobs[0].llm, prompt, pipeline="npc", node="summary")
+            summaries = _parse_summaries(response.content)
+        except Exception as e:
+            summaries = {}
+            logger.warning("Summary batch of %s failed: %s: %s", len(jobs), type(e).__name__, e)
+        finally:
+            self._inflight.difference_update(job.key for job in jobs)
+            for job in jobs:
+                if self._by_npc.get((job.session_id, job.npc_id)) == job.key:
+                    del self._by_npc[(job.session_id, job.npc_id)]
+
+        store = get_store()
+        written = 0
+        for ref, job in enumerate(jobs, 1):
+            summary = summaries.get(ref)
+            if summary is None:
+                NPC_SUMMARIES.labels(outcome="failed").inc()
+                continue
+            try:
+                store.set(job.key, {"summary": summary, "entries": job.entries, "count": len(job.entries)},
+                          ttl=SUMMARY_TTL)
+            except StoreBusy as e:
+                logger.warning("Summary for %s not stored: %s", job.npc_id, e)  # re-queued on its next turn
+                NPC_SUMMARIES.labels(outcome="failed").inc()
+                continue
+            NPC_SUMMARIES.labels(outcome="written").inc()
+            written += 1
+        self.summaries += written
+        logger.info("Summary batch done | written=%s/%s", written, len(jobs))
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "in_flight": len(self._inflight),
+            "summarized": self.jobs,
+            "written": self.summaries,
+            "llm_calls": self.llm_calls,
+            "calls_saved": self.jobs - self.llm_calls,
+        }
+
+
+def apply_summary(memory: dict) -> dict:
+    """
+    Memory with its finished summary folded in: `long_term_summary` replaced
+    and the summarized entries dropped from `short_term`, if it still starts
+    with them. Memory without a finished summary is returned as it is. The
+    stored summary is left to expire, so every copy of the memory holding the
+    key applies it alike.
+    """
+    key = memory.get("pending_summary")
+    if not key:
+        return memory
+    result = get_store().get(key)
+    if result is None:
+        return memory
+    NPC_SUMMARIES.labels(outcome="applied").inc()
+    applied = {name: value for name, value in memory.items() if name != "pending_summary"}
+    applied["long_term_summary"] = result["summary"]
+    short_term = memory.get("short_term", [])
+    count = result.get("count", len(result["entries"]))  # summaries stored before counts were
+    if short_term[:count] == result["entries"]:
+        applied["short_term"] = short_term[count:]
+    return applied
+
+
+# ── Module-level singleton ──────────────────────────────────────────────────────
+memory_summarizer = MemorySummarizer()
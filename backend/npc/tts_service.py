@@ -1,9 +1,20 @@
+import asyncio
 import base64
 import os
 import re
+import threading
+import time
 from io import BytesIO
+from typing import Optional
 import requests
 
+from ..log import get_logger
+from ..metrics import TTS_SECONDS, TTS_BYTES, TTS_REQUESTS
+from ..profiling import profiled_in_thread
+from ..timing import record_stage
+
+logger = get_logger("TTS")
+
 
 def clean_dialogue(dialogue: str) -> str:
     dialogue = re.sub(r'\s+', ' ', dialogue)
@@ -85,23 +96,38 @@ def _resolve_deepgram_model(voice_id: str | None) -> str:
     return "aura-asteria-en"
 
 
-def generate_speech(text: str, voice_id: str = None) -> str:
-    """Generate speech using Deepgram Aura (Aura-2 family) via REST Speak API."""
+_CHUNK_BYTES = 16384
+
 
-    print(f"[TTS] Starting speech generation | text_len={len(text) if text else 0} | voice_id={voice_id}")
+@profiled_in_thread
+def generate_speech(text: str, voice_id: str = None, cancelled: Optional[threading.Event] = None) -> str:
+    """
+    Generate speech using Deepgram Aura (Aura-2 family) via REST Speak API.
+
+    The audio is streamed in chunks; once `cancelled` is set the download is
+    dropped and None is returned (see agenerate_speech).
+    """
+
+    logger.debug("Starting speech generation | text_len=%s | voice_id=%s", len(text) if text else 0, voice_id)
 
     if text is None or not text.strip():
-        print("[TTS] Empty text, skipping TTS")
+        logger.debug("Empty text, skipping TTS")
         return None
 
     api_key = os.getenv("DEEPGRAM_API_KEY")
     if not api_key:
-        print("[TTS] DEEPGRAM_API_KEY missing; cannot generate speech")
+        logger.warning("DEEPGRAM_API_KEY missing; cannot generate speech")
         return None
 
     model = _resolve_deepgram_model(voice_id)
-    url = f"https://api.deepgram.com/v1/speak?model={model}&encoding=mp3"
+    base_url = os.getenv("DEEPGRAM_BASE_URL", "https://api.deepgram.com").rstrip("/")
+    url = f"{base_url}/v1/speak?model={model}&encoding=mp3"
+
+    if cancelled is not None and cancelled.is_set():
+        TTS_REQUESTS.labels(model=model, outcome="cancelled").inc()
+        return None
 
+    start = time.perf_counter()
     try:
         resp = requests.post(
             url,
@@ -112,21 +138,51 @@ def generate_speech(text: str, voice_id: str = None) -> str:
             },
             json={"text": text},
             timeout=30,
+            stream=True,
         )
 
-        if resp.status_code != 200:
-            print(f"[TTS] Deepgram error {resp.status_code}: {resp.text[:200]}")
-            return None
-
-        audio_bytes = resp.content
-        print(f"[TTS] Received {len(audio_bytes)} bytes from Deepgram")
+        with resp:
+            if resp.status_code != 200:
+                elapsed = time.perf_counter() - start
+                TTS_SECONDS.labels(model=model).observe(elapsed)
+                record_stage("tts", elapsed)
+                logger.warning("Deepgram error %s: %s", resp.status_code, resp.text[:200])
+                TTS_REQUESTS.labels(model=model, outcome=f"http_{resp.status_code}").inc()
+                return None
+
+            audio = BytesIO()
+            for chunk in resp.iter_content(_CHUNK_BYTES):
+                if cancelled is not None and cancelled.is_set():
+                    logger.debug("Speech generation cancelled after %s bytes", audio.tell())
+                    record_stage("tts", time.perf_counter() - start)
+                    TTS_REQUESTS.labels(model=model, outcome="cancelled").inc()
+                    return None
+                audio.write(chunk)
+
+        elapsed = time.perf_counter() - start
+        TTS_SECONDS.labels(model=model).observe(elapsed)
+        record_stage("tts", elapsed)
+        audio_bytes = audio.getvalue()
+        logger.debug("Received %s bytes from Deepgram", len(audio_bytes))
+        TTS_REQUESTS.labels(model=model, outcome="ok").inc()
+        TTS_BYTES.labels(model=model).observe(len(audio_bytes))
 
         audio_base64 = base64.b64encode(audio_bytes).decode("utf-8")
         audio_url = f"data:audio/mp3;base64,{audio_base64}"
         return audio_url
 
     except Exception as e:
-        print(f"[TTS] ERROR calling Deepgram: {type(e).__name__}: {e}")
+        logger.error("Failed calling Deepgram: %s: %s", type(e).__name__, e)
+        record_stage("tts", time.perf_counter() - start)
+        TTS_REQUESTS.labels(model=model, outcome="error").inc()
         return None
 
 
+async def agenerate_speech(text: str, voice_id: str = None) -> Optional[str]:
+    """generate_speech on a worker thread; cancelling the awaiting task aborts the Deepgram download."""
+    cancelled = threading.Event()
+    try:
+        return await asyncio.to_thread(generate_speech, text, voice_id, cancelled)
+    except asyncio.CancelledError:
+        cancelled.set()
+        raise
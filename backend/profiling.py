@@ -0,0 +1,223 @@
+"""
+Opt-in per-request sampling profiler writing collapsed-stack flamegraph files.
+
+With PROFILE_REQUESTS=1 an ASGI middleware profiles any HTTP request that
+carries `X-Profile: 1`, plus a random PROFILE_SAMPLE_RATE fraction of all
+others. While such a request runs, a sampler thread records a stack every
+PROFILE_INTERVAL_MS, from three kinds of place:
+
+  [on-cpu]     the event loop thread, while the request's own task is running
+  [awaiting]   the request task's coroutine chain while it is suspended, so
+               wall time spent in awaits (graph runs, LLM calls) shows up too
+  [thread]     executor threads doing work for the request — sync graph nodes
+               and TTS calls, which register themselves via `profiled_in_thread`
+
+Stacks go to PROFILE_DIR/<endpoint>.<request id>.collapsed in Brendan Gregg's
+collapsed format (`frame;frame;frame count`). Open the file in speedscope or
+pipe it to flamegraph.pl. The file name is returned in an `X-Profile` response
+header.
+
+When PROFILE_REQUESTS is unset, no middleware is installed and
+`profiled_in_thread` returns the function unchanged, so nothing is added to
+any request path.
+
+Environment:
+    PROFILE_REQUESTS      1 | 0    install the profiling middleware (default 0)
+    PROFILE_SAMPLE_RATE   0..1     fraction of requests profiled without the header (default 0)
+    PROFILE_INTERVAL_MS   ms       sampling interval (default 5)
+    PROFILE_DIR           path     output directory (default profiles)
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+import random
+import re
+import sys
+import threading
+from collections import Counter
+from typing import Callable, Optional
+
+from .log import get_logger, request_id_var
+
+logger = get_logger("Profile")
+
+PROFILING_ENABLED = os.getenv("PROFILE_REQUESTS", "0").lower() in ("1", "true", "yes")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000.0
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+_active: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar("request_profile", default=None)
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_UNSAFE = re.compile(r"[^A-Za-z0-9_.\-]+")
+
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    if filename.startswith(_ROOT):
+        filename = os.path.relpath(filename, _ROOT)
+    else:
+        filename = os.path.basename(filename)
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _thread_stack(frame) -> list[str]:
+    stack = []
+    while frame is not None:
+        stack.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _await_stack(coro) -> list[str]:
+    """Outermost-first labels of a suspended coroutine's await chain."""
+    stack = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None) or getattr(coro, "ag_frame", None)
+        if frame is None:
+            stack.append(f"<{type(coro).__name__}>")
+            break
+        stack.append(_frame_label(frame.f_code))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None) or getattr(coro, "ag_await", None)
+    return stack
+
+
+class RequestProfile:
+    """Stack samples for one request, collected by a background sampler thread."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, task: asyncio.Task, path: str):
+        self.loop = loop
+        self.task = task
+        self.loop_thread = threading.get_ident()
+        self.path = path
+        self.samples: Counter = Counter()
+        self._threads: dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    # ── Worker thread registration ──
+
+    def enter_thread(self) -> None:
+        ident = threading.get_ident()
+        with self._lock:
+            self._threads[ident] = self._threads.get(ident, 0) + 1
+
+    def exit_thread(self) -> None:
+        ident = threading.get_ident()
+        with self._lock:
+            depth = self._threads.get(ident, 0) - 1
+            if depth > 0:
+                self._threads[ident] = depth
+            else:
+                self._threads.pop(ident, None)
+
+    # ── Sampling ──
+
+    def start(self) -> None:
+        self._sampler.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._sampler.join()
+
+    def _sample(self) -> None:
+        frames = sys._current_frames()
+        if asyncio.current_task(self.loop) is self.task:
+            frame = frames.get(self.loop_thread)
+            if frame is not None:
+                self.samples[("[on-cpu]", *_thread_stack(frame))] += 1
+        elif not self.task.done():
+            self.samples[("[awaiting]", *_await_stack(self.task.get_coro()))] += 1
+        with self._lock:
+            threads = list(self._threads)
+        for ident in threads:
+            frame = frames.get(ident)
+            if frame is not None:
+                self.samples[("[thread]", *_thread_stack(frame))] += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(PROFILE_INTERVAL):
+            try:
+                self._sample()
+            except Exception as e:  # a racing frame must never take the request down
+                logger.debug("Sample skipped: %s: %s", type(e).__name__, e)
+
+    # ── Output ──
+
+    def write(self, filename: str) -> None:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, filename)
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+        logger.info("Wrote %s | samples=%s | interval_ms=%s", path, sum(self.samples.values()), PROFILE_INTERVAL * 1000)
+
+
+def profiled_in_thread(fn: Callable) -> Callable:
+    """
+    Mark a function that runs in an executor thread on behalf of a request so
+    the request's profiler samples that thread too. Returns `fn` unchanged when
+    profiling is disabled.
+    """
+    if not PROFILING_ENABLED:
+        return fn
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        profile = _active.get()
+        if profile is None:
+            return fn(*args, **kwargs)
+        profile.enter_thread()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.exit_thread()
+    return wrapper
+
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI middleware, so the endpoint runs inside the task it profiles.
+    Install it inside the request-tracking middleware, so that the correlation
+    id is already set.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _wanted(self, scope) -> bool:
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            return False
+        for name, value in scope.get("headers", ()):
+            if name == b"x-profile":
+                return value.strip() in (b"1", b"true", b"yes")
+        return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        endpoint = _UNSAFE.sub("_", f"{scope['method']}{scope['path']}").strip("_")
+        filename = f"{endpoint}.{_UNSAFE.sub('_', request_id_var.get())}.collapsed"
+
+        async def send_with_header(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-profile", filename.encode())]
+            await send(message)
+
+        profile = RequestProfile(asyncio.get_running_loop(), asyncio.current_task(), scope["path"])
+        token = _active.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, send_with_header)
+        finally:
+            _active.reset(token)
+            profile.stop()
+            await asyncio.to_thread(profile.write, filename)
@@ -1,4 +1,5 @@
 from .npc import router as npc_router
 from .world import router as world_router
+from .session import router as session_router
 
-__all__ = ["npc_router", "world_router"]
+__all__ = ["npc_router", "world_router", "session_router"]
@@ -1,11 +1,25 @@
-import traceback
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import List, Dict, Any
-from ..npc import npc_graph, NPCState, Memory, Event, NPCResponse
-from ..npc.tts_service import clean_dialogue, generate_speech
+import asyncio
+import os
+import time
+from fastapi import APIRouter, Header, HTTPException, Request, Response
+from pydantic import BaseModel, Field
+from typing import List, Dict, Any, Optional
+from ..npc import npc_graph, npc_executor, NPCState, Memory, Event, NPCResponse
+from ..npc.fallback import fallback_turn
+from ..npc.gossip import ack_gossip, publish_chat, take_gossip
+from ..npc.prewarm import SPECULATIVE_GREETING, KEY_FIELDS, claim, is_opening, opener_key, speculate
+from ..npc.tts_service import clean_dialogue, agenerate_speech, _resolve_deepgram_model
+from ..cancellation import RequestCancelled, run_cancellable
+from ..deadline import Deadline, DeadlineExceeded, budget_seconds, start_deadline
+from ..log import get_logger
+from ..metrics import NPC_DEGRADED, record_cache
+from ..timing import apply_timings, stage, start_timing
 
 router = APIRouter(prefix="/api/npc", tags=["npc"])
+logger = get_logger("Route-NPC")
+
+BATCH_CONCURRENCY = int(os.getenv("NPC_BATCH_CONCURRENCY", "4"))
+BATCH_MAX_ITEMS = int(os.getenv("NPC_BATCH_MAX_ITEMS", "64"))
 
 
 class NPCInputRequest(BaseModel):
@@ -15,61 +29,331 @@ class NPCInputRequest(BaseModel):
     memory: Dict[str, Any]
     trust_score: int
     emotion: str
-    world_state: Dict[str, Any]
+    world_state: Dict[str, Any] = {}
     recent_events: List[Dict[str, Any]]
     conversation_history: List[Dict[str, Any]] = []
+    session_id: str = Field(
+        default="default",
+        description="Player session key, as in /api/world/tick; NPC gossip and memory caches are scoped per session (no gossip for \"default\")",
+    )
+
+
+class NPCBatchRequest(BaseModel):
+    world_state: Dict[str, Any] = Field(
+        default_factory=dict,
+        description="World state shared by every item (an item's own world_state keys take precedence)",
+    )
+    items: List[NPCInputRequest]
+    max_concurrency: Optional[int] = Field(
+        default=None,
+        description="Graph runs in flight at once; capped by NPC_BATCH_CONCURRENCY",
+    )
+
+
+class NPCBatchItemResult(BaseModel):
+    index: int
+    npc_id: str
+    response: Optional[NPCResponse] = None
+    error: Optional[str] = None
+
+
+class NPCBatchResponse(BaseModel):
+    results: List[NPCBatchItemResult]
+    tts_calls: int
+    tts_deduplicated: int
+
+
+class NPCPrewarmRequest(NPCInputRequest):
+    recent_events: List[Dict[str, Any]] = []
+    speculate: bool = Field(
+        default=True,
+        description="Also prepare a speculative opener with TTS, budget permitting",
+    )
+
+
+class NPCPrewarmResponse(BaseModel):
+    npc_id: str
+    opener: str = Field(description="ready | pending | denied | disabled | skipped")
 
 
 class DialogueCleanTest(BaseModel):
     raw_dialogue: str
 
 
-@router.post("/react", response_model=NPCResponse)
-async def npc_react(request: NPCInputRequest) -> NPCResponse:
-    print(f"[Route-NPC] POST /react | npc_id={request.npc_id} | emotion={request.emotion} | trust={request.trust_score} | events_count={len(request.recent_events)}")
+def _build_npc_state(request: NPCInputRequest, world_state: Optional[Dict[str, Any]] = None) -> NPCState:
+    return NPCState(
+        npc_id=request.npc_id,
+        session_id=request.session_id,
+        npc_identity=request.npc_identity,
+        voice_id=request.voice_id,
+        memory=Memory(**request.memory),
+        trust_score=request.trust_score,
+        emotion=request.emotion,
+        world_state=world_state if world_state is not None else request.world_state,
+        recent_events=[Event(**event) for event in request.recent_events],
+        conversation_history=request.conversation_history,
+        conversation_context=None,
+        recalled_memories=None,
+        internal_reasoning=None,
+        dialogue=None,
+        action_trigger=None,
+    )
+
+
+async def _run_npc_graph(request: NPCInputRequest, world_state: Optional[Dict[str, Any]] = None) -> dict:
+    """Run the NPC graph for one request and return the raw final graph state."""
+    state = _build_npc_state(request, world_state)
+    logger.debug("Running NPC graph for npc_id=%s", request.npc_id)
+    graph = await npc_graph.aget()
+    return await graph.ainvoke(state)
+
+
+def _discard_late_result(task: asyncio.Task) -> None:
+    if task.cancelled():
+        return
+    error = task.exception()
+    if isinstance(error, DeadlineExceeded):
+        logger.debug("Abandoned graph run stopped: %s", error)
+    elif error is not None:
+        logger.warning("Abandoned graph run failed: %s: %s", type(error).__name__, error)
+
+
+async def _run_npc_graph_within(
+    request: NPCInputRequest,
+    deadline: Optional[Deadline],
+    route: str,
+    world_state: Optional[Dict[str, Any]] = None,
+) -> tuple[dict, Optional[asyncio.Task]]:
+    """
+    Run the NPC graph, but answer from the local fallback if it has not
+    finished when `deadline` expires. Returns (output, late graph task); the
+    task is None unless the fallback was used, and the output then carries
+    `degraded: True`. Unless the caller set `deadline.keep_running`, the late run
+    stops at its next node.
+    """
+    if deadline is None:
+        return await _run_npc_graph(request, world_state), None
+
+    # Computed up front: the graph's memory node appends to the same lists.
+    executor = await npc_executor.aget()
+    with stage("fallback"):
+        fallback = fallback_turn(executor, _build_npc_state(request, world_state))
+    task = asyncio.create_task(_run_npc_graph(request, world_state))
     try:
-        state = NPCState(
-            npc_id=request.npc_id,
-            npc_identity=request.npc_identity,
-            voice_id=request.voice_id,
-            memory=Memory(**request.memory),
-            trust_score=request.trust_score,
-            emotion=request.emotion,
-            world_state=request.world_state,
-            recent_events=[Event(**event) for event in request.recent_events],
-            conversation_history=request.conversation_history,
-            internal_reasoning=None,
-            dialogue=None,
-            action_trigger=None,
-        )
+        return await asyncio.wait_for(asyncio.shield(task), max(0.0, deadline.remaining())), None
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    except asyncio.TimeoutError:
+        logger.warning("Latency budget of %.0f ms spent for npc_id=%s, answering from fallback", deadline.budget * 1000, request.npc_id)
+        NPC_DEGRADED.labels(route=route).inc()
+        if not deadline.keep_running:
+            task.add_done_callback(_discard_late_result)
+        return {**fallback, "degraded": True}, task
+    except DeadlineExceeded as e:
+        # A node started between the budget running out and wait_for's timer firing
+        logger.warning("Latency budget spent for npc_id=%s (%s), answering from fallback", request.npc_id, e)
+        NPC_DEGRADED.labels(route=route).inc()
+        return {**fallback, "degraded": True}, None
+
+
+async def _speech_within(text: str, voice_id: str, deadline: Optional[Deadline]) -> Optional[str]:
+    """agenerate_speech, given up (None, no audio) once `deadline` expires."""
+    if deadline is None:
+        return await agenerate_speech(text, voice_id)
+    if deadline.expired():
+        logger.debug("Latency budget spent, skipping TTS")
+        return None
+    try:
+        return await asyncio.wait_for(agenerate_speech(text, voice_id), deadline.remaining())
+    except asyncio.TimeoutError:
+        logger.info("Latency budget spent during TTS, answering without audio")
+        return None
 
-        print(f"[Route-NPC] Running NPC graph for npc_id={request.npc_id}")
-        output = npc_graph.invoke(state)
 
-        raw_dialogue = output.get("dialogue", "")
-        print(f"[Route-NPC] Raw dialogue len={len(raw_dialogue)}")
+def _response_from_output(output: dict) -> NPCResponse:
+    """Clean the graph's dialogue and wrap the result as an NPCResponse (no audio yet)."""
+    raw_dialogue = output.get("dialogue", "")
+    logger.debug("Raw dialogue len=%s", len(raw_dialogue))
+    with stage("clean_dialogue"):
         cleaned_dialogue = clean_dialogue(raw_dialogue)
-        print(f"[Route-NPC] Cleaned dialogue len={len(cleaned_dialogue)}")
+    logger.debug("Cleaned dialogue len=%s", len(cleaned_dialogue))
 
-        audio_url = generate_speech(cleaned_dialogue, voice_id=output.get("voice_id", request.voice_id))
-        print(f"[Route-NPC] audio_url={'set' if audio_url else 'None'}")
+    return NPCResponse(
+        dialogue=cleaned_dialogue,
+        emotion=output.get("emotion", "NEUTRAL"),
+        trust_score=output.get("trust_score", 5),
+        action_trigger=output.get("action_trigger", "NONE"),
+        audio_url=None,
+        memory=output.get("memory"),
+        degraded=output.get("degraded", False),
+    )
 
-        response = NPCResponse(
-            dialogue=cleaned_dialogue,
-            emotion=output.get("emotion", "NEUTRAL"),
-            trust_score=output.get("trust_score", 5),
-            action_trigger=output.get("action_trigger", "NONE"),
-            audio_url=audio_url,
-        )
-        print(f"[Route-NPC] Done | npc_id={request.npc_id} | emotion={response.emotion} | trust={response.trust_score} | action_trigger={response.action_trigger}")
+
+async def _run_npc_turn(request: NPCInputRequest, world_state: Optional[Dict[str, Any]] = None) -> NPCResponse:
+    """Run the NPC graph for one request and return the cleaned response (no audio yet)."""
+    return _response_from_output(await _run_npc_graph(request, world_state))
+
+
+async def _react(request: NPCInputRequest, deadline: Optional[Deadline]) -> NPCResponse:
+    output, _ = await _run_npc_graph_within(request, deadline, route="react")
+    response = _response_from_output(output)
+
+    response.audio_url = await _speech_within(response.dialogue, request.voice_id, deadline)
+    logger.debug("audio_url=%s", "set" if response.audio_url else "None")
+    return response
+
+
+async def _react_or_opener(request: NPCInputRequest, deadline: Optional[Deadline]) -> NPCResponse:
+    """_react with gossip, unless this is the player's greeting and /prewarm prepared the reply."""
+    if is_opening(request.conversation_history) and request.recent_events:
+        key = opener_key(request.model_dump(include=set(KEY_FIELDS)))
+        prepared = await claim(key, request.recent_events[-1].get("action", ""))
+        if prepared is not None:
+            logger.info("Served prepared opener | npc_id=%s", request.npc_id)
+            return NPCResponse(**prepared)
+
+    # Gossip heard since the NPC's last turn reaches this prompt; the reply spreads in turn (npc/gossip.py)
+    heard, read_at = take_gossip(request.session_id, request.npc_id, {"memory": request.memory})
+    if heard["memory"] is not request.memory:
+        request = request.model_copy(update={"memory": heard["memory"]})
+    response = await _react(request, deadline)
+    if response.memory is not None:  # the client adopts it, gossip included
+        ack_gossip(request.session_id, request.npc_id, read_at)
+    if request.recent_events:
+        publish_chat(request.session_id, request.npc_id, str(request.recent_events[-1].get("action", "")),
+                     {"trust_score": request.trust_score, "emotion": request.emotion},
+                     response.emotion, response.trust_score)
+    return response
+
+
+@router.post("/react", response_model=NPCResponse)
+async def npc_react(
+    request: NPCInputRequest,
+    http_request: Request,
+    http_response: Response,
+    x_latency_budget_ms: Optional[str] = Header(default=None),
+) -> NPCResponse:
+    logger.info("POST /react | npc_id=%s | emotion=%s | trust=%s | events_count=%s", request.npc_id, request.emotion, request.trust_score, len(request.recent_events))
+    timings = start_timing()
+    deadline = start_deadline(budget_seconds(x_latency_budget_ms))
+    try:
+        response = await run_cancellable(http_request, _react_or_opener(request, deadline), route="react")
+
+        logger.info("Done | npc_id=%s | emotion=%s | trust=%s | action_trigger=%s", request.npc_id, response.emotion, response.trust_score, response.action_trigger)
+        apply_timings(timings, http_response, response)
         return response
 
+    except RequestCancelled as e:
+        logger.info("Cancelled (%s) for npc_id=%s", e.reason, request.npc_id)
+        return Response(status_code=e.status_code)
     except Exception as e:
-        print(f"[Route-NPC] ERROR for npc_id={request.npc_id}: {type(e).__name__}: {e}")
-        print(traceback.format_exc())
+        logger.error("Failed for npc_id=%s: %s: %s", request.npc_id, type(e).__name__, e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"NPC processing error: {str(e)}")
 
 
+@router.post("/prewarm", response_model=NPCPrewarmResponse)
+async def npc_prewarm(request: NPCPrewarmRequest) -> NPCPrewarmResponse:
+    """
+    The player is walking up to this NPC. Build the NPC graph if needed and,
+    unless `speculate` is false, prepare the reply to a greeting so a "hello"
+    as first message is answered at once (see npc/prewarm.py). Returns without
+    waiting for the speculation.
+    """
+    await npc_graph.aget()
+    opener = "skipped"
+    if request.speculate and is_opening(request.conversation_history):
+        fields = request.model_dump(exclude={"speculate"})
+        key = opener_key(fields)
+        fields["recent_events"] = [{"source": "player", "action": SPECULATIVE_GREETING, "time": int(time.time())}]
+        speculative = NPCInputRequest(**fields)
+
+        async def produce() -> dict:
+            # Its memory records the speculative greeting, not the player's; the client keeps its own
+            return (await _react(speculative, None)).model_dump(exclude={"memory"})
+
+        opener = speculate(key, produce)
+    logger.info("POST /prewarm | npc_id=%s | opener=%s", request.npc_id, opener)
+    return NPCPrewarmResponse(npc_id=request.npc_id, opener=opener)
+
+
+@router.post("/react_batch", response_model=NPCBatchResponse)
+async def npc_react_batch(request: NPCBatchRequest, http_request: Request) -> NPCBatchResponse:
+    """
+    React many NPCs in one HTTP request (ambient chatter, load testing).
+
+    Items share the batch world_state (an item's own world_state keys override
+    it), run through the NPC graph concurrently on a bounded pool, and identical
+    (line, voice) pairs are synthesized only once. Results come back in request
+    order; a failing item carries an error instead of failing the whole batch.
+    The whole batch is cancelled if the client disconnects.
+    """
+    if len(request.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many items ({len(request.items)}). Maximum is {BATCH_MAX_ITEMS}.",
+        )
+    try:
+        return await run_cancellable(http_request, _react_batch(request), route="react_batch")
+    except RequestCancelled as e:
+        logger.info("Batch cancelled (%s) | items=%s", e.reason, len(request.items))
+        return Response(status_code=e.status_code)
+
+
+async def _react_batch(request: NPCBatchRequest) -> NPCBatchResponse:
+    concurrency = max(1, min(request.max_concurrency or BATCH_CONCURRENCY, BATCH_CONCURRENCY))
+    logger.info("POST /react_batch | items=%s | concurrency=%s", len(request.items), concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_item(item: NPCInputRequest) -> NPCResponse:
+        async with semaphore:
+            return await _run_npc_turn(item, {**request.world_state, **item.world_state})
+
+    outcomes = await asyncio.gather(
+        *(run_item(item) for item in request.items),
+        return_exceptions=True,
+    )
+
+    # ── TTS: one synthesis per distinct (line, voice model) ──
+    tts_keys: dict[tuple[str, str], str] = {}
+    for item, outcome in zip(request.items, outcomes):
+        if isinstance(outcome, NPCResponse) and outcome.dialogue:
+            key = (outcome.dialogue, _resolve_deepgram_model(item.voice_id))
+            tts_keys.setdefault(key, item.voice_id)
+
+    async def synthesize(key: tuple[str, str]) -> Optional[str]:
+        async with semaphore:
+            return await agenerate_speech(key[0], tts_keys[key])
+
+    tts_audio = dict(zip(tts_keys, await asyncio.gather(*(synthesize(k) for k in tts_keys))))
+
+    results: list[NPCBatchItemResult] = []
+    tts_lines = 0
+    for index, (item, outcome) in enumerate(zip(request.items, outcomes)):
+        if isinstance(outcome, BaseException):  # CancelledError is not an Exception
+            logger.error("Batch item %s (%s) failed: %s: %s", index, item.npc_id, type(outcome).__name__, outcome)
+            results.append(NPCBatchItemResult(
+                index=index,
+                npc_id=item.npc_id,
+                error=f"NPC processing error: {str(outcome)}",
+            ))
+            continue
+        if outcome.dialogue:
+            tts_lines += 1
+            outcome.audio_url = tts_audio.get((outcome.dialogue, _resolve_deepgram_model(item.voice_id)))
+        results.append(NPCBatchItemResult(index=index, npc_id=item.npc_id, response=outcome))
+
+    record_cache("tts_batch_dedupe", hit=True, count=tts_lines - len(tts_keys))
+    record_cache("tts_batch_dedupe", hit=False, count=len(tts_keys))
+    errors = sum(1 for r in results if r.error)
+    logger.info("Batch done | items=%s | errors=%s | tts_calls=%s | tts_deduplicated=%s", len(results), errors, len(tts_keys), tts_lines - len(tts_keys))
+    return NPCBatchResponse(
+        results=results,
+        tts_calls=len(tts_keys),
+        tts_deduplicated=tts_lines - len(tts_keys),
+    )
+
+
 @router.post("/test-clean-dialogue")
 async def test_clean(request: DialogueCleanTest) -> dict:
     cleaned = clean_dialogue(request.raw_dialogue)
@@ -0,0 +1,294 @@
+import asyncio
+import json
+import os
+import time
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+from ..sessions import session_registry, GameSession
+from ..scheduler import tick_scheduler
+from ..budget import llm_budget
+from ..deadline import budget_seconds, start_deadline
+from ..log import get_logger, request_id_var
+from ..metrics import WORK_CANCELLED
+from ..npc.context import HISTORY_KEEP
+from ..npc.gossip import ack_gossip, gossip_bus, publish_chat, sync_roster, take_gossip
+from ..npc.summarizer import memory_summarizer
+from .npc import NPCInputRequest, _run_npc_graph_within, _response_from_output, _speech_within
+from .world import TickRequest, run_world_tick
+
+router = APIRouter(prefix="/api/session", tags=["session"])
+logger = get_logger("Route-Session")
+
+SERVER_TICKS_DEFAULT = os.getenv("SESSION_SERVER_TICKS", "0").lower() in ("1", "true", "yes")
+
+# Concurrent tick/chat jobs per connection. When all slots are busy the socket
+# stops reading, which pushes back on the client through TCP flow control.
+MAX_INFLIGHT = int(os.getenv("SESSION_MAX_INFLIGHT", "4"))
+
+
+# ── Client → server message handlers ──
+#
+#   {"type": "hello", "world_state": {...}, "active_npcs": {...}, "recent_events": [...],
+#    "server_ticks": true}   <- let the backend scheduler own tick cadence
+#   {"type": "world_patch", "patch": {...}}
+#   {"type": "event", "source": "player", "action": "..."}
+#   {"type": "npc_upsert", "npc_id": "...", "data": {...}}
+#   {"type": "npc_remove", "npc_id": "..."}
+#   {"type": "tick"}
+#   {"type": "chat", "request_id": "...", "npc_id": "...", "message": "...",
+#    "budget_ms": 2500}   <- optional latency budget (default NPC_LATENCY_BUDGET_MS)
+#   {"type": "ping"}
+#
+# Server → client: welcome, narrator, action, npc_response, npc_reply, audio,
+# tick_done, tick_skipped, pong, error.
+
+
+def _apply_state_message(session: GameSession, message: dict) -> bool:
+    """Apply a state-only message in arrival order. Returns False if it isn't one."""
+    msg_type = message.get("type")
+    if msg_type == "hello":
+        session.sync(
+            world_state=message.get("world_state"),
+            active_npcs=message.get("active_npcs"),
+            recent_events=message.get("recent_events"),
+        )
+    elif msg_type == "world_patch":
+        session.patch_world(message.get("patch") or {})
+    elif msg_type == "event":
+        session.add_event(message.get("source", "player"), message.get("action", ""), message.get("time"))
+    elif msg_type == "npc_upsert":
+        session.upsert_npc(message["npc_id"], message.get("data") or {})
+    elif msg_type == "npc_remove":
+        session.remove_npc(message["npc_id"])
+    else:
+        return False
+    if msg_type in ("hello", "npc_upsert", "npc_remove"):
+        sync_roster(session.session_id, session.active_npcs)
+    return True
+
+
+def _apply_tick_to_session(session: GameSession, tick) -> None:
+    """Keep the server copy of the world in step with what the client will apply."""
+    for action in tick.actions:
+        if action.get("action") == "change_weather" and action.get("condition"):
+            session.world_state["weather"] = action["condition"]
+        elif action.get("action") == "update_tension" and "level" in action:
+            session.world_state["tension_level"] = action["level"]
+    for result in tick.npc_responses:
+        if result.error or result.npc_id not in session.active_npcs:
+            continue
+        patch = {"emotion": result.emotion, "trust_score": result.trust_score}
+        if result.memory:
+            patch["memory"] = result.memory
+        session.upsert_npc(result.npc_id, patch)
+
+
+async def handle_tick(session: GameSession) -> None:
+    if session.tick_lock.locked():
+        await session.send({"type": "tick_skipped", "reason": "tick_in_progress"})
+        return
+    async with session.tick_lock:
+        await _run_session_tick(session)
+
+
+async def _run_session_tick(session: GameSession) -> None:
+    consumed = list(session.recent_events)
+    request = TickRequest(
+        world_state=session.world_state,
+        recent_events=consumed,
+        active_npcs=session.active_npcs,
+        session_id=session.session_id,
+    )
+    tick = await run_world_tick(request, emit=session.send)
+
+    if tick.validation_status != "ERROR":
+        consumed_ids = {id(e) for e in consumed}
+        session.recent_events = [e for e in session.recent_events if id(e) not in consumed_ids]
+        _apply_tick_to_session(session, tick)
+        session.save()
+
+    await session.send({
+        "type": "tick_done",
+        "validation_status": tick.validation_status,
+        "plan_step": tick.plan_step,
+        "npc_responses": len(tick.npc_responses),
+    })
+
+
+async def handle_chat(session: GameSession, message: dict) -> None:
+    request_id = message.get("request_id")
+    npc_id = message.get("npc_id", "")
+    text = message.get("message", "")
+    npc_data = session.active_npcs.get(npc_id)
+    if npc_data is None:
+        await session.send({"type": "error", "request_id": request_id, "detail": f"Unknown npc_id '{npc_id}'"})
+        return
+    npc_data, read_at = take_gossip(session.session_id, npc_id, npc_data)  # see npc/gossip.py
+
+    npc_request = NPCInputRequest(
+        npc_id=npc_id,
+        npc_identity=npc_data.get("npc_identity", "A generic NPC"),
+        voice_id=npc_data.get("voice_id") or NPCInputRequest.model_fields["voice_id"].default,
+        memory=npc_data.get("memory") or {"short_term": [], "long_term_summary": "", "relationship_history": []},
+        trust_score=npc_data.get("trust_score", 5),
+        emotion=npc_data.get("emotion", "NEUTRAL"),
+        world_state=session.world_state,
+        recent_events=[{"source": "player", "action": text, "time": int(time.time())}],
+        conversation_history=npc_data.get("conversation_history", []),
+        session_id=session.session_id,
+    )
+    deadline = start_deadline(budget_seconds(str(message.get("budget_ms") or "")))
+    if deadline is not None:
+        deadline.keep_running = True  # the late graph result still refreshes memory below
+    output, late_task = await _run_npc_graph_within(npc_request, deadline, route="session")
+    try:
+        response = _response_from_output(output)
+        # The session keeps the NPC's memory server-side (below), so the reply leaves it out
+        reply = response.model_dump(exclude={"memory"})
+        await session.send({"type": "npc_reply", "request_id": request_id, "npc_id": npc_id, "response": reply})
+
+        history = list(npc_data.get("conversation_history", []))
+        history.append({"role": "player", "content": text})
+        history.append({"role": "npc", "content": response.dialogue})
+        session.upsert_npc(npc_id, {
+            "emotion": response.emotion,
+            "trust_score": response.trust_score,
+            "memory": output.get("memory", npc_request.memory),
+            "conversation_history": history[-HISTORY_KEEP:],
+        })
+        ack_gossip(session.session_id, npc_id, read_at)
+        session.add_event("player", f"said to {npc_id}: {text}")
+        publish_chat(session.session_id, npc_id, text, npc_data, response.emotion, response.trust_score)
+
+        audio_url = await _speech_within(response.dialogue, npc_request.voice_id, deadline)
+        if audio_url:
+            await session.send({"type": "audio", "request_id": request_id, "npc_id": npc_id, "audio_url": audio_url})
+
+        if late_task is not None:
+            # The player already got the fallback line; keep the graph's richer memory.
+            try:
+                late_output = await late_task
+            except Exception as e:
+                logger.warning("[%s] Late graph run for %s failed: %s: %s", session.session_id, npc_id, type(e).__name__, e)
+                return
+            if npc_id in session.active_npcs and late_output.get("memory"):
+                session.upsert_npc(npc_id, {"memory": late_output["memory"]})
+                logger.debug("[%s] Memory refreshed from late graph result for %s", session.session_id, npc_id)
+    finally:
+        if late_task is not None and not late_task.done():
+            late_task.cancel()  # the socket went away before the late run finished
+
+
+async def _run_job(session: GameSession, message: dict) -> None:
+    if message.get("request_id"):
+        request_id_var.set(f"{session.session_id}/{message['request_id']}")
+    try:
+        if message.get("type") == "tick":
+            await handle_tick(session)
+        else:
+            await handle_chat(session, message)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.error("[%s] Failed in %s: %s: %s", session.session_id, message.get("type"), type(e).__name__, e, exc_info=True)
+        await session.send({"type": "error", "request_id": message.get("request_id"), "detail": str(e)})
+
+
+async def _drain_outbox(websocket: WebSocket, session: GameSession) -> None:
+    while True:
+        message = await session.outbox.get()
+        await websocket.send_json(message)
+
+
+# ── Route ──
+
+
+@router.websocket("/ws/{session_id}")
+async def session_socket(websocket: WebSocket, session_id: str):
+    """
+    One persistent connection per player. The client sends incremental state
+    changes plus tick/chat requests; the server pushes narrator lines, world
+    actions, NPC responses and audio the moment each is ready.
+    """
+    await websocket.accept()
+    request_id_var.set(session_id)  # inherited by job and scheduler tasks
+    session = session_registry.get_or_create(session_id)
+    if session.connected:
+        logger.warning("[%s] Rejecting second connection", session_id)
+        await websocket.close(code=4409, reason="Session already connected")
+        return
+
+    session.connected = True
+    session.touch()
+    logger.info("[%s] Connected", session_id)
+    writer = asyncio.create_task(_drain_outbox(websocket, session))
+    slots = asyncio.Semaphore(MAX_INFLIGHT)
+    jobs: set[asyncio.Task] = set()
+
+    def _finish(task: asyncio.Task) -> None:
+        jobs.discard(task)
+        slots.release()
+
+    await session.send({"type": "welcome", "session_id": session_id})
+    try:
+        while True:
+            raw = await websocket.receive_text()
+            session.touch()
+            try:
+                message = json.loads(raw)
+                if not isinstance(message, dict):
+                    raise ValueError("message must be a JSON object")
+            except ValueError as e:
+                await session.send({"type": "error", "detail": f"Invalid message: {e}"})
+                continue
+
+            msg_type = message.get("type")
+            if msg_type == "ping":
+                await session.send({"type": "pong"})
+                continue
+            if msg_type not in ("tick", "chat"):
+                try:
+                    if not _apply_state_message(session, message):
+                        await session.send({"type": "error", "detail": f"Unknown message type '{msg_type}'"})
+                    elif msg_type == "hello" and message.get("server_ticks", SERVER_TICKS_DEFAULT):
+                        tick_scheduler.register(session, handle_tick)
+                except KeyError as e:
+                    await session.send({"type": "error", "detail": f"Missing field {e} for '{msg_type}'"})
+                continue
+
+            await slots.acquire()
+            task = asyncio.create_task(_run_job(session, message))
+            jobs.add(task)
+            task.add_done_callback(_finish)
+
+    except WebSocketDisconnect:
+        logger.info("[%s] Disconnected", session_id)
+    finally:
+        session.connected = False
+        session.activity.set()  # wake the scheduler so it notices the disconnect
+        unfinished = [task for task in jobs if not task.done()]
+        if unfinished:
+            WORK_CANCELLED.labels(route="session", reason="disconnect").inc(len(unfinished))
+            logger.info("[%s] Cancelling %s in-flight job(s)", session_id, len(unfinished))
+        for task in unfinished + [writer]:
+            task.cancel()
+        # A reconnect starts from a fresh session (and outbox), restored from the shared store if any
+        tick_scheduler.unregister(session_id)
+        session_registry.remove(session_id, session)
+        gossip_bus.drop(session_id)
+
+
+@router.get("/stats")
+async def session_stats():
+    """Per-session tick counts and intervals for server-driven ticking, plus this worker's LLM savings."""
+    return {
+        "sessions": tick_scheduler.stats(),
+        "llm_budget": {
+            "available": round(llm_budget.available(), 2),
+            "calls_per_minute": llm_budget.calls_per_minute,
+            "granted": llm_budget.granted,
+            "denied": llm_budget.denied,
+        },
+        "memory_summarizer": memory_summarizer.stats(),
+        "gossip": gossip_bus.stats(),
+    }
@@ -1,13 +1,22 @@
-import traceback
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional
-
-from ..world_orchestrator import call_orchestrator
-from ..npc import npc_graph, NPCState, Memory, Event, NPCResponse
-from ..npc.tts_service import clean_dialogue, generate_speech
+from typing import List, Dict, Any, Optional, Callable, Awaitable
+
+from ..world_orchestrator import call_orchestrator, tick_planner
+from ..npc import npc_graph, npc_executor, run_crowd_reaction, NPCState, Memory, Event, NPCResponse
+from ..npc.barks import bark_library, bark_turn
+from ..npc.crowd import CROWD_MODE_ENABLED, CROWD_MIN_SIZE
+from ..npc.gossip import ack_gossip, publish_outcome, publish_player_events, sync_roster, take_gossip
+from ..npc.tts_service import clean_dialogue, agenerate_speech
+from ..cancellation import RequestCancelled, run_cancellable
+from ..log import get_logger
+from ..timing import apply_timings, stage, start_timing
 
 router = APIRouter(prefix="/api/world", tags=["world"])
+logger = get_logger("Route-World")
+
+# Async callback receiving tick pieces as they become ready (see run_world_tick)
+TickEmitter = Callable[[dict], Awaitable[None]]
 
 
 # ── Request / Response Models ──
@@ -39,6 +48,7 @@ class NPCDirectiveResult(BaseModel):
     trust_score: Optional[int] = None
     action_trigger: Optional[str] = None
     audio_url: Optional[str] = None
+    memory: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
 
 
@@ -55,6 +65,10 @@ class TickRequest(BaseModel):
         default_factory=dict,
         description="Map of npc_id -> NPC data (npc_identity, voice_id, memory, trust_score, emotion, etc.)",
     )
+    session_id: str = Field(
+        default="default",
+        description="Player session key; multi-tick plans (WORLD_PLAN_TICKS > 1) are stored per session, never for \"default\"",
+    )
 
 
 class TickResponse(BaseModel):
@@ -63,6 +77,11 @@ class TickResponse(BaseModel):
     npc_directives: List[Dict[str, Any]]
     npc_responses: List[NPCDirectiveResult]
     validation_status: str
+    plan_step: Optional[int] = None
+    timings: Optional[Dict[str, Any]] = Field(
+        default=None,
+        description="Per-stage wall time in ms (DEBUG_TIMINGS=1 only)",
+    )
 
 
 # ── Routes ──
@@ -71,17 +90,16 @@ class TickResponse(BaseModel):
 @router.post("/orchestrate", response_model=OrchestratorResponse)
 async def orchestrate(request: OrchestrateRequest) -> OrchestratorResponse:
     """Run the world orchestrator and return actions + narrator + npc_directives."""
-    print(f"[Route-World] POST /orchestrate | events_count={len(request.recent_events)} | world_state_keys={list(request.world_state.keys())}")
+    logger.info("POST /orchestrate | events_count=%s | world_state_keys=%s", len(request.recent_events), list(request.world_state.keys()))
     try:
         result = await call_orchestrator(
             request.world_state,
             request.recent_events,
         )
-        print(f"[Route-World] Orchestrate done | actions={len(result.get('actions', []))} | npc_directives={len(result.get('npc_directives', []))} | status={result.get('validation_status')}")
+        logger.info("Orchestrate done | actions=%s | npc_directives=%s | status=%s", len(result.get("actions", [])), len(result.get("npc_directives", [])), result.get("validation_status"))
         return OrchestratorResponse(**result)
     except Exception as e:
-        print(f"[Route-World] ERROR in /orchestrate: {type(e).__name__}: {e}")
-        print(traceback.format_exc())
+        logger.error("Failed in /orchestrate: %s: %s", type(e).__name__, e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Orchestrator error: {str(e)}")
 
 
@@ -102,23 +120,79 @@ def _build_npc_world_state(world_state: dict, npc_data: dict) -> dict:
     }
 
 
-@router.post("/tick", response_model=TickResponse)
-async def world_tick(request: TickRequest) -> TickResponse:
+async def _run_npc_graph_for_directive(target_id: str, npc_data: dict, event_text: str, world_state: dict,
+                                       session_id: str) -> dict:
+    """Run the full NPC graph for one NPC reacting to an orchestrator event."""
+    directive_event = Event(
+        source="world_orchestrator",
+        action=event_text,
+        time=0,
+    )
+
+    memory_data = npc_data.get("memory", {
+        "short_term": [],
+        "long_term_summary": "",
+        "relationship_history": [],
+    })
+
+    state = NPCState(
+        npc_id=target_id,
+        session_id=session_id,
+        npc_identity=npc_data.get("npc_identity", "A generic NPC"),
+        voice_id=npc_data.get("voice_id"),
+        memory=Memory(**memory_data),
+        trust_score=npc_data.get("trust_score", 5),
+        emotion=npc_data.get("emotion", "NEUTRAL"),
+        world_state=_build_npc_world_state(world_state, npc_data),
+        recent_events=[directive_event],
+        conversation_history=npc_data.get("conversation_history", []),
+        conversation_context=None,
+        recalled_memories=None,
+        internal_reasoning=None,
+        dialogue=None,
+        action_trigger=None,
+    )
+
+    graph = await npc_graph.aget()
+    return await graph.ainvoke(state)
+
+
+async def _emit(emit: Optional[TickEmitter], message: dict) -> None:
+    if emit is not None:
+        await emit(message)
+
+
+async def run_world_tick(request: TickRequest, emit: Optional[TickEmitter] = None) -> TickResponse:
     """
-    Full world tick: run the orchestrator, then feed any npc_directives
-    into the NPC agent as events. Each NPC independently decides its own
-    reaction, dialogue, and actions.
+    Run one world tick and return the full TickResponse.
+
+    `emit`, when given, is awaited with each piece of the tick as soon as it is
+    ready — {"type": "narrator"}, {"type": "action"}, {"type": "npc_response"}
+    (without audio) and {"type": "audio"} — so push-based transports such as
+    the session WebSocket don't have to wait for the whole tick.
     """
-    print(f"[Route-World] POST /tick | events_count={len(request.recent_events)} | active_npcs={list(request.active_npcs.keys())}")
+    logger.info("Tick | session=%s | events_count=%s | active_npcs=%s", request.session_id, len(request.recent_events), list(request.active_npcs.keys()))
+    # Gossip (npc/gossip.py): what the player did since the last tick spreads to this roster
+    sync_roster(request.session_id, request.active_npcs)
+    publish_player_events(request.session_id, request.recent_events, request.active_npcs)
+
     try:
-        result = await call_orchestrator(
-            request.world_state,
-            request.recent_events,
-        )
-        print(f"[Route-World] Orchestrator result | actions={len(result.get('actions', []))} | npc_directives={len(result.get('npc_directives', []))} | status={result.get('validation_status')}")
+        with stage("orchestrator"):
+            # Plans are per player; requests without a session_id would replay each other's
+            if tick_planner.enabled and request.session_id != "default":
+                result = await tick_planner.next_tick(
+                    request.world_state,
+                    request.recent_events,
+                    session_id=request.session_id,
+                )
+            else:
+                result = await call_orchestrator(
+                    request.world_state,
+                    request.recent_events,
+                )
+        logger.info("Orchestrator result | actions=%s | npc_directives=%s | status=%s", len(result.get("actions", [])), len(result.get("npc_directives", [])), result.get("validation_status"))
     except Exception as e:
-        print(f"[Route-World] ERROR in orchestrator during /tick: {type(e).__name__}: {e}")
-        print(traceback.format_exc())
+        logger.error("Failed in orchestrator during /tick: %s: %s", type(e).__name__, e, exc_info=True)
         # Graceful degradation — return an empty tick instead of 500
         return TickResponse(
             actions=[],
@@ -128,16 +202,21 @@ async def world_tick(request: TickRequest) -> TickResponse:
             validation_status="ERROR",
         )
 
+    if result.get("narrator"):
+        await _emit(emit, {"type": "narrator", "text": result["narrator"]})
+    for action in result.get("actions", []):
+        await _emit(emit, {"type": "action", "action": action})
+
     npc_responses: list[NPCDirectiveResult] = []
     directives = result.get("npc_directives", [])
 
     if directives:
-        print(f"[Route-World] Processing {len(directives)} NPC directive(s)")
+        logger.debug("Processing %s NPC directive(s)", len(directives))
 
     for directive in directives:
         npc_id = directive.get("npc_id", "")
         event_text = directive.get("event", "")
-        print(f"[Route-World] Directive: npc_id={npc_id} | event='{event_text}'")
+        logger.debug("Directive: npc_id=%s | event='%s'", npc_id, event_text)
 
         if npc_id == "all":
             npc_type_filter = directive.get("npc_type", "")
@@ -145,89 +224,137 @@ async def world_tick(request: TickRequest) -> TickResponse:
                 k for k, v in request.active_npcs.items()
                 if not npc_type_filter or v.get("type", "") == npc_type_filter
             ]
-            print(f"[Route-World] Wildcard directive | type_filter='{npc_type_filter}' | matched={matching_ids}")
+            logger.debug("Wildcard directive | type_filter='%s' | matched=%s", npc_type_filter, matching_ids)
         else:
             matching_ids = [npc_id] if npc_id in request.active_npcs else []
             if not matching_ids:
-                print(f"[Route-World] NPC '{npc_id}' not found in active_npcs")
+                logger.warning("NPC '%s' not found in active_npcs", npc_id)
 
+        # Gossip heard since their last turn goes into memory before they react. It stays
+        # queued, and out of active_npcs, until a turn returns memory that holds it.
+        hearing: dict[str, dict] = {}
+        read_at: dict[str, Optional[float]] = {}
         for target_id in matching_ids:
-            npc_data = request.active_npcs.get(target_id)
+            hearing[target_id], read_at[target_id] = take_gossip(
+                request.session_id, target_id, request.active_npcs[target_id])
+
+        # Pre-generated barks (BARK_LIBRARY) where the library covers the event; the rest react live
+        bark_outputs: dict[str, dict] = {}
+        library = await bark_library.aget()
+        if library is not None:
+            for target_id in matching_ids:
+                output = bark_turn(library, target_id, hearing[target_id], event_text)
+                if output is not None:
+                    bark_outputs[target_id] = output
+        live_ids = [k for k in matching_ids if k not in bark_outputs]
+
+        # Wildcard directives: one crowd-reaction LLM call instead of a graph run per NPC
+        crowd_outputs: dict[str, dict] = {}
+        if npc_id == "all" and CROWD_MODE_ENABLED and len(live_ids) >= CROWD_MIN_SIZE:
+            try:
+                with stage("crowd"):
+                    crowd_outputs = await run_crowd_reaction(
+                        await npc_executor.aget(),
+                        event_text,
+                        {k: hearing[k] for k in live_ids},
+                        _build_npc_world_state(request.world_state, {}),
+                    )
+            except Exception as e:
+                logger.warning("Crowd reaction failed, falling back to per-NPC runs: %s: %s", type(e).__name__, e, exc_info=True)
+
+        for target_id in matching_ids:
+            npc_data = hearing.get(target_id)
             if not npc_data:
-                print(f"[Route-World] ERROR: NPC '{target_id}' missing from active_npcs dict")
+                logger.error("NPC '%s' missing from active_npcs dict", target_id)
                 npc_responses.append(NPCDirectiveResult(
                     npc_id=target_id,
                     event=event_text,
                     error=f"NPC {target_id} not found in active_npcs",
                 ))
+                await _emit(emit, {"type": "npc_response", "result": npc_responses[-1].model_dump()})
                 continue
 
-            print(f"[Route-World] Processing NPC '{target_id}' for event='{event_text}'")
+            logger.debug("Processing NPC '%s' for event='%s'", target_id, event_text)
             try:
-                directive_event = Event(
-                    source="world_orchestrator",
-                    action=event_text,
-                    time=0,
-                )
-
-                memory_data = npc_data.get("memory", {
-                    "short_term": [],
-                    "long_term_summary": "",
-                    "relationship_history": [],
-                })
-
-                state = NPCState(
-                    npc_id=target_id,
-                    npc_identity=npc_data.get("npc_identity", "A generic NPC"),
-                    voice_id=npc_data.get("voice_id"),
-                    memory=Memory(**memory_data),
-                    trust_score=npc_data.get("trust_score", 5),
-                    emotion=npc_data.get("emotion", "NEUTRAL"),
-                    world_state=_build_npc_world_state(request.world_state, npc_data),
-                    recent_events=[directive_event],
-                    conversation_history=npc_data.get("conversation_history", []),
-                    internal_reasoning=None,
-                    dialogue=None,
-                    action_trigger=None,
-                )
-
-                output = npc_graph.invoke(state)
+                output = bark_outputs.get(target_id) or crowd_outputs.get(target_id)
+                if output is None:
+                    with stage(f"directive.{target_id}"):
+                        output = await _run_npc_graph_for_directive(
+                            target_id, npc_data, event_text, request.world_state, request.session_id)
 
                 raw_dialogue = output.get("dialogue", "")
-                cleaned_dialogue = clean_dialogue(raw_dialogue)
-                voice = output.get("voice_id") or npc_data.get("voice_id")
-                audio_url = generate_speech(cleaned_dialogue, voice_id=voice)
-
-                print(f"[Route-World] NPC '{target_id}' responded | emotion={output.get('emotion')} | trust={output.get('trust_score')} | audio={'set' if audio_url else 'None'}")
-                npc_responses.append(NPCDirectiveResult(
+                with stage("clean_dialogue"):
+                    cleaned_dialogue = clean_dialogue(raw_dialogue)
+                npc_result = NPCDirectiveResult(
                     npc_id=target_id,
                     event=event_text,
                     dialogue=cleaned_dialogue,
                     emotion=output.get("emotion", "NEUTRAL"),
                     trust_score=output.get("trust_score", 5),
                     action_trigger=output.get("action_trigger", "NONE"),
-                    audio_url=audio_url,
-                ))
+                    memory=output.get("memory"),
+                )
+                # A later directive this tick to the same NPC starts from this turn, not the pre-tick state
+                updated = {"emotion": npc_result.emotion, "trust_score": npc_result.trust_score}
+                if npc_result.memory:
+                    updated["memory"] = npc_result.memory
+                    ack_gossip(request.session_id, target_id, read_at[target_id])
+                request.active_npcs[target_id] = {**request.active_npcs[target_id], **updated}
+                await _emit(emit, {"type": "npc_response", "result": npc_result.model_dump()})
+                if npc_id != "all":  # a wildcard event was witnessed by everyone already
+                    publish_outcome(request.session_id, target_id, event_text.rstrip(". "), npc_data,
+                                    npc_result.emotion, npc_result.trust_score)
+
+                voice = output.get("voice_id") or npc_data.get("voice_id")
+                npc_result.audio_url = output.get("audio_url") or await agenerate_speech(cleaned_dialogue, voice)
+                if npc_result.audio_url:
+                    await _emit(emit, {"type": "audio", "npc_id": target_id, "audio_url": npc_result.audio_url})
+
+                logger.debug("NPC '%s' responded | emotion=%s | trust=%s | crowd=%s | bark=%s | audio=%s", target_id, npc_result.emotion, npc_result.trust_score, target_id in crowd_outputs, target_id in bark_outputs, "set" if npc_result.audio_url else "None")
+                npc_responses.append(npc_result)
 
             except Exception as e:
-                print(f"[Route-World] ERROR processing NPC '{target_id}': {type(e).__name__}: {e}")
-                print(traceback.format_exc())
+                logger.error("Failed processing NPC '%s': %s: %s", target_id, type(e).__name__, e, exc_info=True)
                 npc_responses.append(NPCDirectiveResult(
                     npc_id=target_id,
                     event=event_text,
                     error=f"NPC processing error: {str(e)}",
                 ))
+                await _emit(emit, {"type": "npc_response", "result": npc_responses[-1].model_dump()})
 
-    print(f"[Route-World] Tick complete | npc_responses={len(npc_responses)}")
+    logger.info("Tick complete | npc_responses=%s", len(npc_responses))
     return TickResponse(
         actions=result.get("actions", []),
         narrator=result.get("narrator", ""),
         npc_directives=result.get("npc_directives", []),
         npc_responses=npc_responses,
         validation_status=result.get("validation_status", "VALID"),
+        plan_step=result.get("plan_step"),
     )
 
 
+@router.post("/tick", response_model=TickResponse)
+async def world_tick(request: TickRequest, http_request: Request, http_response: Response) -> TickResponse:
+    """
+    Full world tick: run the orchestrator, then feed any npc_directives
+    into the NPC agent as events. Each NPC independently decides its own
+    reaction, dialogue, and actions.
+
+    A tick is cancelled when its client disconnects, or when a newer tick for
+    the same (non-default) session_id arrives; it then answers 499 / 409.
+    """
+    logger.info("POST /tick | session=%s", request.session_id)
+    timings = start_timing()
+    supersede_key = None if request.session_id == "default" else f"tick:{request.session_id}"
+    try:
+        tick = await run_cancellable(http_request, run_world_tick(request), route="tick", supersede_key=supersede_key)
+    except RequestCancelled as e:
+        logger.info("Tick cancelled (%s) | session=%s", e.reason, request.session_id)
+        return Response(status_code=e.status_code)
+    apply_timings(timings, http_response, tick)
+    return tick
+
+
 @router.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "World Orchestrator"}
@@ -0,0 +1,205 @@
+"""
+Server-driven, adaptive world ticks for connected game sessions.
+
+With REST the browser's setInterval decides when to tick, so idle players still
+cost an orchestrator call every 45 s while busy moments wait up to 45 s for the
+world to react. A session that opts in (hello with "server_ticks": true, or
+SESSION_SERVER_TICKS=1) is instead ticked from here:
+
+  - player actions piling up (SCHED_BUSY_EVENTS or more) pull the next tick in,
+    but never closer than SCHED_MIN_INTERVAL after the previous one
+  - nothing changed since the last tick → the tick is skipped and the interval
+    stretches (x SCHED_STRETCH, up to SCHED_MAX_INTERVAL)
+  - no LLM budget left → the tick is deferred, not run. A tick is charged
+    SCHED_TICK_COST calls: the orchestrator call plus an estimate for the NPC
+    directives it sets off (2-3 calls per live NPC run)
+  - no client activity for SCHED_IDLE_TIMEOUT, or the socket closed → the
+    session's loop stops and it is unregistered; a disconnected session is
+    also dropped from the session registry
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Awaitable, Callable
+
+from .budget import llm_budget
+from .log import get_logger
+from .metrics import REGISTRY, _escape
+from .sessions import GameSession, session_registry
+
+BASE_INTERVAL = float(os.getenv("SCHED_BASE_INTERVAL", "45"))
+MIN_INTERVAL = float(os.getenv("SCHED_MIN_INTERVAL", "10"))
+MAX_INTERVAL = float(os.getenv("SCHED_MAX_INTERVAL", "180"))
+STRETCH = float(os.getenv("SCHED_STRETCH", "1.5"))
+BUSY_EVENTS = int(os.getenv("SCHED_BUSY_EVENTS", "3"))
+IDLE_TIMEOUT = float(os.getenv("SCHED_IDLE_TIMEOUT", "300"))
+TICK_COST = float(os.getenv("SCHED_TICK_COST", "4"))  # orchestrator + one live NPC directive
+
+logger = get_logger("Scheduler")
+
+TickFn = Callable[[GameSession], Awaitable[None]]
+
+
+def _pending_player_events(session: GameSession) -> int:
+    return sum(1 for e in session.recent_events if e.get("source", "player") == "player")
+
+
+def _fingerprint(session: GameSession) -> str:
+    """Hash of everything a tick would react to; equal hashes mean nothing changed."""
+    ws = session.world_state
+    payload = {
+        "karma": ws.get("player_karma"),
+        "tension": ws.get("tension_level"),
+        "weather": ws.get("weather"),
+        "time_of_day": ws.get("time_of_day"),
+        "location": ws.get("location"),
+        "npcs": sorted(session.active_npcs.keys()),
+        "events": session.recent_events,
+    }
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class SessionSchedule:
+    """Per-session loop state and exported counters."""
+
+    def __init__(self, session: GameSession, tick_fn: TickFn):
+        self.session = session
+        self.tick_fn = tick_fn
+        self.interval = BASE_INTERVAL
+        self.ticks = 0
+        self.skipped = 0
+        self.deferred = 0
+        self.early = 0
+        self.last_tick_at: float | None = None
+        self.last_fingerprint: str | None = None
+        self.task: asyncio.Task | None = None
+
+    def stats(self) -> dict:
+        return {
+            "session_id": self.session.session_id,
+            "interval_s": round(self.interval, 1),
+            "ticks": self.ticks,
+            "skipped": self.skipped,
+            "deferred": self.deferred,
+            "early": self.early,
+            "seconds_since_tick": (
+                round(time.monotonic() - self.last_tick_at, 1) if self.last_tick_at else None
+            ),
+        }
+
+
+class TickScheduler:
+    def __init__(self):
+        self._schedules: dict[str, SessionSchedule] = {}
+
+    def register(self, session: GameSession, tick_fn: TickFn) -> None:
+        if session.session_id in self._schedules:
+            return
+        schedule = SessionSchedule(session, tick_fn)
+        schedule.task = asyncio.create_task(self._run(schedule))
+        self._schedules[session.session_id] = schedule
+        logger.info("Registered session '%s' | sessions=%s", session.session_id, len(self._schedules))
+
+    def unregister(self, session_id: str, schedule: SessionSchedule | None = None) -> None:
+        """Stop the session's schedule; with `schedule`, only if it is still the registered one."""
+        if schedule is not None and self._schedules.get(session_id) is not schedule:
+            return
+        schedule = self._schedules.pop(session_id, None)
+        if schedule is None:
+            return
+        if schedule.task and schedule.task is not asyncio.current_task():
+            schedule.task.cancel()
+        logger.info("Unregistered session '%s' | ticks=%s | skipped=%s | sessions=%s", session_id, schedule.ticks, schedule.skipped, len(self._schedules))
+
+    def stats(self) -> list[dict]:
+        return [s.stats() for s in self._schedules.values()]
+
+    async def _run(self, schedule: SessionSchedule) -> None:
+        session = schedule.session
+        next_at = time.monotonic() + schedule.interval
+        try:
+            while True:
+                timeout = max(0.0, next_at - time.monotonic())
+                try:
+                    await asyncio.wait_for(session.activity.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+                session.activity.clear()
+                now = time.monotonic()
+
+                if not session.connected or now - session.last_activity > IDLE_TIMEOUT:
+                    logger.info("Session '%s' went quiet — stopping", session.session_id)
+                    break
+
+                pending = _pending_player_events(session)
+                if now < next_at:
+                    # Woken by player activity: only pull the tick in when busy
+                    if pending < BUSY_EVENTS:
+                        continue
+                    earliest = (schedule.last_tick_at or 0.0) + MIN_INTERVAL
+                    if now < earliest:
+                        next_at = earliest
+                        continue
+                    schedule.early += 1
+
+                fingerprint = _fingerprint(session)
+                if pending == 0 and fingerprint == schedule.last_fingerprint:
+                    schedule.skipped += 1
+                    schedule.interval = min(schedule.interval * STRETCH, MAX_INTERVAL)
+                    logger.debug("[%s] Nothing changed — skipping, next in %.0fs", session.session_id, schedule.interval)
+                elif not llm_budget.try_acquire(min(TICK_COST, llm_budget.burst)):
+                    schedule.deferred += 1
+                    logger.info("[%s] LLM budget exhausted — deferring tick", session.session_id)
+                else:
+                    await self._tick(schedule)
+                    schedule.interval = MIN_INTERVAL if pending >= BUSY_EVENTS else BASE_INTERVAL
+
+                next_at = time.monotonic() + schedule.interval
+        except asyncio.CancelledError:
+            raise
+        finally:
+            self.unregister(session.session_id, schedule)  # a reconnect may have registered a new one
+            if not session.connected:
+                session_registry.remove(session.session_id, session)
+
+    async def _tick(self, schedule: SessionSchedule) -> None:
+        session = schedule.session
+        schedule.ticks += 1
+        schedule.last_tick_at = time.monotonic()
+        logger.info("[%s] Tick #%s | interval=%.0fs | pending_events=%s", session.session_id, schedule.ticks, schedule.interval, _pending_player_events(session))
+        try:
+            await schedule.tick_fn(session)
+        except Exception as e:
+            logger.warning("[%s] Tick failed: %s: %s", session.session_id, type(e).__name__, e, exc_info=True)
+        # Fingerprint after the tick so the next round compares against post-tick state
+        schedule.last_fingerprint = _fingerprint(session)
+
+
+# ── Module-level singleton ──────────────────────────────────────────────────────
+tick_scheduler = TickScheduler()
+
+
+def _collect_scheduler_metrics() -> list[str]:
+    lines = [
+        "# HELP npcs_session_ticks_total Server-driven ticks per session (result=run|skipped|deferred|early)",
+        "# TYPE npcs_session_ticks_total counter",
+    ]
+    stats = tick_scheduler.stats()
+    for s in stats:
+        session = _escape(s["session_id"])  # client-chosen
+        for result, key in (("run", "ticks"), ("skipped", "skipped"), ("deferred", "deferred"), ("early", "early")):
+            lines.append(f'npcs_session_ticks_total{{session="{session}",result="{result}"}} {s[key]}')
+    lines.append("# HELP npcs_session_tick_interval_seconds Current tick interval per session")
+    lines.append("# TYPE npcs_session_tick_interval_seconds gauge")
+    for s in stats:
+        lines.append(f'npcs_session_tick_interval_seconds{{session="{_escape(s["session_id"])}"}} {s["interval_s"]}')
+    lines.append("# HELP npcs_llm_budget_available Calls currently available in the global LLM budget")
+    lines.append("# TYPE npcs_llm_budget_available gauge")
+    lines.append(f"npcs_llm_budget_available {llm_budget.available():.2f}")
+    return lines
+
+
+REGISTRY.register_collector(_collect_scheduler_metrics)
@@ -0,0 +1,172 @@
+"""
+Server-side game sessions.
+
+Over REST the browser is the source of truth and re-sends the full world_state,
+recent_events and active_npcs map on every tick. A session keeps that state on
+the server instead, so a persistent connection only has to send increments
+(one event, one NPC patch) and the server can run ticks from what it already has.
+
+With a shared store (SHARED_STORE, see shared_store.py) the state part of a
+session is also written through to the store on every change, so when a
+reconnect lands on another worker, that worker picks up where the old one
+stopped. With the default in-process store nothing is written.
+
+Each session also owns a bounded outbox. Producers `await send(...)`, which
+blocks once the outbox is full — that is the backpressure signal that slows
+work down when the client can't keep up.
+"""
+
+import asyncio
+import os
+import time
+from typing import Optional
+
+from .log import get_logger
+from .shared_store import StoreBusy, get_store
+
+logger = get_logger("Session")
+
+OUTBOX_SIZE = int(os.getenv("SESSION_OUTBOX_SIZE", "64"))
+MAX_RECENT_EVENTS = 10
+MAX_RECENT_PLAYER_ACTIONS = 5
+STATE_TTL = float(os.getenv("SESSION_STATE_TTL", "86400"))
+
+
+class GameSession:
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.world_state: dict = {}
+        self.recent_events: list[dict] = []
+        self.active_npcs: dict[str, dict] = {}
+        self.outbox: asyncio.Queue = asyncio.Queue(maxsize=OUTBOX_SIZE)
+        self.activity = asyncio.Event()  # set on player events; wakes the tick scheduler
+        self.tick_lock = asyncio.Lock()  # one world tick in flight per session
+        self.connected = False
+        self.created_at = time.monotonic()
+        self.last_activity = self.created_at
+
+    # ── Incremental state updates (mirror WorldService.ts) ──
+
+    def touch(self) -> None:
+        self.last_activity = time.monotonic()
+
+    def _state_key(self) -> str:
+        return f"session:{self.session_id}"
+
+    def save(self) -> None:
+        """Write the state through to a shared store (no-op for the in-process default)."""
+        store = get_store()
+        if not store.shared:
+            return
+        try:
+            store.set(self._state_key(), {
+                "world_state": self.world_state,
+                "recent_events": self.recent_events,
+                "active_npcs": self.active_npcs,
+            }, ttl=STATE_TTL)
+        except StoreBusy as e:
+            logger.warning("[%s] Store busy, state saved with the next change: %s", self.session_id, e)
+
+    def restore(self) -> bool:
+        """Load state another worker saved for this session; False if there is none."""
+        store = get_store()
+        try:
+            state = store.get(self._state_key()) if store.shared else None
+        except StoreBusy as e:
+            logger.warning("[%s] Store busy, starting without saved state: %s", self.session_id, e)
+            return False
+        if not state:
+            return False
+        self.world_state = state.get("world_state") or {}
+        self.recent_events = state.get("recent_events") or []
+        self.active_npcs = state.get("active_npcs") or {}
+        return True
+
+    def sync(self, world_state: Optional[dict] = None, active_npcs: Optional[dict] = None,
+             recent_events: Optional[list] = None) -> None:
+        """Replace whole sections of state (initial hello / resync)."""
+        if world_state is not None:
+            self.world_state = dict(world_state)
+        if active_npcs is not None:
+            self.active_npcs = {k: dict(v) for k, v in active_npcs.items()}
+        if recent_events is not None:
+            self.recent_events = list(recent_events)[-MAX_RECENT_EVENTS:]
+        self.save()
+
+    def patch_world(self, patch: dict) -> None:
+        self.world_state.update(patch)
+        self.save()
+
+    def add_event(self, source: str, action: str, event_time: Optional[int] = None) -> None:
+        self.recent_events.append({
+            "source": source,
+            "action": action,
+            "time": event_time if event_time is not None else int(time.time()),
+        })
+        self.recent_events = self.recent_events[-MAX_RECENT_EVENTS:]
+        if source == "player":
+            self.activity.set()
+            actions = list(self.world_state.get("recent_player_actions", []))
+            actions.append(action)
+            self.world_state["recent_player_actions"] = actions[-MAX_RECENT_PLAYER_ACTIONS:]
+        self.save()
+
+    def upsert_npc(self, npc_id: str, data: dict) -> None:
+        self.active_npcs[npc_id] = {**self.active_npcs.get(npc_id, {}), **data}
+        self._sync_active_npc_list()
+        self.save()
+
+    def remove_npc(self, npc_id: str) -> None:
+        self.active_npcs.pop(npc_id, None)
+        self._sync_active_npc_list()
+        self.save()
+
+    def _sync_active_npc_list(self) -> None:
+        self.world_state["active_npcs"] = [
+            {
+                "id": npc_id,
+                "type": data.get("type", ""),
+                "location": data.get("location", ""),
+                "mood": data.get("emotion", "NEUTRAL"),
+            }
+            for npc_id, data in self.active_npcs.items()
+        ]
+
+    # ── Outbound ──
+
+    async def send(self, message: dict) -> None:
+        """Queue a message for the client; waits while the outbox is full."""
+        await self.outbox.put(message)
+
+
+class SessionRegistry:
+    def __init__(self):
+        self._sessions: dict[str, GameSession] = {}
+
+    def get_or_create(self, session_id: str) -> GameSession:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = GameSession(session_id)
+            self._sessions[session_id] = session
+            if session.restore():
+                logger.info("Restored session '%s' from the shared store | npcs=%s | total=%s", session_id, len(session.active_npcs), len(self._sessions))
+            else:
+                logger.info("Created session '%s' | total=%s", session_id, len(self._sessions))
+        return session
+
+    def get(self, session_id: str) -> Optional[GameSession]:
+        return self._sessions.get(session_id)
+
+    def remove(self, session_id: str, session: Optional[GameSession] = None) -> None:
+        """Forget the session; with `session`, only if it is still the registered one."""
+        if session is not None and self._sessions.get(session_id) is not session:
+            return
+        if self._sessions.pop(session_id, None) is not None:
+            logger.info("Removed session '%s' | total=%s", session_id, len(self._sessions))
+
+    def all(self) -> list[GameSession]:
+        return list(self._sessions.values())
+
+
+# ── Module-level singleton ──────────────────────────────────────────────────────
+session_registry = SessionRegistry()
@@ -0,0 +1,223 @@
+"""
+Key-value store for state that every worker process must see.
+
+With one uvicorn worker, per-process dicts are enough. With WORKERS > 1
+(see main.py), each worker has its own, so these state pieces live in the
+store instead:
+  - world plans          (world_orchestrator/planner.py, "plan:<session>")
+  - session state        (sessions.py, "session:<session>"): world_state, events,
+                         NPCs. A reconnect that lands on another worker resumes it
+  - the LLM call budget  (budget.py, "budget:llm"): one bucket for all workers
+  - NPC memory summaries (npc/summarizer.py, "summary:<hash>"): written by the
+                         worker that ran the batch, applied by the one serving the NPC next
+
+Values are JSON documents with an optional TTL. `update` is an atomic
+read-modify-write, and is what the budget uses.
+
+Backends, selected by SHARED_STORE:
+    memory                      per-process dict (default; nothing to share)
+    sqlite:///path/to/file.db   SQLite in WAL mode, shared by processes on one host
+    package.module:factory      any other backend, e.g. an adapter around an
+                                external KV store; called without arguments and
+                                returning a SharedStore
+
+Calls are synchronous and run on the event loop, so they must stay short.
+SQLite waits at most SHARED_STORE_BUSY_MS (default 100) for another process's
+write lock, then raises StoreBusy. Callers on request paths treat that as a
+soft failure: the LLM budget denies the call, a session save is skipped
+until the session's next change, and a prepared opener or summary is dropped.
+Elsewhere (the world planner) it fails the tick like any other error. WAL
+readers do not wait on writers. An external adapter should bound its calls
+the same way.
+"""
+
+import importlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+from .log import get_logger
+
+logger = get_logger("Store")
+
+_PURGE_EVERY = 500  # writes between sweeps of expired SQLite rows
+BUSY_TIMEOUT = float(os.getenv("SHARED_STORE_BUSY_MS", "100")) / 1000.0
+
+
+class StoreBusy(Exception):
+    """Another process held the store's write lock for longer than the busy timeout."""
+
+
+def _expires(ttl: Optional[float]) -> Optional[float]:
+    return None if ttl is None else time.time() + ttl
+
+
+class SharedStore:
+    """Interface every backend implements. `shared` is True when other processes see the data."""
+
+    shared = False
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def update(self, key: str, fn: Callable[[Optional[Any]], Any], ttl: Optional[float] = None) -> Any:
+        """Atomically replace the value with fn(current value or None) and return it."""
+        raise NotImplementedError
+
+
+class MemoryStore(SharedStore):
+    """Per-process store. Values round-trip through JSON like in the shared backends."""
+
+    def __init__(self):
+        self._data: dict[str, tuple[str, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        raw, expires = entry
+        if expires is not None and expires < time.time():
+            del self._data[key]
+            return None
+        return json.loads(raw)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            return self._get(key)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        raw = json.dumps(value)
+        with self._lock:
+            self._data[key] = (raw, _expires(ttl))
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def update(self, key: str, fn: Callable[[Optional[Any]], Any], ttl: Optional[float] = None) -> Any:
+        with self._lock:
+            value = fn(self._get(key))
+            self._data[key] = (json.dumps(value), _expires(ttl))
+            return value
+
+
+class SQLiteStore(SharedStore):
+    """One SQLite file in WAL mode: concurrent readers, serialised writers, across processes."""
+
+    shared = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL)")
+        self._purge(conn)
+        logger.info("Shared store at %s (SQLite WAL)", path)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit; update() opens its own write transaction.
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    @contextmanager
+    def _busy() -> Iterator[None]:
+        try:
+            yield
+        except sqlite3.OperationalError as e:
+            if "locked" in str(e) or "busy" in str(e):
+                raise StoreBusy(str(e)) from e
+            raise
+
+    @staticmethod
+    def _purge(conn: sqlite3.Connection) -> None:
+        conn.execute("DELETE FROM kv WHERE expires IS NOT NULL AND expires < ?", (time.time(),))
+
+    @staticmethod
+    def _read(conn: sqlite3.Connection, key: str) -> Optional[Any]:
+        row = conn.execute("SELECT value, expires FROM kv WHERE key = ?", (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return None
+        return json.loads(row[0])
+
+    def _write(self, conn: sqlite3.Connection, key: str, value: Any, ttl: Optional[float]) -> None:
+        conn.execute(
+            "INSERT INTO kv (key, value, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires",
+            (key, json.dumps(value), _expires(ttl)),
+        )
+        self._writes += 1
+        if self._writes % _PURGE_EVERY == 0:
+            self._purge(conn)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._busy():
+            return self._read(self._conn(), key)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        with self._busy():
+            self._write(self._conn(), key, value, ttl)
+
+    def delete(self, key: str) -> None:
+        with self._busy():
+            self._conn().execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def update(self, key: str, fn: Callable[[Optional[Any]], Any], ttl: Optional[float] = None) -> Any:
+        conn = self._conn()
+        with self._busy():
+            conn.execute("BEGIN IMMEDIATE")  # take the write lock before reading
+            try:
+                value = fn(self._read(conn, key))
+                self._write(conn, key, value, ttl)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        return value
+
+
+def create_store(spec: str) -> SharedStore:
+    """Build the backend named by a SHARED_STORE value."""
+    if not spec or spec == "memory":
+        return MemoryStore()
+    if spec.startswith("sqlite:///"):
+        return SQLiteStore(spec[len("sqlite:///"):])
+    module, sep, attr = spec.partition(":")
+    if sep and attr:
+        store = getattr(importlib.import_module(module), attr)()
+        logger.info("Shared store from %s (%s)", spec, type(store).__name__)
+        return store
+    raise ValueError(f"Unknown SHARED_STORE '{spec}'. Use memory, sqlite:///<path> or <module>:<factory>")
+
+
+_store: Optional[SharedStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> SharedStore:
+    """The process-wide store for SHARED_STORE, created on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = create_store(os.getenv("SHARED_STORE", "memory"))
+    return _store
@@ -0,0 +1,212 @@
+"""
+Deterministic stand-in chat model for offline load tests (LLM_PROVIDER=stub,
+WORLD_LLM_PROVIDER=stub).
+
+It recognises each prompt the backend sends — orchestrator (single tick or
+planning mode), consciousness, dialogue, memory summary (single or batched),
+crowd reaction — and answers with a well-formed canned response, after a
+simulated latency drawn from a log-normal distribution. Failures and rate
+limits are injected at configurable rates. Every draw is seeded from
+STUB_LLM_SEED, the prompt and how many times that prompt has been seen, so a
+run is reproducible regardless of how requests interleave.
+
+Environment:
+    STUB_LLM_LATENCY_MS       median latency per call           (default 800)
+    STUB_LLM_LATENCY_SIGMA    log-normal spread; 0 = fixed      (default 0.5)
+    STUB_LLM_FAILURE_RATE     fraction of calls raising an error (default 0)
+    STUB_LLM_RATE_LIMIT_RATE  fraction of calls rate-limited    (default 0)
+    STUB_LLM_STALL_RATE       fraction of calls that stall      (default 0)
+    STUB_LLM_STALL_MS         extra latency of a stalled call   (default 10000)
+    STUB_LLM_SEED             seed for all draws                (default 0)
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+
+EMOTIONS = ["HAPPY", "NEUTRAL", "SUSPICIOUS", "GRATEFUL", "CONFUSED", "EXCITED"]
+WEATHERS = ["clear", "cloudy", "rain", "fog"]
+LINES = [
+    "Aye, I heard you. Mind yourself on the road tonight.",
+    "Strange times, traveler. Keep your wits about you.",
+    "Well met. The market's busier than it's been in weeks.",
+    "I'd rather not talk about that here. Too many ears.",
+    "You've a kind look about you. What brings you this way?",
+]
+
+
+class StubRateLimitError(Exception):
+    """Named so that llm_client.is_rate_limit_error treats it like a provider 429."""
+
+
+class StubLLMError(Exception):
+    pass
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+class StubChatModel(BaseChatModel):
+    model: str = "stub"  # only labels metrics, so model tiers can be told apart
+    latency_ms: float = 800.0
+    latency_sigma: float = 0.5
+    failure_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    stall_rate: float = 0.0
+    stall_ms: float = 10000.0
+    seed: int = 0
+
+    _seen: dict = PrivateAttr(default_factory=dict)
+    _seen_lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    def __init__(self, **kwargs: Any):
+        kwargs.setdefault("latency_ms", _env_float("STUB_LLM_LATENCY_MS", 800.0))
+        kwargs.setdefault("latency_sigma", _env_float("STUB_LLM_LATENCY_SIGMA", 0.5))
+        kwargs.setdefault("failure_rate", _env_float("STUB_LLM_FAILURE_RATE", 0.0))
+        kwargs.setdefault("rate_limit_rate", _env_float("STUB_LLM_RATE_LIMIT_RATE", 0.0))
+        kwargs.setdefault("stall_rate", _env_float("STUB_LLM_STALL_RATE", 0.0))
+        kwargs.setdefault("stall_ms", _env_float("STUB_LLM_STALL_MS", 10000.0))
+        kwargs.setdefault("seed", int(os.getenv("STUB_LLM_SEED", "0")))
+        super().__init__(**kwargs)
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    # ── Deterministic draws ──
+
+    def _rng_for(self, text: str) -> random.Random:
+        digest = hashlib.sha1(text.encode()).hexdigest()
+        with self._seen_lock:
+            n = self._seen.get(digest, 0)
+            self._seen[digest] = n + 1
+        return random.Random(f"{self.seed}:{digest}:{n}")
+
+    def _plan(self, messages: List[BaseMessage]) -> tuple[float, Optional[Exception], str, str]:
+        text = "\n".join(str(m.content) for m in messages)
+        rng = self._rng_for(text)
+        latency = self.latency_ms / 1000.0 * math.exp(self.latency_sigma * rng.gauss(0.0, 1.0))
+        roll = rng.random()
+        error: Optional[Exception] = None
+        if roll < self.rate_limit_rate:
+            error = StubRateLimitError("Rate limit reached (429). Please try again in 2s.")
+        elif roll < self.rate_limit_rate + self.failure_rate:
+            error = StubLLMError("Injected stub failure")
+        content = _respond(text, rng)
+        # Drawn last so that enabling stalls leaves every other draw unchanged.
+        if self.stall_rate and rng.random() < self.stall_rate:
+            latency += self.stall_ms / 1000.0
+        return latency, error, text, content
+
+    def _result(self, text: str, content: str) -> ChatResult:
+        message = AIMessage(
+            content=content,
+            usage_metadata={
+                "input_tokens": len(text) // 4,
+                "output_tokens": len(content) // 4,
+                "total_tokens": (len(text) + len(content)) // 4,
+            },
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        latency, error, text, content = self._plan(messages)
+        time.sleep(latency)
+        if error is not None:
+            raise error
+        return self._result(text, content)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        latency, error, text, content = self._plan(messages)
+        await asyncio.sleep(latency)
+        if error is not None:
+            raise error
+        return self._result(text, content)
+
+
+# ── Canned responses per prompt type ──
+
+
+def _snapshot(text: str) -> dict:
+    match = re.search(r"Current world snapshot:\n(\{[\s\S]*?\n\})", text)
+    if not match:
+        return {}
+    try:
+        return json.loads(match.group(1))
+    except ValueError:
+        return {}
+
+
+def _orchestrator_tick(world_state: dict, rng: random.Random, tension: int) -> tuple[dict, int]:
+    actions = []
+    npc_ids = [n.get("id") for n in world_state.get("active_npcs", []) if isinstance(n, dict) and n.get("id")]
+    if npc_ids and rng.random() < 0.6:
+        actions.append({
+            "action": "send_to_npc",
+            "npc_id": rng.choice(npc_ids + ["all"]),
+            "event": "A cart overturns in the square, scattering apples everywhere",
+            "reason": "stub",
+        })
+    if rng.random() < 0.3:
+        actions.append({"action": "change_weather", "condition": rng.choice(WEATHERS),
+                        "transition": "gradual", "reason": "stub"})
+    tension = max(0, min(10, tension + rng.choice([-1, 0, 0, 1])))
+    actions.append({"action": "update_tension", "level": tension, "reason": "stub"})
+    return {"actions": actions, "narrator": "The wind shifts, and the village murmurs about what comes next."}, tension
+
+
+def _respond(text: str, rng: random.Random) -> str:
+    if "several NPCs" in text and '"reactions"' in text:
+        npc_ids = re.findall(r"^- npc_id: (\S+)", text, flags=re.MULTILINE)
+        return json.dumps({"reactions": [
+            {"npc_id": npc_id, "reasoning": "stub", "trust_delta": rng.randint(-1, 1),
+             "emotion": rng.choice(EMOTIONS), "dialogue": rng.choice(LINES)}
+            for npc_id in npc_ids
+        ]})
+
+    if "several NPCs' memories" in text and '"summaries"' in text:
+        refs = re.findall(r"^- ref: (\d+)", text, flags=re.MULTILINE)
+        return json.dumps({"summaries": [
+            {"ref": int(ref), "summary": "The player has visited a few times and has been mostly polite. Trust is slowly growing."}
+            for ref in refs
+        ]})
+
+    if "inner consciousness of an NPC" in text:
+        return json.dumps({"reasoning": "The stranger seems harmless enough.",
+                           "trust_delta": rng.randint(-1, 1), "emotion": rng.choice(EMOTIONS)})
+
+    if "summarizing an NPC's memory" in text:
+        return "The player has visited a few times and has been mostly polite. Trust is slowly growing."
+
+    if "World Orchestrator" in text or "Director, what happens next?" in text:
+        world_state = _snapshot(text).get("world_state", {})
+        try:
+            tension = int(world_state.get("tension_level", 0))
+        except (TypeError, ValueError):
+            tension = 0
+        plan = re.search(r"plan the next (\d+) world ticks", text)
+        if plan:
+            schedule = []
+            for _ in range(int(plan.group(1))):
+                tick, tension = _orchestrator_tick(world_state, rng, tension)
+                schedule.append(tick)
+            return json.dumps({"schedule": schedule})
+        tick, _ = _orchestrator_tick(world_state, rng, tension)
+        return json.dumps(tick)
+
+    return rng.choice(LINES)
@@ -0,0 +1,134 @@
+"""
+Per-request stage timings, reported through the Server-Timing header.
+
+A route calls `start_timing()`; from then on every graph node, LLM call,
+clean_dialogue, TTS request and directive run reached from that request adds
+its wall time to a request-local StageTimings (carried by a ContextVar, so
+graph worker threads and to_thread calls report into the same object). Stages
+that run more than once — orchestrator attempts, one node across several
+directive runs — are summed and counted.
+
+When no timing is active (SERVER_TIMING=0, WebSocket sessions, the scheduler)
+`stage()` and `record_stage()` cost one ContextVar lookup.
+
+Environment:
+    SERVER_TIMING   1 | 0   emit the Server-Timing header (default 1)
+    DEBUG_TIMINGS   1 | 0   also return the breakdown as a `timings` field (default 0)
+"""
+
+import contextvars
+import os
+import re
+import threading
+import time
+from typing import Optional
+
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING", "1").lower() not in ("0", "false", "no")
+DEBUG_TIMINGS = os.getenv("DEBUG_TIMINGS", "0").lower() in ("1", "true", "yes")
+
+_current: contextvars.ContextVar[Optional["StageTimings"]] = contextvars.ContextVar("stage_timings", default=None)
+
+_TOKEN_UNSAFE = re.compile(r"[^A-Za-z0-9_.\-]")
+
+
+class StageTimings:
+    """Accumulated wall time and call count per stage name for one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._stages: dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            entry = self._stages.get(name)
+            if entry is None:
+                self._stages[name] = [seconds, 1]
+            else:
+                entry[0] += seconds
+                entry[1] += 1
+
+    def total(self) -> float:
+        return time.perf_counter() - self.started
+
+    def as_dict(self) -> dict[str, dict]:
+        """{"stage": {"ms": 812.3, "count": 1}, ..., "total": {...}} in first-seen order."""
+        with self._lock:
+            stages = {name: {"ms": round(s * 1000, 1), "count": n} for name, (s, n) in self._stages.items()}
+        stages["total"] = {"ms": round(self.total() * 1000, 1), "count": 1}
+        return stages
+
+    def header(self) -> str:
+        """Server-Timing value, e.g. `npc.consciousness;dur=812.3, tts;dur=402.0, total;dur=1250.8`."""
+        parts = []
+        for name, entry in self.as_dict().items():
+            part = f"{_TOKEN_UNSAFE.sub('_', name)};dur={entry['ms']}"
+            if entry["count"] > 1:
+                part += f';desc="x{entry["count"]}"'
+            parts.append(part)
+        return ", ".join(parts)
+
+
+class _Stage:
+    __slots__ = ("timings", "name", "start")
+
+    def __init__(self, timings: StageTimings, name: str):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timings.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def start_timing() -> Optional[StageTimings]:
+    """Begin collecting stage timings for the current request (None when disabled)."""
+    if not SERVER_TIMING_ENABLED:
+        return None
+    timings = StageTimings()
+    _current.set(timings)
+    return timings
+
+
+def current_timings() -> Optional[StageTimings]:
+    return _current.get()
+
+
+def stage(name: str):
+    """Context manager timing a block as `name`; a no-op when no timing is active."""
+    timings = _current.get()
+    if timings is None:
+        return _NULL_STAGE
+    return _Stage(timings, name)
+
+
+def record_stage(name: str, seconds: float) -> None:
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+def apply_timings(timings: Optional[StageTimings], response, model=None) -> None:
+    """Set the Server-Timing header on `response` and, in debug mode, `model.timings`."""
+    if timings is None:
+        return
+    response.headers["Server-Timing"] = timings.header()
+    if DEBUG_TIMINGS and model is not None:
+        model.timings = timings.as_dict()
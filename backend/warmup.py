@@ -0,0 +1,132 @@
+"""
+Fast cold start: lazy singletons, background warm-up and readiness.
+
+The graphs, and the LLM clients they hold, are built on first use instead of
+at import time. `Lazy` wraps a factory, builds it once under a lock and
+records how long the build took. Once the app has started, `start_warm_up`
+builds every Lazy in the background. With WARMUP_PING=1 it also sends one tiny
+prompt through each configured model, so the provider connection is open
+before the first player request arrives.
+
+`/ready` answers 503 until the warm-up has finished. `/health` only reports
+that the process is up. Import and build times appear in
+npcs_startup_seconds{phase} and in the `/ready` body.
+
+Environment:
+    WARMUP_ON_STARTUP   1 | 0  build the graphs in the background after startup (default 1)
+    WARMUP_PING         1 | 0  also send one tiny prompt per model (default 0; each costs a call)
+"""
+
+import asyncio
+import os
+import threading
+import time
+from typing import Callable, Generic, Iterable, Optional, TypeVar
+
+from .log import get_logger
+from .metrics import STARTUP_SECONDS
+
+logger = get_logger("Warmup")
+
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "1").lower() in ("1", "true", "yes")
+WARMUP_PING = os.getenv("WARMUP_PING", "0").lower() in ("1", "true", "yes")
+
+T = TypeVar("T")
+
+_registry: list["Lazy"] = []
+_startup: dict[str, float] = {}
+_warm_up_task: Optional[asyncio.Task] = None
+_warm_up_error: Optional[str] = None
+
+
+def record_startup(phase: str, seconds: float) -> None:
+    _startup[phase] = round(seconds, 4)
+    STARTUP_SECONDS.labels(phase=phase).set(seconds)
+
+
+class Lazy(Generic[T]):
+    """
+    A value built by `factory` on first use. `models(value)` optionally lists
+    the (pipeline, chat model) pairs the warm-up should ping.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], T],
+                 models: Optional[Callable[[T], Iterable[tuple[str, object]]]] = None):
+        self.name = name
+        self.models = models
+        self._factory = factory
+        self._value: Optional[T] = None
+        self._built = False
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    @property
+    def ready(self) -> bool:
+        return self._built
+
+    def get(self) -> T:
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    start = time.perf_counter()
+                    self._value = self._factory()
+                    self._built = True
+                    elapsed = time.perf_counter() - start
+                    record_startup(self.name, elapsed)
+                    logger.info("Built %s in %.0f ms", self.name, elapsed * 1000)
+        return self._value
+
+    async def aget(self) -> T:
+        """get() without blocking the event loop while the value is being built."""
+        if self._built:
+            return self._value
+        return await asyncio.to_thread(self.get)
+
+
+async def _ping(pipeline: str, llm) -> None:
+    from .llm_client import ainvoke_llm
+    try:
+        await ainvoke_llm(llm, "Reply with OK.", pipeline=pipeline, node="warmup")
+    except Exception as e:
+        logger.warning("Warm-up ping of %s model failed: %s: %s", pipeline, type(e).__name__, e)
+
+
+async def _warm_up() -> None:
+    global _warm_up_error
+    start = time.perf_counter()
+    try:
+        for lazy in list(_registry):
+            await lazy.aget()
+        if WARMUP_PING:
+            pings = [_ping(pipeline, llm) for lazy in _registry if lazy.models
+                     for pipeline, llm in lazy.models(lazy.get())]
+            await asyncio.gather(*pings)
+    except Exception as e:
+        _warm_up_error = f"{type(e).__name__}: {e}"
+        logger.error("Warm-up failed: %s", _warm_up_error, exc_info=True)
+        return
+    record_startup("warmup", time.perf_counter() - start)
+    logger.info("Warm-up done in %.0f ms", (time.perf_counter() - start) * 1000)
+
+
+def start_warm_up() -> None:
+    """Called once the app has started; the server accepts connections meanwhile."""
+    global _warm_up_task
+    if WARMUP_ON_STARTUP and _warm_up_task is None:
+        _warm_up_task = asyncio.get_running_loop().create_task(_warm_up())
+
+
+def readiness() -> dict:
+    """Body of /ready. Without a startup warm-up the first request builds the graphs itself."""
+    if WARMUP_ON_STARTUP:
+        ready = _warm_up_task is not None and _warm_up_task.done() and _warm_up_error is None
+    else:
+        ready = True
+    body = {
+        "ready": ready,
+        "components": {lazy.name: lazy.ready for lazy in _registry},
+        "startup_seconds": dict(_startup),
+    }
+    if _warm_up_error:
+        body["error"] = _warm_up_error
+    return body
@@ -0,0 +1,213 @@
+"""
+Wire formats and response compression.
+
+A pure ASGI middleware sits in front of the JSON API:
+  - Request bodies sent as `Content-Type: application/msgpack` are decoded and
+    passed on to FastAPI as JSON, so routes and models stay unchanged.
+  - Responses go out as MessagePack when the client's Accept header lists
+    application/msgpack, and as JSON otherwise. JSON is rendered with orjson
+    when it is installed (main.py's default_response_class).
+  - Response bodies of at least WIRE_COMPRESS_MIN_BYTES are compressed with
+    zstd when the client accepts it and `zstandard` is installed, otherwise
+    with gzip. Bodies above _THREAD_MIN_BYTES are compressed off the event loop.
+
+orjson, msgpack and zstandard are optional. Without them, JSON uses the
+stdlib encoder, MessagePack responses fall back to JSON, MessagePack requests
+get a 415, and compression is gzip only. WebSocket traffic is not touched.
+
+Environment:
+    WIRE_COMPRESS_MIN_BYTES   smallest body worth compressing; 0 = never (default 1024)
+    WIRE_GZIP_LEVEL           gzip level (default 5)
+    WIRE_ZSTD_LEVEL           zstd level (default 3)
+"""
+
+import asyncio
+import gzip
+import json
+import os
+from typing import Any, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("WIRE_COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("WIRE_GZIP_LEVEL", "5"))
+ZSTD_LEVEL = int(os.getenv("WIRE_ZSTD_LEVEL", "3"))
+
+_THREAD_MIN_BYTES = 64 * 1024
+_MSGPACK_TYPES = (b"application/msgpack", b"application/x-msgpack")
+_COMPRESSIBLE_TYPES = (b"application/json", b"application/msgpack", b"text/")
+
+
+def dumps_json(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads_json(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _accepted(header: bytes) -> dict[bytes, float]:
+    """{token: q} for an Accept / Accept-Encoding header value."""
+    accepted = {}
+    for part in header.lower().split(b","):
+        token, _, params = part.strip().partition(b";")
+        q = 1.0
+        for param in params.split(b";"):
+            name, _, value = param.strip().partition(b"=")
+            if name == b"q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if token:
+            accepted[token] = q
+    return accepted
+
+
+def choose_encoding(accept_encoding: bytes) -> Optional[str]:
+    """zstd or gzip if the client takes it (zstd preferred), else None."""
+    accepted = _accepted(accept_encoding)
+    if zstandard is not None and accepted.get(b"zstd", 0) > 0:
+        return "zstd"
+    if accepted.get(b"gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def wants_msgpack(accept: bytes) -> bool:
+    accepted = _accepted(accept)
+    return msgpack is not None and any(accepted.get(t, 0) > 0 for t in _MSGPACK_TYPES)
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def _header(headers, name: bytes) -> bytes:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return b""
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+def _replay(body: bytes, receive):
+    """A receive() that yields `body` once, then defers to the real one (disconnects)."""
+    delivered = False
+
+    async def replay():
+        nonlocal delivered
+        if not delivered:
+            delivered = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+    return replay
+
+
+async def _send_error(send, status: int, detail: str) -> None:
+    body = dumps_json({"detail": detail})
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]})
+    await send({"type": "http.response.body", "body": body})
+
+
+class WireFormatMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = scope.get("headers", [])
+        if _header(headers, b"content-type").split(b";")[0].strip() in _MSGPACK_TYPES:
+            if msgpack is None:
+                await _send_error(send, 415, "MessagePack request bodies need the msgpack package on the server")
+                return
+            try:
+                payload = dumps_json(msgpack.unpackb(await _read_body(receive), raw=False))
+            except Exception as e:
+                await _send_error(send, 400, f"Invalid MessagePack body: {e}")
+                return
+            headers = [(k, v) for k, v in headers if k.lower() not in (b"content-type", b"content-length")]
+            headers += [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())]
+            scope = {**scope, "headers": headers}
+            receive = _replay(payload, receive)
+
+        to_msgpack = wants_msgpack(_header(headers, b"accept"))
+        encoding = choose_encoding(_header(headers, b"accept-encoding")) if COMPRESS_MIN_BYTES > 0 else None
+        if not to_msgpack and encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        chunks: list[bytes] = []
+
+        async def buffered_send(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                await self._send_encoded(send, start, b"".join(chunks), to_msgpack, encoding)
+
+        await self.app(scope, receive, buffered_send)
+
+    @staticmethod
+    async def _send_encoded(send, start, body: bytes, to_msgpack: bool, encoding: Optional[str]) -> None:
+        headers = [(k, v) for k, v in start.get("headers", []) if k.lower() != b"content-length"]
+        content_type = _header(headers, b"content-type")
+
+        if to_msgpack and body and content_type.startswith(b"application/json"):
+            body = msgpack.packb(loads_json(body), use_bin_type=True)
+            headers = [(k, v) for k, v in headers if k.lower() != b"content-type"]
+            headers.append((b"content-type", b"application/msgpack"))
+            content_type = b"application/msgpack"
+
+        if (encoding and len(body) >= COMPRESS_MIN_BYTES and not _header(headers, b"content-encoding")
+                and content_type.startswith(_COMPRESSIBLE_TYPES)):
+            if len(body) >= _THREAD_MIN_BYTES:
+                body = await asyncio.to_thread(compress, body, encoding)
+            else:
+                body = compress(body, encoding)
+            headers.append((b"content-encoding", encoding.encode()))
+
+        headers.append((b"vary", b"Accept, Accept-Encoding"))
+        headers.append((b"content-length", str(len(body)).encode()))
+        await send({**start, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -1,49 +1,64 @@
-import traceback
 from .graph import create_world_graph, world_graph
 from .state import WorldOrchestratorState
 from .output_schema import OrchestratorOutput
+from ..log import get_logger
+from ..metrics import LLM_RATE_LIMIT_FALLBACKS
 
+logger = get_logger("WO")
 
-async def call_orchestrator(world_state: dict, recent_events: list) -> dict:
+
+async def call_orchestrator(world_state: dict, recent_events: list, plan_ticks: int = 1) -> dict:
     """
     One-shot convenience wrapper around the LangGraph workflow.
     Returns {"actions": [...], "narrator": "...", "npc_directives": [...]}.
+
+    With plan_ticks > 1 the director plans several ticks at once and the
+    result also carries "schedule": one {actions, narrator, npc_directives}
+    entry per tick, the first of which matches the top-level fields.
     """
-    print(f"[WO] call_orchestrator started | events_count={len(recent_events)}")
+    logger.info("call_orchestrator started | events_count=%s | plan_ticks=%s", len(recent_events), plan_ticks)
     try:
-        result = await world_graph.ainvoke({
+        graph = await world_graph.aget()
+        result = await graph.ainvoke({
             "world_state": world_state,
             "recent_events": recent_events,
+            "plan_ticks": plan_ticks,
         })
         actions = result.get("actions", [])
         npc_directives = result.get("npc_directives", [])
         validation_status = result.get("validation_status", "VALID")
-        print(f"[WO] call_orchestrator done | actions={len(actions)} | npc_directives={len(npc_directives)} | status={validation_status}")
+        logger.info("call_orchestrator done | actions=%s | npc_directives=%s | status=%s", len(actions), len(npc_directives), validation_status)
         return {
             "actions": actions,
             "narrator": result.get("narrator", ""),
             "npc_directives": npc_directives,
             "validation_status": validation_status,
+            "schedule": result.get("schedule", []),
         }
     except Exception as e:
         err_name = type(e).__name__
-        print(f"[WO] call_orchestrator ERROR: {err_name}: {e}")
         # Graceful fallback for rate-limit and transient errors — avoid 500s
         if "RateLimitError" in err_name or "429" in str(e):
-            print(f"[WO] Rate-limited — returning empty fallback response")
+            logger.warning("call_orchestrator rate-limited (%s: %s) — returning empty fallback response", err_name, e)
+            LLM_RATE_LIMIT_FALLBACKS.labels(provider="unknown", pipeline="world").inc()
             return {
                 "actions": [],
                 "narrator": "The world rests quietly for now...",
                 "npc_directives": [],
                 "validation_status": "RATE_LIMITED",
+                "schedule": [],
             }
-        print(traceback.format_exc())
+        logger.error("call_orchestrator failed: %s: %s", err_name, e, exc_info=True)
         raise
 
 
+from .planner import TickPlanner, tick_planner  # noqa: E402  (planner calls back into call_orchestrator)
+
 __all__ = [
     "create_world_graph",
     "call_orchestrator",
+    "TickPlanner",
+    "tick_planner",
     "WorldOrchestratorState",
     "OrchestratorOutput",
 ]
@@ -5,6 +5,11 @@ Usage (run from the project root):
     python -m backend.world_orchestrator.cli_test                  # run all scenarios
     python -m backend.world_orchestrator.cli_test --scenario hero  # run a single scenario
     python -m backend.world_orchestrator.cli_test --custom         # enter custom values
+
+Record once against a real provider, then replay offline (no API keys, same
+responses, optionally the recorded latencies) to compare prompt changes:
+    python -m backend.world_orchestrator.cli_test --record cassettes/wo.jsonl
+    python -m backend.world_orchestrator.cli_test --replay cassettes/wo.jsonl --replay-latency
 """
 
 import argparse
@@ -17,7 +22,8 @@ import os
 _project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 sys.path.insert(0, _project_root)
 
-from backend.world_orchestrator import call_orchestrator  # noqa: E402
+# backend.world_orchestrator is imported inside run_scenario: its graph builds
+# the LLM at import time, after main() has applied --record / --replay.
 
 # ──────────────────────────────────────────────
 # Pre-built scenarios
@@ -165,6 +171,8 @@ def _get_provider_label() -> str:
 
 
 async def run_scenario(name: str, scenario: dict):
+    from backend.world_orchestrator import call_orchestrator
+
     print_header(f"Scenario: {scenario['label']}")
     print_world_state(scenario["world_state"])
     print(f"\n  Calling {_get_provider_label()} API...")
@@ -254,8 +262,21 @@ async def main():
         action="store_true",
         help="Enter custom world state values interactively",
     )
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument("--record", metavar="PATH", help="Record every LLM exchange to a cassette file")
+    cassette.add_argument("--replay", metavar="PATH", help="Serve LLM responses from a recorded cassette")
+    parser.add_argument(
+        "--replay-latency",
+        action="store_true",
+        help="When replaying, sleep for each exchange's recorded latency",
+    )
     args = parser.parse_args()
 
+    if args.record or args.replay:
+        os.environ["LLM_CASSETTE"] = args.record or args.replay
+        os.environ["LLM_CASSETTE_MODE"] = "record" if args.record else "replay"
+        os.environ["LLM_CASSETTE_LATENCY"] = "1" if args.replay_latency else "0"
+
     if args.custom:
         await run_custom()
     elif args.scenario:
@@ -267,6 +288,15 @@ async def main():
             await run_scenario(name, scenario)
             print()
 
+    if args.record:
+        from backend.cassette import summarize
+
+        print_header(f"Cassette: {args.record}")
+        for pipeline, row in summarize(args.record).items():
+            print(f"  {pipeline}: {row['calls']} calls, {row['errors']} errors "
+                  f"({row['rate_limited']} rate-limited), "
+                  f"{row['input_tokens']} in / {row['output_tokens']} out tokens")
+
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -1,6 +1,9 @@
-from langgraph.graph import StateGraph, START, END
 from .state import WorldOrchestratorState
-from .nodes import NodeExecutor
+from ..log import get_logger
+from ..metrics import timed_node
+from ..warmup import Lazy
+
+logger = get_logger("WO-Graph")
 
 
 def _route_after_validation(state: WorldOrchestratorState) -> str:
@@ -37,14 +40,21 @@ def create_world_graph(
                                                              |
                                         (VALID/FALLBACK) ----+-> dispatch_npc_actions -> END
     """
-    executor = NodeExecutor(provider=provider, model=model, temperature=temperature)
+    from .nodes import NodeExecutor
+
+    return _build_world_graph(NodeExecutor(provider=provider, model=model, temperature=temperature))
+
+
+def _build_world_graph(executor):
+    """Compile the graph around an existing NodeExecutor (see create_world_graph for the flow)."""
+    from langgraph.graph import StateGraph, START, END
 
     graph = StateGraph(WorldOrchestratorState)
 
-    graph.add_node("normalize_input", executor.normalize_input)
-    graph.add_node("generate_actions", executor.generate_actions)
-    graph.add_node("validate_output", executor.validate_output)
-    graph.add_node("dispatch_npc_actions", executor.dispatch_npc_actions)
+    graph.add_node("normalize_input", timed_node("world", "normalize_input", executor.normalize_input))
+    graph.add_node("generate_actions", timed_node("world", "generate_actions", executor.generate_actions))
+    graph.add_node("validate_output", timed_node("world", "validate_output", executor.validate_output))
+    graph.add_node("dispatch_npc_actions", timed_node("world", "dispatch_npc_actions", executor.dispatch_npc_actions))
 
     graph.add_edge(START, "normalize_input")
     graph.add_edge("normalize_input", "generate_actions")
@@ -64,8 +74,12 @@ def create_world_graph(
     return graph.compile()
 
 
-# ── Module-level singleton ──────────────────────────────────────────────────────
-# Built once at import time; reused for every tick.
-print("[WO-Graph] Building singleton World Orchestrator graph...")
-world_graph = create_world_graph()
-print("[WO-Graph] Singleton World Orchestrator graph ready.")
+def _make_world_executor():
+    from .nodes import NodeExecutor
+    return NodeExecutor()
+
+
+# ── Module-level singletons ─────────────────────────────────────────────────────
+# Built once, on first use (or by the startup warm-up); reused for every tick.
+world_executor = Lazy("world_executor", _make_world_executor, models=lambda executor: [("world", executor.llm)])
+world_graph = Lazy("world_graph", lambda: _build_world_graph(world_executor.get()))
@@ -4,17 +4,25 @@ import re
 
 from dotenv import load_dotenv
 
+from ..cassette import cassette_mode, with_cassette
+from ..hedging import with_hedging
+from ..log import get_logger
+from ..model_tiers import ModelSpec, node_spec
+
 load_dotenv()
 
+logger = get_logger("WO-LLM")
+
 # ── Provider defaults ──
 PROVIDER_DEFAULTS = {
     "ollama": "llama2",
     "groq": "llama-3.3-70b-versatile",
     "mistral": "mistral-large-latest",
+    "stub": "stub",
 }
 
 
-def get_llm(provider: str = None, model: str = None, temperature: float = 0.8):
+def get_llm(provider: str = None, model: str = None, temperature: float = 0.8, node: str = None):
     """
     Return a LangChain chat LLM based on the configured provider.
 
@@ -27,55 +35,97 @@ def get_llm(provider: str = None, model: str = None, temperature: float = 0.8):
       1. Explicit `model` argument
       2. WORLD_LLM_MODEL env var
       3. Provider-specific default
+
+    With `node` given, WORLD_LLM_<NODE>_PROVIDER / _MODEL / _TEMPERATURE /
+    _MAX_TOKENS override the above for that call site (see model_tiers).
+
+    With LLM_CASSETTE set the model is wrapped for record/replay; in replay
+    mode no provider is constructed at all. With LLM_HEDGE=1 slow calls are
+    hedged to WORLD_LLM_HEDGE_PROVIDER / WORLD_LLM_HEDGE_MODEL (default: the
+    same provider and model, with LLM_HEDGE_API_KEY if set).
     """
+    if cassette_mode() == "replay":
+        return with_cassette(None, "world")
+    provider = (provider or os.getenv("WORLD_LLM_PROVIDER", "ollama")).lower()
+    spec = ModelSpec(provider, model or os.getenv("WORLD_LLM_MODEL") or PROVIDER_DEFAULTS.get(provider), temperature)
+    if node:
+        spec = node_spec("world", node, spec, PROVIDER_DEFAULTS.get)
+    hedge_provider = (os.getenv("WORLD_LLM_HEDGE_PROVIDER") or spec.provider).lower()
+    llm = with_hedging(
+        _make_llm(spec.provider, spec.model, spec.temperature, max_tokens=spec.max_tokens),
+        "world",
+        lambda: _make_llm(
+            hedge_provider,
+            os.getenv("WORLD_LLM_HEDGE_MODEL") or (spec.model if hedge_provider == spec.provider else None),
+            spec.temperature,
+            hedge=True,
+            max_tokens=spec.max_tokens,
+        ),
+    )
+    return with_cassette(llm, "world")
+
+
+def _make_llm(provider: str = None, model: str = None, temperature: float = 0.8, hedge: bool = False,
+              max_tokens: int = None):
     provider = (provider or os.getenv("WORLD_LLM_PROVIDER", "ollama")).lower()
     model = model or os.getenv("WORLD_LLM_MODEL") or PROVIDER_DEFAULTS.get(provider)
     provider = (provider or os.getenv("LLM_PROVIDER", "ollama")).lower()
     model = model or os.getenv("LLM_MODEL") or PROVIDER_DEFAULTS.get(provider)
 
-    print(f"[WO-LLM] Initializing LLM | provider={provider} | model={model} | temperature={temperature}")
+    logger.info("Initializing LLM | provider=%s | model=%s | temperature=%s", provider, model, temperature)
+    limit = {} if max_tokens is None else {"max_tokens": max_tokens}
 
     if provider == "ollama":
         from langchain_ollama import ChatOllama
         base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
-        print(f"[WO-LLM] Connecting to Ollama at {base_url}")
+        logger.info("Connecting to Ollama at %s", base_url)
         return ChatOllama(
             model=model,
             base_url=base_url,
             temperature=temperature,
             format="json",
+            **({} if max_tokens is None else {"num_predict": max_tokens}),
         )
 
     elif provider == "groq":
         from langchain_groq import ChatGroq
-        api_key = os.getenv("GROQ_API_KEY")
+        api_key = (hedge and os.getenv("LLM_HEDGE_API_KEY")) or os.getenv("GROQ_API_KEY")
         if not api_key:
-            print(f"[WO-LLM] ERROR: GROQ_API_KEY is not set")
+            logger.error("GROQ_API_KEY is not set")
             raise EnvironmentError("GROQ_API_KEY is not set. Add it to your .env file.")
-        print(f"[WO-LLM] Using Groq with model={model}")
+        logger.info("Using Groq with model=%s", model)
         return ChatGroq(
             model=model,
             api_key=api_key,
             temperature=temperature,
             model_kwargs={"response_format": {"type": "json_object"}},
+            **limit,
         )
 
     elif provider == "mistral":
         from langchain_mistralai import ChatMistralAI
-        api_key = os.getenv("MISTRAL_API_KEY")
+        api_key = (hedge and os.getenv("LLM_HEDGE_API_KEY")) or os.getenv("MISTRAL_API_KEY")
         if not api_key:
-            print(f"[WO-LLM] ERROR: MISTRAL_API_KEY is not set")
+            logger.error("MISTRAL_API_KEY is not set")
             raise EnvironmentError("MISTRAL_API_KEY is not set. Add it to your .env file.")
-        print(f"[WO-LLM] Using Mistral with model={model}")
+        logger.info("Using Mistral with model=%s", model)
         return ChatMistralAI(
             model=model,
             api_key=api_key,
             temperature=temperature,
             model_kwargs={"response_format": {"type": "json_object"}},
+            **limit,
         )
 
+    elif provider == "stub":
+        from ..stub_llm import StubChatModel
+        logger.info("Using offline stub model (load testing)")
+        if hedge:
+            return StubChatModel(model=model, seed=int(os.getenv("STUB_LLM_SEED", "0")) + 1)
+        return StubChatModel(model=model)
+
     else:
-        print(f"[WO-LLM] ERROR: Unknown provider '{provider}'")
+        logger.error("Unknown provider '%s'", provider)
         raise ValueError(
             f"Unknown WORLD_LLM_PROVIDER '{provider}'. "
             f"Unknown LLM_PROVIDER '{provider}'. "
@@ -93,21 +143,21 @@ def _extract_json(raw: str) -> dict:
 
     fenced = re.match(r"^```(?:json)?\s*([\s\S]*?)```$", text, re.IGNORECASE)
     if fenced:
-        print(f"[WO-LLM] Stripping markdown code fence from response")
+        logger.debug("Stripping markdown code fence from response")
         text = fenced.group(1).strip()
 
     try:
         return json.loads(text)
     except json.JSONDecodeError as e:
-        print(f"[WO-LLM] Direct JSON parse failed: {e} — trying regex extraction")
+        logger.debug("Direct JSON parse failed: %s — trying regex extraction", e)
         match = re.search(r"\{[\s\S]*\}", text)
         if match:
             try:
                 return json.loads(match.group(0))
             except json.JSONDecodeError as e2:
-                print(f"[WO-LLM] Regex JSON extraction also failed: {e2}")
+                logger.warning("Regex JSON extraction also failed: %s", e2)
 
-    print(f"[WO-LLM] Could not parse JSON from response. Raw snippet: {raw[:200]}")
+    logger.warning("Could not parse JSON from response. Raw snippet: %s", raw[:200])
     raise ValueError(
         f"Could not parse JSON from response.\nRaw:\n{raw}"
     )
\ No newline at end of file
@@ -1,14 +1,22 @@
 import json
 import re
 import asyncio
-import traceback
 
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
 
 from .state import WorldOrchestratorState
 from .llm import get_llm, _extract_json
 from .output_schema import OrchestratorOutput
-from .prompts import SYSTEM_PROMPT, RETRY_PROMPT
+from ..llm_client import ainvoke_llm, provider_of, is_rate_limit_error
+from ..log import get_logger
+from ..metrics import LLM_RETRIES, LLM_RATE_LIMIT_FALLBACKS
+from .prompts import SYSTEM_PROMPT, RETRY_PROMPT, PLAN_PROMPT, PLAN_RETRY_HINT
+
+init_log = get_logger("WO-Init")
+normalize_log = get_logger("WO-Normalize")
+generate_log = get_logger("WO-Generate")
+validate_log = get_logger("WO-Validate")
+dispatch_log = get_logger("WO-Dispatch")
 
 
 def _parse_retry_after(error_message: str) -> float:
@@ -22,13 +30,25 @@ def _parse_retry_after(error_message: str) -> float:
     return 300.0  # assume 5 min if unparseable
 
 
+def _split_directives(actions: list[dict]) -> tuple[list[dict], list[dict]]:
+    """Split an action list into (world actions, send_to_npc directives)."""
+    npc_directives = []
+    other_actions = []
+    for action in actions:
+        if action.get("action") == "send_to_npc":
+            npc_directives.append(action)
+        else:
+            other_actions.append(action)
+    return other_actions, npc_directives
+
+
 class NodeExecutor:
     """Stateless executor — each method is a LangGraph node function."""
 
     def __init__(self, provider: str = None, model: str = None, temperature: float = 0.8):
-        print(f"[WO-Init] Initializing World Orchestrator NodeExecutor | provider={provider} | model={model}")
-        self.llm = get_llm(provider=provider, model=model, temperature=temperature)
-        print(f"[WO-Init] NodeExecutor ready")
+        init_log.info("Initializing World Orchestrator NodeExecutor | provider=%s | model=%s", provider, model)
+        self.llm = get_llm(provider=provider, model=model, temperature=temperature, node="generate_actions")
+        init_log.info("NodeExecutor ready")
 
     # ── Node 1: normalize_input (sync, no LLM) ──
 
@@ -37,7 +57,7 @@ class NodeExecutor:
         Fill defaults in world_state, convert event dicts to strings,
         build the formatted user message. Sets retry_count to 0.
         """
-        print(f"[WO-Normalize] Normalizing input | world_state_keys={list(state.get('world_state', {}).keys())} | events_count={len(state.get('recent_events', []))}")
+        normalize_log.debug("Normalizing input | world_state_keys=%s | events_count=%s", list(state.get("world_state", {}).keys()), len(state.get("recent_events", [])))
         try:
             defaults = {
                 "player_karma": 0,
@@ -74,7 +94,11 @@ class NodeExecutor:
                 + "\n\nDirector, what happens next?"
             )
 
-            print(f"[WO-Normalize] Done | normalized_events={normalized_events}")
+            plan_ticks = state.get("plan_ticks", 1) or 1
+            if plan_ticks > 1:
+                user_message += "\n" + PLAN_PROMPT.format(plan_ticks=plan_ticks)
+
+            normalize_log.debug("Done | plan_ticks=%s | normalized_events=%s", plan_ticks, normalized_events)
             return {
                 "normalized_world_state": normalized_ws,
                 "normalized_recent_events": normalized_events,
@@ -86,10 +110,10 @@ class NodeExecutor:
                 "actions": [],
                 "narrator": "",
                 "npc_directives": [],
+                "schedule": [],
             }
         except Exception as e:
-            print(f"[WO-Normalize] ERROR: {type(e).__name__}: {e}")
-            print(traceback.format_exc())
+            normalize_log.error("Failed: %s: %s", type(e).__name__, e, exc_info=True)
             raise
 
     # ── Node 2: generate_actions (async, calls LLM via LangChain) ──
@@ -101,7 +125,8 @@ class NodeExecutor:
         sees what went wrong and can correct it.
         """
         retry_count = state.get("retry_count", 0)
-        print(f"[WO-Generate] Generating actions | retry_count={retry_count}")
+        plan_ticks = state.get("plan_ticks", 1) or 1
+        generate_log.debug("Generating actions | retry_count=%s | plan_ticks=%s", retry_count, plan_ticks)
         try:
             messages = [
                 SystemMessage(content=SYSTEM_PROMPT),
@@ -109,63 +134,75 @@ class NodeExecutor:
             ]
 
             if retry_count > 0 and state.get("validation_error"):
-                print(f"[WO-Generate] Retry #{retry_count} due to validation error: {state['validation_error']}")
+                generate_log.info("Retry #%s due to validation error: %s", retry_count, state["validation_error"])
                 messages.append(AIMessage(content=state.get("raw_response", "")))
-                messages.append(HumanMessage(content=RETRY_PROMPT.format(
-                    validation_error=state["validation_error"]
-                )))
+                retry_message = RETRY_PROMPT.format(validation_error=state["validation_error"])
+                if plan_ticks > 1:
+                    retry_message += "\n" + PLAN_RETRY_HINT.format(plan_ticks=plan_ticks)
+                messages.append(HumanMessage(content=retry_message))
 
             # Retry loop with backoff for transient rate-limits
             max_attempts = 2
             for attempt in range(max_attempts):
                 try:
-                    print(f"[WO-Generate] Calling LLM... (attempt {attempt + 1}/{max_attempts})")
-                    response = await self.llm.ainvoke(messages)
+                    generate_log.debug("Calling LLM... (attempt %s/%s)", attempt + 1, max_attempts)
+                    response = await ainvoke_llm(self.llm, messages, pipeline="world", node="generate_actions")
                     break  # success
                 except Exception as llm_err:
-                    err_name = type(llm_err).__name__
-                    if "RateLimitError" in err_name or "429" in str(llm_err):
+                    if is_rate_limit_error(llm_err):
                         wait_seconds = _parse_retry_after(str(llm_err))
                         if wait_seconds <= 30 and attempt < max_attempts - 1:
-                            print(f"[WO-Generate] Rate-limited, waiting {wait_seconds:.0f}s before retry...")
+                            generate_log.warning("Rate-limited, waiting %.0fs before retry...", wait_seconds)
+                            LLM_RETRIES.labels(pipeline="world", reason="rate_limit").inc()
                             await asyncio.sleep(wait_seconds)
                             continue
                         # Too long to wait or final attempt — graceful fallback
-                        print(f"[WO-Generate] Rate-limited (retry_after={wait_seconds:.0f}s) — returning empty actions")
+                        generate_log.warning("Rate-limited (retry_after=%.0fs) — returning empty actions", wait_seconds)
+                        LLM_RATE_LIMIT_FALLBACKS.labels(provider=provider_of(self.llm), pipeline="world").inc()
                         return {
                             "raw_response": "",
                             "actions": [],
                             "narrator": "The world rests quietly for now...",
+                            "schedule": [],
                         }
                     raise  # non-rate-limit error, propagate
 
             raw_content = response.content
-            print(f"[WO-Generate] LLM response received, len={len(raw_content)}")
+            generate_log.debug("LLM response received, len=%s", len(raw_content))
 
             try:
                 parsed = _extract_json(raw_content)
-                actions = parsed.get("actions", [])
-                narrator = parsed.get("narrator", "")
+                schedule = []
+                if plan_ticks > 1 and isinstance(parsed.get("schedule"), list):
+                    # Planning mode: the first scheduled tick doubles as this tick's output
+                    schedule = parsed["schedule"][:plan_ticks]
+                    first = schedule[0] if schedule and isinstance(schedule[0], dict) else {}
+                    actions = first.get("actions", [])
+                    narrator = first.get("narrator", "")
+                else:
+                    actions = parsed.get("actions", [])
+                    narrator = parsed.get("narrator", "")
                 if not narrator or not str(narrator).strip():
                     narrator = "The world holds its breath, waiting for the next move."
-                print(f"[WO-Generate] JSON parsed successfully | actions_count={len(actions)} | narrator_len={len(narrator)}")
+                generate_log.debug("JSON parsed successfully | actions_count=%s | narrator_len=%s | schedule_len=%s", len(actions), len(narrator), len(schedule))
             except ValueError as ve:
-                print(f"[WO-Generate] JSON parse FAILED: {ve}")
-                print(f"[WO-Generate] Raw response snippet: {raw_content[:300]}")
+                generate_log.warning("JSON parse FAILED: %s", ve)
+                generate_log.debug("Raw response snippet: %s", raw_content[:300])
                 return {
                     "raw_response": raw_content,
                     "actions": [],
                     "narrator": "",
+                    "schedule": [],
                 }
 
             return {
                 "raw_response": raw_content,
                 "actions": actions,
                 "narrator": narrator,
+                "schedule": schedule,
             }
         except Exception as e:
-            print(f"[WO-Generate] ERROR: {type(e).__name__}: {e}")
-            print(traceback.format_exc())
+            generate_log.error("Failed: %s: %s", type(e).__name__, e, exc_info=True)
             raise
 
     # ── Node 3: validate_output (sync, no LLM) ──
@@ -177,30 +214,47 @@ class NodeExecutor:
         """
         retry_count = state.get("retry_count", 0)
         actions_count = len(state.get("actions", []))
-        print(f"[WO-Validate] Validating output | actions_count={actions_count} | retry_count={retry_count}")
+        validate_log.debug("Validating output | actions_count=%s | retry_count=%s", actions_count, retry_count)
         try:
             OrchestratorOutput(
                 actions=state.get("actions", []),
                 narrator=state.get("narrator", ""),
             )
-            print(f"[WO-Validate] Validation PASSED")
+            schedule = state.get("schedule") or []
+            errors = []
+            for i, step in enumerate(schedule[1:], start=2):
+                if not isinstance(step, dict):
+                    errors.append(f"Schedule tick {i}: expected an object, got {type(step).__name__}")
+                    continue
+                try:
+                    OrchestratorOutput(
+                        actions=step.get("actions", []),
+                        narrator=step.get("narrator", ""),
+                    )
+                except Exception as step_err:
+                    errors.append(f"Schedule tick {i}: {step_err}")
+            if errors:
+                raise ValueError("Schedule validation failed:\n" + "\n".join(errors))
+            validate_log.debug("Validation PASSED | schedule_len=%s", len(schedule))
             return {
                 "validation_status": "VALID",
                 "validation_error": None,
             }
         except Exception as e:
             new_retry_count = retry_count + 1
-            print(f"[WO-Validate] Validation FAILED (attempt {new_retry_count}/3): {type(e).__name__}: {e}")
+            validate_log.warning("Validation FAILED (attempt %s/3): %s: %s", new_retry_count, type(e).__name__, e)
             if new_retry_count >= 3:
-                print(f"[WO-Validate] Max retries reached, falling back to empty actions")
+                validate_log.warning("Max retries reached, falling back to empty actions")
                 return {
                     "validation_status": "FALLBACK",
                     "validation_error": str(e),
                     "retry_count": new_retry_count,
                     "actions": [],
                     "narrator": "The world holds its breath, waiting.",
+                    "schedule": [],
                 }
-            print(f"[WO-Validate] Will retry ({new_retry_count}/3)")
+            validate_log.debug("Will retry (%s/3)", new_retry_count)
+            LLM_RETRIES.labels(pipeline="world", reason="validation").inc()
             return {
                 "validation_status": "INVALID",
                 "validation_error": str(e),
@@ -215,18 +269,26 @@ class NodeExecutor:
         - npc_directives: list of send_to_npc action dicts
         - actions: remaining non-NPC actions
         """
-        print(f"[WO-Dispatch] Dispatching actions | total_actions={len(state.get('actions', []))}")
-        npc_directives = []
-        other_actions = []
+        dispatch_log.debug("Dispatching actions | total_actions=%s", len(state.get("actions", [])))
+        other_actions, npc_directives = _split_directives(state.get("actions", []))
 
-        for action in state.get("actions", []):
-            if action.get("action") == "send_to_npc":
-                npc_directives.append(action)
+        # Planning mode: split every scheduled tick the same way. Tick 1 is the
+        # one being returned right now, so it reuses the split above.
+        schedule = []
+        for i, step in enumerate(state.get("schedule") or []):
+            if i == 0:
+                step_actions, step_directives = other_actions, npc_directives
             else:
-                other_actions.append(action)
+                step_actions, step_directives = _split_directives(step.get("actions", []))
+            schedule.append({
+                "actions": step_actions,
+                "narrator": str(step.get("narrator", "")).strip() if i else state.get("narrator", ""),
+                "npc_directives": step_directives,
+            })
 
-        print(f"[WO-Dispatch] Done | npc_directives={len(npc_directives)} | other_actions={len(other_actions)}")
+        dispatch_log.debug("Done | npc_directives=%s | other_actions=%s | schedule_len=%s", len(npc_directives), len(other_actions), len(schedule))
         return {
             "actions": other_actions,
             "npc_directives": npc_directives,
+            "schedule": schedule,
         }
@@ -0,0 +1,178 @@
+"""
+Multi-tick narrative planning.
+
+The director's plan rarely changes from one 45 s tick to the next, so instead of
+one LLM call per tick the planner asks for a schedule covering the next N ticks
+and replays it without further LLM calls. A new plan is requested only when:
+
+  - there is no plan yet, or the current one has been fully played out
+  - the player's karma moved into a different band (hero / good / neutral / ...)
+  - the world's tension drifted away from what the plan expected
+  - new player actions arrived since the plan was made
+
+Plans are kept in the shared store (backend/shared_store.py), keyed by session
+id, so every worker replays the same plan. They expire after WORLD_PLAN_TTL
+seconds (default 3600). Enable with WORLD_PLAN_TICKS=N (N > 1); the default of
+1 keeps the classic one-call-per-tick behaviour. Every client that sends no
+session id shares the implicit "default" session, so routes/world.py never
+plans for it.
+"""
+
+import os
+from typing import Optional
+
+from ..log import get_logger
+from ..metrics import record_cache
+from ..shared_store import get_store
+
+logger = get_logger("WO-Plan")
+
+
+# ── Karma bands (mirrors KARMA-DRIVEN NARRATIVE RULES in prompts.py) ──
+
+def karma_band(karma) -> str:
+    try:
+        karma = int(karma)
+    except (TypeError, ValueError):
+        karma = 0
+    if karma >= 75:
+        return "hero"
+    if karma >= 25:
+        return "good"
+    if karma > -25:
+        return "neutral"
+    if karma > -75:
+        return "bad"
+    return "villain"
+
+
+def _expected_tensions(start_tension: int, schedule: list[dict]) -> list[int]:
+    """
+    Tension the world should be at *after* each scheduled tick has been applied,
+    assuming the client applies every update_tension action it receives.
+    """
+    expected = []
+    tension = start_tension
+    for step in schedule:
+        for action in step.get("actions", []):
+            if action.get("action") == "update_tension":
+                try:
+                    tension = int(action.get("level", tension))
+                except (TypeError, ValueError):
+                    pass
+        expected.append(tension)
+    return expected
+
+
+def _has_player_activity(recent_events: list) -> bool:
+    for event in recent_events:
+        if isinstance(event, dict):
+            if event.get("source", "player") == "player" and event.get("action"):
+                return True
+        elif event:
+            return True
+    return False
+
+
+class TickPlanner:
+    """Holds one replayable schedule per session and decides when to re-plan."""
+
+    def __init__(self, plan_ticks: int = None, tension_tolerance: int = None):
+        self.plan_ticks = plan_ticks or int(os.getenv("WORLD_PLAN_TICKS", "1"))
+        self.tension_tolerance = (
+            tension_tolerance if tension_tolerance is not None
+            else int(os.getenv("WORLD_PLAN_TENSION_TOLERANCE", "2"))
+        )
+        self.plan_ttl = float(os.getenv("WORLD_PLAN_TTL", "3600"))
+        self.llm_ticks = 0
+        self.replayed_ticks = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.plan_ticks > 1
+
+    @staticmethod
+    def _key(session_id: str) -> str:
+        return f"plan:{session_id}"
+
+    def replan_reason(self, session_id: str, world_state: dict, recent_events: list) -> Optional[str]:
+        """Return why the session needs a fresh plan, or None if the current one still holds."""
+        return self._replan_reason(get_store().get(self._key(session_id)), world_state, recent_events)
+
+    def _replan_reason(self, plan: Optional[dict], world_state: dict, recent_events: list) -> Optional[str]:
+        if plan is None:
+            return "no_plan"
+        if plan["cursor"] >= len(plan["schedule"]):
+            return "plan_exhausted"
+        if karma_band(world_state.get("player_karma", 0)) != plan["karma_band"]:
+            return "karma_band_changed"
+        if _has_player_activity(recent_events):
+            return "new_player_events"
+        if list(world_state.get("recent_player_actions", [])) != plan["player_actions"]:
+            return "new_player_actions"
+        expected = plan["expected_tension"][plan["cursor"] - 1]
+        try:
+            actual = int(world_state.get("tension_level", expected))
+        except (TypeError, ValueError):
+            actual = expected
+        if abs(actual - expected) > self.tension_tolerance:
+            return "tension_deviation"
+        return None
+
+    def invalidate(self, session_id: str) -> None:
+        get_store().delete(self._key(session_id))
+
+    async def next_tick(self, world_state: dict, recent_events: list, session_id: str = "default") -> dict:
+        """
+        Return the orchestrator result for this tick — replayed from the stored
+        schedule when possible, otherwise from a fresh planning call.
+        """
+        from . import call_orchestrator
+
+        store = get_store()
+        plan = store.get(self._key(session_id))
+        reason = self._replan_reason(plan, world_state, recent_events)
+        record_cache("world_plan", hit=reason is None)
+        if reason is None:
+            step = plan["schedule"][plan["cursor"]]
+            plan["cursor"] += 1
+            store.set(self._key(session_id), plan, ttl=self.plan_ttl)
+            self.replayed_ticks += 1
+            logger.info("[%s] Replaying tick %s/%s | llm_ticks=%s | replayed=%s", session_id, plan["cursor"], len(plan["schedule"]), self.llm_ticks, self.replayed_ticks)
+            return {
+                "actions": step["actions"],
+                "narrator": step["narrator"],
+                "npc_directives": step["npc_directives"],
+                "validation_status": plan["validation_status"],
+                "plan_step": plan["cursor"],
+            }
+
+        logger.info("[%s] Re-planning %s ticks | reason=%s", session_id, self.plan_ticks, reason)
+        self.invalidate(session_id)
+        result = await call_orchestrator(world_state, recent_events, plan_ticks=self.plan_ticks)
+        self.llm_ticks += 1
+
+        schedule = result.pop("schedule", None) or []
+        if result.get("validation_status") == "VALID" and len(schedule) > 1:
+            try:
+                start_tension = int(world_state.get("tension_level", 0))
+            except (TypeError, ValueError):
+                start_tension = 0
+            store.set(self._key(session_id), {
+                "schedule": schedule,
+                "cursor": 1,
+                "karma_band": karma_band(world_state.get("player_karma", 0)),
+                "player_actions": list(world_state.get("recent_player_actions", [])),
+                "expected_tension": _expected_tensions(start_tension, schedule),
+                "validation_status": result["validation_status"],
+            }, ttl=self.plan_ttl)
+            logger.info("[%s] Stored plan | ticks=%s", session_id, len(schedule))
+        else:
+            logger.info("[%s] No replayable schedule (status=%s, len=%s)", session_id, result.get("validation_status"), len(schedule))
+
+        result["plan_step"] = 1
+        return result
+
+
+# ── Module-level singleton ──────────────────────────────────────────────────────
+tick_planner = TickPlanner()
@@ -224,3 +224,30 @@ Remember:
 - "narrator" must be non-empty.
 
 Fix the errors and provide a corrected JSON response."""
+
+
+PLAN_PROMPT = """
+PLANNING MODE — instead of a single beat, plan the next {plan_ticks} world ticks (one tick is ~45 seconds).
+The backend replays your schedule one tick at a time and only asks you again if the world drifts from it.
+Shape the schedule as a short arc: weather transitions, tension ramps and events should unfold gradually.
+
+Respond with this JSON shape instead of the single-tick format:
+
+{{
+  "schedule": [
+    {{"actions": [ ... ], "narrator": "<sentence for tick 1>"}},
+    {{"actions": [ ... ], "narrator": "<sentence for tick 2>"}},
+    ...
+  ]
+}}
+
+Rules:
+- "schedule" must contain exactly {plan_ticks} entries, in the order they should play out.
+- Every entry follows the same rules as a single response: up to 5 actions, a non-empty narrator.
+- Put send_to_npc reactions in the tick where the NPC should react, usually the first one.
+- If tension should change, emit update_tension in the tick where the change happens."""
+
+
+PLAN_RETRY_HINT = """
+- You are in planning mode: the top-level key is "schedule", a list of {plan_ticks} entries,
+  each with its own "actions" array and "narrator" string."""
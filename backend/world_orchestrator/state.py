@@ -5,6 +5,7 @@ class WorldOrchestratorState(TypedDict):
     # ── Inputs (provided by caller) ──
     world_state: dict
     recent_events: list
+    plan_ticks: int  # >1 asks the director for a multi-tick schedule
 
     # ── Normalized (filled by normalize_input node) ──
     normalized_world_state: dict
@@ -19,6 +20,9 @@ class WorldOrchestratorState(TypedDict):
     # ── NPC integration ──
     npc_directives: list[dict]
 
+    # ── Multi-tick planning (only filled when plan_ticks > 1) ──
+    schedule: list[dict]
+
     # ── Validation / retry ──
     validation_status: str
     validation_error: Optional[str]
@@ -0,0 +1,120 @@
+"""
+Local stand-in for the Deepgram Speak API (POST /v1/speak).
+
+Point the backend at it with DEEPGRAM_BASE_URL=http://127.0.0.1:<port> and any
+DEEPGRAM_API_KEY. Latency is log-normal around a median, a fraction of requests
+fail with 500 or 429, and the "audio" is a deterministic byte string sized like
+real MP3 output (~2 KB per word). Draws are seeded from the text, so repeated
+runs see the same latencies for the same lines.
+
+Usage:
+    python bench/fake_deepgram.py --port 8765 --latency-ms 350 --failure-rate 0.02
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BYTES_PER_WORD = 2048
+
+
+class FakeDeepgram:
+    def __init__(self, latency_ms: float = 350.0, sigma: float = 0.3,
+                 failure_rate: float = 0.0, rate_limit_rate: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.sigma = sigma
+        self.failure_rate = failure_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.seed = seed
+        self.requests = 0
+        self.bytes_sent = 0
+        self._seen: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def draw(self, text: str) -> tuple[float, int]:
+        """Return (latency seconds, status) for one request."""
+        digest = hashlib.sha1(text.encode()).hexdigest()
+        with self._lock:
+            n = self._seen.get(digest, 0)
+            self._seen[digest] = n + 1
+            self.requests += 1
+        rng = random.Random(f"{self.seed}:{digest}:{n}")
+        latency = self.latency_ms / 1000.0 * math.exp(self.sigma * rng.gauss(0.0, 1.0))
+        roll = rng.random()
+        if roll < self.rate_limit_rate:
+            return latency, 429
+        if roll < self.rate_limit_rate + self.failure_rate:
+            return latency, 500
+        return latency, 200
+
+    def handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if not self.path.startswith("/v1/speak"):
+                    self.send_error(404)
+                    return
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)) or 0)
+                try:
+                    text = json.loads(body or b"{}").get("text", "")
+                except ValueError:
+                    text = ""
+                latency, status = fake.draw(text)
+                time.sleep(latency)
+                if status != 200:
+                    payload = json.dumps({"err_msg": f"fake deepgram status {status}"}).encode()
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                    return
+                words = max(1, len(text.split()))
+                audio = hashlib.sha256(text.encode()).digest() * (words * BYTES_PER_WORD // 32)
+                with fake._lock:
+                    fake.bytes_sent += len(audio)
+                self.send_response(200)
+                self.send_header("Content-Type", "audio/mpeg")
+                self.send_header("Content-Length", str(len(audio)))
+                self.end_headers()
+                self.wfile.write(audio)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def start_fake_deepgram(port: int = 0, **kwargs) -> tuple[ThreadingHTTPServer, FakeDeepgram]:
+    """Serve a FakeDeepgram on a background thread; port 0 picks a free port."""
+    fake = FakeDeepgram(**kwargs)
+    server = ThreadingHTTPServer(("127.0.0.1", port), fake.handler())
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, fake
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=350.0)
+    parser.add_argument("--sigma", type=float, default=0.3)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    server, _ = start_fake_deepgram(
+        args.port, latency_ms=args.latency_ms, sigma=args.sigma,
+        failure_rate=args.failure_rate, rate_limit_rate=args.rate_limit_rate, seed=args.seed,
+    )
+    print(f"Fake Deepgram listening on http://127.0.0.1:{server.server_address[1]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
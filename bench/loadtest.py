@@ -0,0 +1,477 @@
+"""
+Offline load test for the game backend.
+
+Starts the FastAPI app with the stub chat model (backend/stub_llm.py) and a
+local fake Deepgram (bench/fake_deepgram.py), then drives it with N simulated
+players whose traffic mirrors the frontend:
+
+  - chat:  AIService.callBackend → POST /api/npc/react with the NPC's persona,
+           memory, trust, emotion, world_state and growing conversation_history,
+           after an exponential "think time"
+  - ticks: WorldService.tick → POST /api/world/tick every --tick-interval seconds
+           with world_state, the player's recent events and all active NPCs,
+           applying returned tension/weather/memory like the client does
+  - batch: with --batch-interval, POST /api/npc/react_batch every that many
+           seconds with --batch-size of the player's NPCs reacting at once
+           (ambient chatter)
+
+It reports throughput, p50/p95/p99 latency and error rate per endpoint, and
+LLM/TTS calls per request scraped from /metrics. Results are written as JSON
+tagged with the git commit, and --compare prints the deltas against an earlier
+run, so each performance change can be measured against the same traffic.
+
+Usage:
+    python bench/loadtest.py --players 20 --duration 60
+    python bench/loadtest.py --players 20 --duration 60 --env WORLD_PLAN_TICKS=3 \\
+        --out bench/results/plan3.json --compare bench/results/baseline.json
+    python bench/loadtest.py --players 20 --duration 60 --batch-interval 10 --batch-size 3
+    python bench/loadtest.py --url http://127.0.0.1:8000 ...   # an already running server
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+from fake_deepgram import start_fake_deepgram
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+NPC_ROSTER = {
+    "farmer_tom": ("villager", "Farmer Tom, a cheerful, down-to-earth farmer proud of his crops.", "aura-zeus-en"),
+    "guard_captain": ("guard", "The Guard Captain, stern and disciplined, suspicious of strangers.", "aura-orpheus-en"),
+    "merchant": ("merchant", "A traveling merchant, charming, hinting at mysterious wares and rumors.", "aura-asteria-en"),
+}
+
+PLAYER_LINES = [
+    "Hello there!", "What's your name?", "Any news from the road?", "I brought you a gift.",
+    "Do you need help with anything?", "Have you seen anything strange lately?",
+    "Get out of my way.", "What are you selling today?", "Tell me about the shadows in the forest.",
+    "Goodbye, friend.",
+]
+
+TIME_PHASES = ["dawn", "morning", "noon", "afternoon", "dusk", "night"]
+
+
+# ── Simulated player ──
+
+
+class Player:
+    """One browser tab: WorldService + AIService state for a single player."""
+
+    def __init__(self, index: int, rng: random.Random):
+        self.session_id = f"bench-{index}"
+        self.rng = rng
+        self.world_state = {
+            "location": "village",
+            "weather": "clear",
+            "time_of_day": "noon",
+            "tension_level": 0,
+            "player_karma": 0,
+            "recent_player_actions": [],
+            "active_npcs": [],
+        }
+        self.recent_events: list[dict] = []
+        self.active_npcs: dict[str, dict] = {}
+        self.tick_count = 0
+        for npc_id, (npc_type, identity, voice) in NPC_ROSTER.items():
+            self.active_npcs[npc_id] = {
+                "npc_identity": identity,
+                "voice_id": voice,
+                "type": npc_type,
+                "memory": {"short_term": [], "long_term_summary": "", "relationship_history": []},
+                "trust_score": 5,
+                "emotion": "NEUTRAL",
+                "location": "village",
+                "conversation_history": [],
+            }
+        self._sync_npc_list()
+
+    def _sync_npc_list(self) -> None:
+        self.world_state["active_npcs"] = [
+            {"id": npc_id, "type": npc["type"], "location": npc["location"], "mood": npc["emotion"].lower()}
+            for npc_id, npc in self.active_npcs.items()
+        ]
+
+    def chat_payload(self) -> tuple[str, str, dict]:
+        npc_id = self.rng.choice(list(self.active_npcs))
+        message = self.rng.choice(PLAYER_LINES)
+        return npc_id, message, self._npc_payload(npc_id, message)
+
+    def batch_payload(self, size: int) -> tuple[list[str], list[str], dict]:
+        npc_ids = self.rng.sample(list(self.active_npcs), min(size, len(self.active_npcs)))
+        messages = [self.rng.choice(PLAYER_LINES) for _ in npc_ids]
+        items = []
+        for npc_id, message in zip(npc_ids, messages):
+            item = self._npc_payload(npc_id, message)
+            del item["world_state"]  # shared through the batch's world_state
+            items.append(item)
+        return npc_ids, messages, {"world_state": self.world_state, "items": items}
+
+    def _npc_payload(self, npc_id: str, message: str) -> dict:
+        npc = self.active_npcs[npc_id]
+        return {
+            "npc_id": npc_id,
+            "npc_identity": npc["npc_identity"],
+            "voice_id": npc["voice_id"],
+            "memory": npc["memory"],
+            "trust_score": npc["trust_score"],
+            "emotion": npc["emotion"],
+            "world_state": self.world_state,
+            "recent_events": [{"source": "player", "action": message, "time": int(time.time())}],
+            "conversation_history": npc["conversation_history"],
+            "session_id": self.session_id,
+        }
+
+    def apply_chat(self, npc_id: str, message: str, response: dict) -> None:
+        npc = self.active_npcs[npc_id]
+        npc["emotion"] = response.get("emotion", npc["emotion"])
+        npc["trust_score"] = response.get("trust_score", npc["trust_score"])
+        if response.get("memory"):
+            npc["memory"] = response["memory"]
+        history = npc["conversation_history"] + [
+            {"role": "player", "content": message},
+            {"role": "npc", "content": response.get("dialogue", "")},
+        ]
+        npc["conversation_history"] = history[-20:]
+        self.recent_events.append({"source": "player", "action": f"said to {npc_id}: {message}", "time": int(time.time())})
+        self.recent_events = self.recent_events[-10:]
+        self._sync_npc_list()
+
+    def tick_payload(self) -> dict:
+        self.tick_count += 1
+        if self.tick_count % 2 == 0:
+            index = (TIME_PHASES.index(self.world_state["time_of_day"]) + 1) % len(TIME_PHASES)
+            self.world_state["time_of_day"] = TIME_PHASES[index]
+        return {
+            "world_state": self.world_state,
+            "recent_events": self.recent_events,
+            "active_npcs": self.active_npcs,
+            "session_id": self.session_id,
+        }
+
+    def apply_tick(self, result: dict) -> None:
+        self.recent_events = []
+        for action in result.get("actions", []):
+            if action.get("action") == "change_weather" and action.get("condition"):
+                self.world_state["weather"] = action["condition"]
+            elif action.get("action") == "update_tension" and "level" in action:
+                self.world_state["tension_level"] = action["level"]
+        for npc_result in result.get("npc_responses", []):
+            npc = self.active_npcs.get(npc_result.get("npc_id"))
+            if npc is None or npc_result.get("error"):
+                continue
+            npc["emotion"] = npc_result.get("emotion") or npc["emotion"]
+            npc["trust_score"] = npc_result.get("trust_score", npc["trust_score"])
+            if npc_result.get("memory"):
+                npc["memory"] = npc_result["memory"]
+        self._sync_npc_list()
+
+
+# ── Measurement ──
+
+
+class Recorder:
+    def __init__(self):
+        self.samples: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+
+    def add(self, endpoint: str, seconds: float, ok: bool) -> None:
+        self.samples.setdefault(endpoint, []).append(seconds)
+        if not ok:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, math.ceil(pct / 100.0 * len(ordered)) - 1)  # nearest-rank
+    return ordered[rank]
+
+
+_SAMPLE = re.compile(r'^(\w+)(?:\{([^}]*)\})? ([0-9.eE+-]+)$')
+
+
+def scrape_counters(base_url: str) -> dict[str, dict[str, float]]:
+    """{metric: {label-string: value}} for the counters the report needs."""
+    wanted = {"npcs_llm_calls_total", "npcs_tts_requests_total", "npcs_llm_tokens_total"}
+    text = requests.get(f"{base_url}/metrics", timeout=10).text
+    counters: dict[str, dict[str, float]] = {name: {} for name in wanted}
+    for line in text.splitlines():
+        match = _SAMPLE.match(line)
+        if match and match.group(1) in wanted:
+            counters[match.group(1)][match.group(2) or ""] = float(match.group(3))
+    return counters
+
+
+def _label(labels: str, name: str) -> str:
+    match = re.search(rf'{name}="([^"]*)"', labels)
+    return match.group(1) if match else ""
+
+
+def _delta_by(before: dict, after: dict, metric: str, label: str) -> dict[str, float]:
+    totals: dict[str, float] = {}
+    for labels, value in after.get(metric, {}).items():
+        key = _label(labels, label)
+        totals[key] = totals.get(key, 0.0) + value - before.get(metric, {}).get(labels, 0.0)
+    return totals
+
+
+# ── Traffic ──
+
+
+async def run_player(player: Player, args, base_url: str, recorder: Recorder,
+                     pool: ThreadPoolExecutor, deadline: float) -> None:
+    loop = asyncio.get_running_loop()
+    http = requests.Session()
+
+    def post(path: str, payload: dict):
+        start = time.perf_counter()
+        try:
+            resp = http.post(f"{base_url}{path}", json=payload, timeout=args.request_timeout)
+            return time.perf_counter() - start, resp.status_code, (resp.json() if resp.ok else None)
+        except (requests.RequestException, ValueError):
+            return time.perf_counter() - start, 0, None
+
+    async def pause(seconds: float) -> bool:
+        """Sleep, but never past the deadline; False once the run is over."""
+        await asyncio.sleep(max(0.0, min(seconds, deadline - time.monotonic())))
+        return time.monotonic() < deadline
+
+    async def chat_loop():
+        while await pause(player.rng.expovariate(1.0 / args.think_time)):
+            npc_id, message, payload = player.chat_payload()
+            seconds, status, body = await loop.run_in_executor(pool, post, "/api/npc/react", payload)
+            recorder.add("POST /api/npc/react", seconds, status == 200)
+            if body:
+                player.apply_chat(npc_id, message, body)
+
+    async def batch_loop():
+        if args.batch_interval <= 0:
+            return
+        delay = player.rng.uniform(0, args.batch_interval)
+        while await pause(delay):
+            npc_ids, messages, payload = player.batch_payload(args.batch_size)
+            seconds, status, body = await loop.run_in_executor(pool, post, "/api/npc/react_batch", payload)
+            recorder.add("POST /api/npc/react_batch", seconds, status == 200)
+            for result in (body or {}).get("results", []):
+                if result.get("response"):
+                    index = result["index"]
+                    player.apply_chat(npc_ids[index], messages[index], result["response"])
+            delay = args.batch_interval
+
+    async def tick_loop():
+        # Stagger first ticks so players don't all tick in lockstep
+        delay = player.rng.uniform(0, args.tick_interval)
+        while await pause(delay):
+            seconds, status, body = await loop.run_in_executor(pool, post, "/api/world/tick", player.tick_payload())
+            recorder.add("POST /api/world/tick", seconds, status == 200)
+            if body:
+                player.apply_tick(body)
+            delay = args.tick_interval
+
+    await asyncio.gather(chat_loop(), tick_loop(), batch_loop())
+
+
+async def drive(args, base_url: str) -> tuple[Recorder, float]:
+    recorder = Recorder()
+    players = [Player(i, random.Random(f"{args.seed}:{i}")) for i in range(args.players)]
+    pool = ThreadPoolExecutor(max_workers=args.players * 2)
+    start = time.monotonic()
+    deadline = start + args.duration
+    await asyncio.gather(*(run_player(p, args, base_url, recorder, pool, deadline) for p in players))
+    elapsed = time.monotonic() - start
+    pool.shutdown()
+    return recorder, elapsed
+
+
+# ── Server lifecycle ──
+
+
+def start_server(args, deepgram_url: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "LLM_PROVIDER": "stub",
+        "WORLD_LLM_PROVIDER": "stub",
+        "STUB_LLM_LATENCY_MS": str(args.llm_latency_ms),
+        "STUB_LLM_LATENCY_SIGMA": str(args.llm_sigma),
+        "STUB_LLM_FAILURE_RATE": str(args.llm_failure_rate),
+        "STUB_LLM_RATE_LIMIT_RATE": str(args.llm_rate_limit_rate),
+        "STUB_LLM_STALL_RATE": str(args.llm_stall_rate),
+        "STUB_LLM_STALL_MS": str(args.llm_stall_ms),
+        "STUB_LLM_SEED": str(args.seed),
+        "DEEPGRAM_API_KEY": "bench",
+        "DEEPGRAM_BASE_URL": deepgram_url,
+        "LOG_LEVEL": args.log_level,
+    }
+    if args.workers > 1:
+        # A fresh shared store per run, so no sessions or plans leak between runs
+        env["SHARED_STORE"] = f"sqlite:///{tempfile.mkdtemp(prefix='npcs-loadtest-')}/shared.db"
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+    # Keep idle connections open past the longest pause between a player's requests. With
+    # uvicorn's 5 s default, a tick sent on a connection the server was just closing fails.
+    keep_alive = int(max(args.tick_interval, args.batch_interval, args.think_time * 10)) + 5
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--host", "127.0.0.1",
+         "--port", str(args.port), "--log-level", "warning", "--workers", str(args.workers),
+         "--timeout-keep-alive", str(keep_alive)],
+        cwd=REPO_ROOT, env=env,
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    for _ in range(120):
+        if server.poll() is not None:
+            raise RuntimeError(f"Backend exited during startup (code {server.returncode})")
+        try:
+            if requests.get(f"{base_url}/ready", timeout=1).ok:
+                return server
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError("Backend did not become ready within 60s")
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+# ── Report ──
+
+
+def build_report(args, recorder: Recorder, elapsed: float, before: dict, after: dict, deepgram) -> dict:
+    endpoints = {}
+    total_requests = 0
+    for endpoint, samples in sorted(recorder.samples.items()):
+        total_requests += len(samples)
+        endpoints[endpoint] = {
+            "requests": len(samples),
+            "errors": recorder.errors.get(endpoint, 0),
+            "rps": round(len(samples) / elapsed, 2),
+            "p50_ms": round(percentile(samples, 50) * 1000, 1),
+            "p95_ms": round(percentile(samples, 95) * 1000, 1),
+            "p99_ms": round(percentile(samples, 99) * 1000, 1),
+        }
+    llm_by_pipeline = _delta_by(before, after, "npcs_llm_calls_total", "pipeline")
+    llm_calls = sum(llm_by_pipeline.values())
+    llm_by_model = _delta_by(before, after, "npcs_llm_calls_total", "model")
+    tts_calls = sum(_delta_by(before, after, "npcs_tts_requests_total", "outcome").values())
+    tokens = _delta_by(before, after, "npcs_llm_tokens_total", "kind")
+    return {
+        "revision": git_revision(),
+        "timestamp": int(time.time()),
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "elapsed_s": round(elapsed, 1),
+        "throughput_rps": round(total_requests / elapsed, 2),
+        "endpoints": endpoints,
+        "llm_calls": llm_calls,
+        "llm_calls_by_pipeline": llm_by_pipeline,
+        "llm_calls_by_model": llm_by_model,
+        "llm_calls_per_request": round(llm_calls / total_requests, 2) if total_requests else 0.0,
+        "llm_tokens": tokens,
+        "tts_calls": tts_calls,
+        "tts_calls_per_request": round(tts_calls / total_requests, 2) if total_requests else 0.0,
+        "fake_deepgram_requests": deepgram.requests if deepgram else None,
+    }
+
+
+def print_report(report: dict, baseline: dict = None) -> None:
+    def delta(value, old):
+        if old in (None, 0):
+            return ""
+        return f" ({(value - old) / old * 100:+.0f}%)"
+
+    print(f"\nrevision {report['revision']} | {report['elapsed_s']}s | "
+          f"{report['throughput_rps']} req/s{delta(report['throughput_rps'], (baseline or {}).get('throughput_rps'))}")
+    print(f"{'endpoint':<28}{'reqs':>7}{'err':>6}{'rps':>8}{'p50 ms':>18}{'p95 ms':>18}{'p99 ms':>18}")
+    for endpoint, row in report["endpoints"].items():
+        old = (baseline or {}).get("endpoints", {}).get(endpoint, {})
+        print(f"{endpoint:<28}{row['requests']:>7}{row['errors']:>6}{row['rps']:>8}"
+              + "".join(f"{str(row[k]) + delta(row[k], old.get(k)):>18}" for k in ("p50_ms", "p95_ms", "p99_ms")))
+    old_llm = (baseline or {}).get("llm_calls_per_request")
+    print(f"LLM calls/request: {report['llm_calls_per_request']}{delta(report['llm_calls_per_request'], old_llm)} "
+          f"| by pipeline: {report['llm_calls_by_pipeline']}")
+    if len(report.get("llm_calls_by_model", {})) > 1:
+        print(f"LLM calls by model: {report['llm_calls_by_model']}")
+    print(f"TTS calls/request: {report['tts_calls_per_request']}")
+    if report["config"].get("workers", 1) > 1:
+        print("(LLM/TTS counts come from whichever worker answered /metrics, not all of them)")
+    if baseline:
+        print(f"(compared with revision {baseline.get('revision')})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds of traffic")
+    parser.add_argument("--think-time", type=float, default=8.0, help="mean seconds between a player's chats")
+    parser.add_argument("--tick-interval", type=float, default=45.0, help="seconds between a player's ticks")
+    parser.add_argument("--batch-interval", type=float, default=0.0,
+                        help="seconds between a player's /api/npc/react_batch calls (0 = none)")
+    parser.add_argument("--batch-size", type=int, default=3, help="NPCs per react_batch call")
+    parser.add_argument("--request-timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0)
+    parser.add_argument("--llm-sigma", type=float, default=0.5)
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0)
+    parser.add_argument("--llm-rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--llm-stall-rate", type=float, default=0.0, help="fraction of LLM calls that stall")
+    parser.add_argument("--llm-stall-ms", type=float, default=10000.0, help="extra latency of a stalled LLM call")
+    parser.add_argument("--tts-latency-ms", type=float, default=350.0)
+    parser.add_argument("--tts-failure-rate", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes (shared SQLite store when > 1)")
+    parser.add_argument("--log-level", default="WARNING", help="backend LOG_LEVEL during the run")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="extra backend environment, e.g. WORLD_PLAN_TICKS=3 (repeatable)")
+    parser.add_argument("--url", help="drive an already running backend instead of starting one")
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--compare", help="earlier JSON report to diff against")
+    args = parser.parse_args()
+
+    server = deepgram = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        dg_server, deepgram = start_fake_deepgram(
+            latency_ms=args.tts_latency_ms, failure_rate=args.tts_failure_rate, seed=args.seed)
+        server = start_server(args, f"http://127.0.0.1:{dg_server.server_address[1]}")
+        base_url = f"http://127.0.0.1:{args.port}"
+
+    try:
+        before = scrape_counters(base_url)
+        print(f"Driving {base_url} with {args.players} players for {args.duration:.0f}s ...")
+        recorder, elapsed = asyncio.run(drive(args, base_url))
+        after = scrape_counters(base_url)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    report = build_report(args, recorder, elapsed, before, after, deepgram)
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+    print_report(report, baseline)
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(json.dumps(report, indent=2))
+        print(f"Report written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+"""
+Microbenchmarks for the CPU-only code that runs on every request.
+
+Once LLM latency is hidden behind concurrency, these are what bound requests
+per second per worker: keyword triggers, dialogue cleanup and trimming, JSON
+extraction from model output, orchestrator input normalisation and output
+validation, response model construction, building NPC graph state from a
+request, relevant-memory retrieval over a 10k-entry NPC log, and gossip
+publishing to a 50-NPC roster. Each path is timed on a realistic input and on
+an adversarial one (long dialogues, 300-NPC world states, fallback parsing).
+
+Per-call time is the best of --repeat runs of timeit's autorange, which is
+the most stable figure on a shared machine. Baselines are stored per case in
+bench/baselines/microbench.json together with the git revision they came from.
+A comparison run exits non-zero when any case is more than --threshold percent
+slower than its baseline. Without a baseline a plain run only prints timings;
+--check (the CI gate) fails instead, for a missing baseline file as for any
+case that has no baseline yet.
+
+Usage:
+    python bench/microbench.py --save                   # record baselines
+    python bench/microbench.py                          # compare, fail on >25% regressions
+    python bench/microbench.py --check                  # same, and fail when a baseline is missing
+    python bench/microbench.py --threshold 10 -k clean_dialogue
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import timeit
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baselines" / "microbench.json"
+
+# Nothing here builds the graphs (they are built lazily, see backend/warmup.py);
+# the stub model keeps any LLM client an import does create offline.
+os.environ.setdefault("LLM_PROVIDER", "stub")
+os.environ.setdefault("WORLD_LLM_PROVIDER", "stub")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+sys.path.insert(0, str(REPO_ROOT))
+
+from backend.npc.context import render_history  # noqa: E402
+from backend.npc.gossip import ack_gossip, gossip_bus, take_gossip  # noqa: E402
+from backend.npc.memory_index import MemoryIndex, log_entry, recall  # noqa: E402
+from backend.npc.nodes import _trim_dialogue  # noqa: E402
+from backend.npc.output_schema import NPCResponse  # noqa: E402
+from backend.npc.state import Event, Memory, NPCState  # noqa: E402
+from backend.npc.trigger_system import TriggerSystem  # noqa: E402
+from backend.npc.tts_service import clean_dialogue  # noqa: E402
+from backend.world_orchestrator.llm import _extract_json  # noqa: E402
+from backend.world_orchestrator.nodes import NodeExecutor as WorldNodeExecutor  # noqa: E402
+from backend.world_orchestrator.output_schema import OrchestratorOutput  # noqa: E402
+
+# ── Inputs ──
+
+_rng = random.Random(0)
+
+WORDS = ("the road north is quiet tonight but the guards say shadows move in the forest "
+         "and the merchant swears he saw lights over the old mill").split()
+
+REPLY = ('Guard Captain: *adjusts helmet* Well met, traveler. (eyes narrowing) '
+         '"The gate closes at dusk," he says, nodding. Mind the forest road — '
+         'chuckles — shadows have been restless of late.')
+
+
+def _sentence(n_words: int) -> str:
+    return " ".join(_rng.choice(WORDS) for _ in range(n_words)).capitalize() + _rng.choice(".!?")
+
+
+LONG_DIALOGUE = " ".join(
+    f"{_sentence(14)} *{_rng.choice(['smiling', 'pacing', 'frowning'])}* ({_rng.choice(WORDS)} {_rng.choice(WORDS)})"
+    for _ in range(120)
+)
+# Unbalanced markup forces the gesture regexes to scan to the end repeatedly.
+UNBALANCED_DIALOGUE = ("*" + "(" + '"' + " ".join(_rng.choice(WORDS) for _ in range(40))) * 60
+NO_KEYWORD_TEXT = " ".join("lorem ipsum dolor sit amet" for _ in range(400))
+PLAYER_LINE = "I brought you a gift from the market, thank you for the help yesterday."
+
+
+def _npc(i: int) -> dict:
+    return {
+        "id": f"npc_{i:03d}",
+        "type": _rng.choice(["villager", "guard", "merchant", "wanderer"]),
+        "location": _rng.choice(["market", "gate", "mill", "forest_edge", "tavern"]),
+        "mood": _rng.choice(["neutral", "friendly", "aggressive", "panicked"]),
+    }
+
+
+def _world_state(n_npcs: int, n_actions: int) -> dict:
+    return {
+        "player_karma": 35,
+        "active_npcs": [_npc(i) for i in range(n_npcs)],
+        "weather": "cloudy",
+        "time_of_day": "dusk",
+        "tension_level": 4,
+        "active_events": [f"event_{i}" for i in range(n_actions // 5)],
+        "recent_player_actions": [f"{_rng.choice(WORDS)}_{_rng.choice(WORDS)}" for _ in range(n_actions)],
+    }
+
+
+def _events(n: int) -> list:
+    return [
+        {"source": "player", "action": _sentence(8), "time": i} if i % 3 else _sentence(6)
+        for i in range(n)
+    ]
+
+
+SMALL_WORLD = _world_state(3, 4)
+BIG_WORLD = _world_state(300, 50)
+
+VALID_OUTPUT = {
+    "actions": [
+        {"action": "send_to_npc", "npc_id": "all", "event": "A cart overturns in the square", "reason": "drama"},
+        {"action": "change_weather", "condition": "fog", "transition": "gradual", "reason": "mood"},
+        {"action": "spawn_npc", "npc_type": "guard", "location": "gate", "mood": "aggressive", "count": 2},
+        {"action": "trigger_event", "event_name": "market_fire", "location": "market", "intensity": "high"},
+        {"action": "update_tension", "level": 6, "reason": "escalation"},
+    ],
+    "narrator": "Smoke curls over the market as the guards close the gate.",
+}
+INVALID_OUTPUT = {
+    "actions": [
+        {"action": "change_weather", "condition": "sandstorm"},
+        {"action": "update_tension", "level": 14},
+        {"action": "teleport_player"},
+        {"action": "spawn_npc", "npc_type": "guard"},
+        {"reason": "missing action"},
+    ],
+    "narrator": "  ",
+}
+
+PLAIN_JSON = json.dumps(VALID_OUTPUT)
+FENCED_JSON = "```json\n" + json.dumps(VALID_OUTPUT, indent=2) + "\n```"
+PROSE_JSON = "Here is what happens next in the world:\n" + json.dumps(VALID_OUTPUT, indent=2) + "\nHope that helps!"
+SCHEDULE_JSON = json.dumps({"schedule": [
+    {"actions": [{"action": "send_to_npc", "npc_id": n["id"], "event": _sentence(10)} for n in BIG_WORLD["active_npcs"][:5]],
+     "narrator": _sentence(20)}
+    for _ in range(10)
+]})
+
+
+def _npc_request(history_turns: int, memories: int) -> dict:
+    return {
+        "npc_id": "guard_captain",
+        "npc_identity": "The Guard Captain, stern and disciplined, suspicious of strangers.",
+        "voice_id": "aura-orpheus-en",
+        "memory": {
+            "short_term": [f"[Trust: 5/10] {_sentence(10)}" for _ in range(memories)],
+            "long_term_summary": _sentence(40),
+            "relationship_history": [f"Action: {_sentence(6)} | Emotion: NEUTRAL | Trust: 5/10" for _ in range(memories)],
+        },
+        "trust_score": 5,
+        "emotion": "NEUTRAL",
+        "world_state": SMALL_WORLD,
+        "recent_events": [{"source": "player", "action": _sentence(8), "time": i} for i in range(5)],
+        "conversation_history": [
+            {"role": "player" if i % 2 else "npc", "content": _sentence(18)} for i in range(history_turns)
+        ],
+    }
+
+
+SMALL_REQUEST = _npc_request(history_turns=4, memories=3)
+BIG_REQUEST = _npc_request(history_turns=200, memories=10)
+
+EMOTIONS = ("NEUTRAL", "SUSPICIOUS", "ANGRY", "HAPPY", "GRATEFUL")
+# A small vocabulary makes every query term common: the slow end for BM25.
+MEMORY_LOG_10K = [log_entry(_sentence(10), _rng.choice(EMOTIONS), _rng.randint(0, 10)) for _ in range(10_000)]
+MEMORY_10K = {"log": MEMORY_LOG_10K}
+MEMORY_ENTRY = log_entry(_sentence(10), "ANGRY", 3)
+MEMORY_QUERY = "Did the guards see those shadows in the forest by the old mill?"
+
+
+def _memory_index(log: list[str]) -> MemoryIndex:
+    index = MemoryIndex()
+    for entry in log:
+        index.add(entry)
+    return index
+
+
+MEMORY_INDEX_10K = _memory_index(MEMORY_LOG_10K)
+GROWING_INDEX = _memory_index(MEMORY_LOG_10K)  # add_to_10k appends here, keeping MEMORY_INDEX_10K at 10k
+
+# 50 NPCs of 4 types spread over the map; news near npc_007 reaches some of them.
+GOSSIP_ROSTER = {f"npc_{i:03d}": {**_npc(i), "location": f"{_rng.randint(0, 200)},{_rng.randint(0, 200)}"}
+                 for i in range(50)}
+gossip_bus.sync("bench", GOSSIP_ROSTER)
+gossip_bus.sync("bench_pair", {"npc_000": {"location": "gate"}, "npc_001": {"location": "gate"}})
+GOSSIP_TEXT = "the player threatened npc_007 at the gate; npc_007 now trusts the player less and is angry"
+
+
+def _gossip_turn() -> dict:
+    """A full inbox of 16 items, then one NPC turn folding the strongest into memory."""
+    for _ in range(16):
+        gossip_bus.publish("bench_pair", GOSSIP_TEXT, subject="npc_000", weight=1.0)
+    npc_data, read_at = take_gossip("bench_pair", "npc_001", SMALL_REQUEST)
+    ack_gossip("bench_pair", "npc_001", read_at)
+    return npc_data
+
+
+def _build_state(request: dict) -> NPCState:
+    # Mirrors routes.npc._build_npc_state without needing the FastAPI request model.
+    return NPCState(
+        npc_id=request["npc_id"],
+        session_id=request.get("session_id", "default"),
+        npc_identity=request["npc_identity"],
+        voice_id=request["voice_id"],
+        memory=Memory(**request["memory"]),
+        trust_score=request["trust_score"],
+        emotion=request["emotion"],
+        world_state=request["world_state"],
+        recent_events=[Event(**event) for event in request["recent_events"]],
+        conversation_history=request["conversation_history"],
+        conversation_context=None,
+        recalled_memories=None,
+        internal_reasoning=None,
+        dialogue=None,
+        action_trigger=None,
+    )
+
+
+def _validate(payload: dict) -> None:
+    try:
+        OrchestratorOutput(**payload)
+    except ValueError:
+        pass
+
+
+# normalize_input needs no LLM; skip __init__ so no model is constructed.
+_world_nodes = object.__new__(WorldNodeExecutor)
+_triggers = TriggerSystem()
+
+CASES = {
+    "triggers.player_line": lambda: _triggers.get_all_triggers(PLAYER_LINE),
+    "triggers.no_keyword_2kb": lambda: _triggers.get_all_triggers(NO_KEYWORD_TEXT),
+    "clean_dialogue.reply": lambda: clean_dialogue(REPLY),
+    "clean_dialogue.long_120_sentences": lambda: clean_dialogue(LONG_DIALOGUE),
+    "clean_dialogue.unbalanced_markup": lambda: clean_dialogue(UNBALANCED_DIALOGUE),
+    "trim_dialogue.reply": lambda: _trim_dialogue(REPLY),
+    "trim_dialogue.long_120_sentences": lambda: _trim_dialogue(LONG_DIALOGUE),
+    "extract_json.plain": lambda: _extract_json(PLAIN_JSON),
+    "extract_json.fenced": lambda: _extract_json(FENCED_JSON),
+    "extract_json.prose_fallback": lambda: _extract_json(PROSE_JSON),
+    "extract_json.schedule_10_ticks": lambda: _extract_json(SCHEDULE_JSON),
+    "normalize_input.3_npcs": lambda: _world_nodes.normalize_input(
+        {"world_state": SMALL_WORLD, "recent_events": _events(4)}),
+    "normalize_input.300_npcs": lambda: _world_nodes.normalize_input(
+        {"world_state": BIG_WORLD, "recent_events": _events(50), "plan_ticks": 5}),
+    "orchestrator_output.valid_5_actions": lambda: _validate(VALID_OUTPUT),
+    "orchestrator_output.invalid_5_actions": lambda: _validate(INVALID_OUTPUT),
+    "npc_response.construct": lambda: NPCResponse(
+        dialogue=REPLY, emotion="SUSPICIOUS", trust_score=4, action_trigger="NONE"),
+    "npc_response.construct_dump": lambda: NPCResponse(
+        dialogue=LONG_DIALOGUE, emotion="SUSPICIOUS", trust_score=4).model_dump(),
+    "npc_state.small_request": lambda: _build_state(SMALL_REQUEST),
+    "npc_state.200_turn_history": lambda: _build_state(BIG_REQUEST),
+    "npc_context.small_request": lambda: render_history(SMALL_REQUEST["conversation_history"]),
+    "npc_context.200_turn_history": lambda: render_history(BIG_REQUEST["conversation_history"]),
+    "memory_index.build_10k": lambda: _memory_index(MEMORY_LOG_10K),
+    "memory_index.add_to_10k": lambda: GROWING_INDEX.add(MEMORY_ENTRY),
+    "memory_index.query_10k": lambda: MEMORY_INDEX_10K.search(MEMORY_QUERY, 5),
+    "memory_index.query_10k_no_match": lambda: MEMORY_INDEX_10K.search(PLAYER_LINE, 5),
+    "memory_index.recall_10k_cached": lambda: recall("bench", "bench_npc", MEMORY_10K, MEMORY_QUERY),
+    "gossip.publish_50_npcs": lambda: gossip_bus.publish("bench", GOSSIP_TEXT, subject="npc_007", weight=1.0),
+    "gossip.publish_50_npcs_no_location": lambda: gossip_bus.publish("bench", GOSSIP_TEXT, weight=1.0),
+    "gossip.16_items_then_take": _gossip_turn,
+}
+
+# ── Measurement ──
+
+
+def measure(fn, repeat: int) -> float:
+    """Best per-call time in microseconds over `repeat` autoranged runs."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def load_baseline(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path: Path, results: dict[str, float], existing: dict) -> None:
+    cases = dict(existing.get("cases", {}))
+    cases.update({name: round(us, 3) for name, us in results.items()})
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cases": dict(sorted(cases.items())),
+        }, f, indent=2)
+        f.write("\n")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", "--filter", default="", help="Only run cases whose name contains this string")
+    parser.add_argument("--repeat", type=int, default=5, help="Autoranged runs per case; the best is kept")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("MICROBENCH_THRESHOLD", "25")),
+                        help="Fail when a case is more than this percent slower than baseline (default 25)")
+    parser.add_argument("--save", action="store_true", help="Write these results as the new baseline")
+    parser.add_argument("--check", action="store_true",
+                        help="Also fail when the baseline file or a case's baseline is missing")
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.baseline)
+    base_cases = baseline.get("cases", {})
+    results: dict[str, float] = {}
+    regressions = []
+    unbaselined = []
+
+    print(f"{'case':<40} {'us/call':>10} {'baseline':>10} {'change':>8}")
+    for name, fn in CASES.items():
+        if args.filter not in name:
+            continue
+        us = measure(fn, args.repeat)
+        results[name] = us
+        old = base_cases.get(name)
+        if old:
+            change = (us - old) / old * 100
+            flag = "  REGRESSION" if change > args.threshold else ""
+            if flag:
+                regressions.append((name, change))
+            print(f"{name:<40} {us:>10.2f} {old:>10.2f} {change:>+7.1f}%{flag}")
+        else:
+            unbaselined.append(name)
+            print(f"{name:<40} {us:>10.2f} {'—':>10} {'':>8}")
+
+    if args.save:
+        save_baseline(args.baseline, results, baseline)
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    if not base_cases:
+        print(f"\nNo baseline at {args.baseline}; run with --save to create one.")
+        return 1 if args.check else 0
+    if regressions:
+        print(f"\n{len(regressions)} case(s) regressed by more than {args.threshold:g}% "
+              f"against baseline from {baseline.get('revision', 'unknown')}:")
+        for name, change in regressions:
+            print(f"  {name}: {change:+.1f}%")
+        return 1
+    if args.check and unbaselined:
+        print(f"\n{len(unbaselined)} case(s) have no baseline in {args.baseline}; re-run with --save:")
+        for name in unbaselined:
+            print(f"  {name}")
+        return 1
+    print(f"\nNo regressions above {args.threshold:g}% (baseline {baseline.get('revision', 'unknown')}).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""
+Throughput scaling from 1 to N uvicorn workers, with the stub LLM.
+
+Runs bench/loadtest.py once per worker count against the same seeded traffic
+and prints throughput and latency side by side, plus the scaling efficiency
+(throughput per worker relative to the single-worker run). The stub's
+latencies default low here so that the backend's own CPU work is what limits
+throughput. That is the part a single process's GIL caps.
+
+Usage:
+    python bench/scaling.py --workers 1,2,4 --players 60 --duration 30
+    python bench/scaling.py --workers 1,2,4,8 --out bench/results/scaling.json -- --env WORLD_PLAN_TICKS=3
+
+Arguments after `--` are passed to every loadtest run unchanged.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+
+
+def run_once(workers: int, args, extra: list[str]) -> dict:
+    out = Path(tempfile.mkdtemp(prefix="npcs-scaling-")) / f"workers{workers}.json"
+    command = [
+        sys.executable, str(HERE / "loadtest.py"),
+        "--workers", str(workers),
+        "--players", str(args.players),
+        "--duration", str(args.duration),
+        "--think-time", str(args.think_time),
+        "--tick-interval", str(args.tick_interval),
+        "--llm-latency-ms", str(args.llm_latency_ms),
+        "--tts-latency-ms", str(args.tts_latency_ms),
+        "--seed", str(args.seed),
+        "--out", str(out),
+        *extra,
+    ]
+    print(f"\n=== {workers} worker(s) ===", flush=True)
+    subprocess.run(command, check=True, cwd=HERE)
+    return json.loads(out.read_text())
+
+
+def print_table(reports: dict[int, dict]) -> None:
+    base = reports[min(reports)]["throughput_rps"] or 1.0
+    print(f"\n{'workers':>8}{'req/s':>10}{'speedup':>10}{'efficiency':>12}{'react p95 ms':>15}{'tick p95 ms':>14}")
+    for workers, report in sorted(reports.items()):
+        rps = report["throughput_rps"]
+        endpoints = report["endpoints"]
+        react = endpoints.get("POST /api/npc/react", {}).get("p95_ms", "-")
+        tick = endpoints.get("POST /api/world/tick", {}).get("p95_ms", "-")
+        print(f"{workers:>8}{rps:>10}{rps / base:>10.2f}{rps / base / workers * min(reports):>12.0%}{react:>15}{tick:>14}")
+
+
+def main() -> None:
+    argv = sys.argv[1:]
+    extra = argv[argv.index("--") + 1:] if "--" in argv else []
+    argv = argv[:argv.index("--")] if "--" in argv else argv
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--players", type=int, default=60)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--think-time", type=float, default=0.5)
+    parser.add_argument("--tick-interval", type=float, default=5.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0)
+    parser.add_argument("--tts-latency-ms", type=float, default=20.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write all reports, keyed by worker count, here")
+    args = parser.parse_args(argv)
+
+    reports = {n: run_once(n, args, extra) for n in (int(w) for w in args.workers.split(","))}
+    print_table(reports)
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(json.dumps({str(n): r for n, r in reports.items()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Serialization time and bytes on the wire for /api/world/tick payloads.
+
+Builds a 20-NPC tick request and its response, both as plain dicts with the
+same shape as bench/loadtest.py's traffic. Each NPC has a full short-term
+memory and conversation history. The response is measured with the NPCs'
+TTS audio (base64 MP3 in `audio_url`) and without it. For every encoder that
+is installed (stdlib json, orjson, msgpack) it reports encode and decode time
+and the body size raw, gzip'd and zstd'd at the levels backend/wire.py uses.
+
+No backend import and no server, so it runs anywhere. The missing optional
+packages are skipped.
+
+Usage:
+    python bench/wirebench.py
+    python bench/wirebench.py --npcs 40 --audio-kb 24 --out bench/results/wire.json
+"""
+
+import argparse
+import base64
+import gzip
+import json
+import random
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend import wire  # noqa: E402  (stdlib-only module; no FastAPI needed)
+
+LINES = [
+    "Have you seen the blacksmith today?",
+    "The harvest was poor this year, the granary is half empty.",
+    "Guards doubled their patrols after the fire at the mill.",
+    "I would not trust that merchant with a copper coin.",
+    "Strange lights were seen over the old watchtower last night.",
+    "If you need work, the innkeeper is looking for help.",
+]
+EMOTIONS = ["NEUTRAL", "HAPPY", "ANGRY", "SUSPICIOUS", "AFRAID"]
+
+
+def _memory(rng: random.Random) -> dict:
+    return {
+        "short_term": [{"event": rng.choice(LINES), "time": 1_700_000_000 + i} for i in range(10)],
+        "long_term_summary": " ".join(rng.choice(LINES) for _ in range(4)),
+        "relationship_history": [{"delta": rng.randint(-2, 2), "reason": rng.choice(LINES)} for _ in range(5)],
+    }
+
+
+def tick_request(npcs: int, rng: random.Random) -> dict:
+    active = {
+        f"npc_{i}": {
+            "npc_identity": f"A villager called npc_{i}. " + " ".join(rng.choice(LINES) for _ in range(3)),
+            "voice_id": "aura-orion-en",
+            "type": rng.choice(["merchant", "guard", "farmer", "blacksmith"]),
+            "memory": _memory(rng),
+            "trust_score": rng.randint(0, 10),
+            "emotion": rng.choice(EMOTIONS),
+            "location": "village",
+            "conversation_history": [
+                {"role": "player" if t % 2 == 0 else "npc", "content": rng.choice(LINES)} for t in range(20)
+            ],
+        }
+        for i in range(npcs)
+    }
+    world_state = {
+        "location": "village", "weather": "rain", "time_of_day": "dusk", "tension_level": 4,
+        "player_karma": -3, "recent_player_actions": [rng.choice(LINES) for _ in range(5)],
+        "active_npcs": [{"id": npc_id, "type": npc["type"], "location": "village", "mood": npc["emotion"].lower()}
+                        for npc_id, npc in active.items()],
+    }
+    return {
+        "world_state": world_state,
+        "recent_events": [{"source": "player", "action": rng.choice(LINES), "time": 1_700_000_000} for _ in range(10)],
+        "active_npcs": active,
+        "session_id": "bench-0",
+    }
+
+
+def tick_response(npcs: int, audio_bytes: int, rng: random.Random) -> dict:
+    responses = []
+    for i in range(npcs):
+        audio = None
+        if audio_bytes:
+            # MP3 frames are already entropy-coded; random bytes compress about the same.
+            audio = "data:audio/mp3;base64," + base64.b64encode(rng.randbytes(audio_bytes)).decode("ascii")
+        responses.append({
+            "npc_id": f"npc_{i}", "event": "A storm rolls in over the village.",
+            "dialogue": " ".join(rng.choice(LINES) for _ in range(2)),
+            "emotion": rng.choice(EMOTIONS), "trust_score": rng.randint(0, 10),
+            "action_trigger": None, "audio_url": audio, "memory": _memory(rng), "error": None,
+        })
+    return {
+        "actions": [{"action": "change_weather", "condition": "storm"}, {"action": "update_tension", "level": 5}],
+        "narrator": "Thunder rolls across the hills as the villagers hurry indoors.",
+        "npc_directives": [{"action": "send_to_npc", "npc_id": f"npc_{i}", "event": "A storm rolls in."}
+                           for i in range(npcs)],
+        "npc_responses": responses,
+        "validation_status": "valid",
+        "plan_step": None,
+        "timings": None,
+    }
+
+
+def encoders() -> dict:
+    found = {"json": (lambda o: json.dumps(o).encode("utf-8"), json.loads)}
+    if wire.orjson is not None:
+        found["orjson"] = (wire.orjson.dumps, wire.orjson.loads)
+    if wire.msgpack is not None:
+        found["msgpack"] = (lambda o: wire.msgpack.packb(o, use_bin_type=True),
+                            lambda b: wire.msgpack.unpackb(b, raw=False))
+    return found
+
+
+def best_us(fn, repeat: int) -> float:
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+def measure(payload: dict, repeat: int) -> dict:
+    results = {}
+    for name, (encode, decode) in encoders().items():
+        body = encode(payload)
+        row = {
+            "encode_us": round(best_us(lambda: encode(payload), repeat), 1),
+            "decode_us": round(best_us(lambda: decode(body), repeat), 1),
+            "bytes": len(body),
+            "gzip_bytes": len(gzip.compress(body, compresslevel=wire.GZIP_LEVEL)),
+            "gzip_us": round(best_us(lambda: gzip.compress(body, compresslevel=wire.GZIP_LEVEL), repeat), 1),
+        }
+        if wire.zstandard is not None:
+            compressor = wire.zstandard.ZstdCompressor(level=wire.ZSTD_LEVEL)
+            row["zstd_bytes"] = len(compressor.compress(body))
+            row["zstd_us"] = round(best_us(lambda: compressor.compress(body), repeat), 1)
+        results[name] = row
+    return results
+
+
+def print_case(case: str, results: dict) -> None:
+    print(f"\n{case}")
+    print(f"  {'format':<9}{'encode us':>11}{'decode us':>11}{'bytes':>10}{'gzip':>10}{'gzip us':>10}{'zstd':>10}{'zstd us':>10}")
+    for name, row in results.items():
+        print(f"  {name:<9}{row['encode_us']:>11}{row['decode_us']:>11}{row['bytes']:>10}"
+              f"{row['gzip_bytes']:>10}{row['gzip_us']:>10}{row.get('zstd_bytes', '-'):>10}{row.get('zstd_us', '-'):>10}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--npcs", type=int, default=20)
+    parser.add_argument("--audio-kb", type=float, default=16.0, help="MP3 size per NPC line (about 2-3 s of speech)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the results as JSON here")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    cases = {
+        f"tick request ({args.npcs} NPCs)": tick_request(args.npcs, rng),
+        f"tick response ({args.npcs} NPCs, no audio)": tick_response(args.npcs, 0, rng),
+        f"tick response ({args.npcs} NPCs, {args.audio_kb:g} KB audio each)":
+            tick_response(args.npcs, int(args.audio_kb * 1024), rng),
+    }
+    missing = [name for name, mod in (("orjson", wire.orjson), ("msgpack", wire.msgpack),
+                                      ("zstandard", wire.zstandard)) if mod is None]
+    if missing:
+        print(f"Not installed, skipped: {', '.join(missing)}")
+
+    report = {}
+    for case, payload in cases.items():
+        report[case] = measure(payload, args.repeat)
+        print_case(case, report[case])
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,8 @@ interface BackendNPCResponse {
   trust_score: number;
   action_trigger: string;
   audio_url: string | null;
+  memory?: NPCMemory | null;  // memory after this turn (summaries, heard gossip); sent back next time
+  degraded?: boolean;   // true when the backend's latency budget ran out and a local fallback line was used
 }
 
 interface ConversationEntry {
@@ -30,6 +32,8 @@ interface NPCMemory {
   short_term: string[];
   long_term_summary: string;
   relationship_history: string[];
+  log?: string[];  // every interaction; the backend retrieves relevant entries from it
+  pending_summary?: string;  // key of a summary the backend is writing; applied on a later turn
 }
 
 // ── Service ───────────────────────────────────────────────────────────────────
@@ -129,16 +133,31 @@ export class AIService {
       this.trustScore = result.trust_score;
       this.emotion    = result.emotion;
 
-      // Grow short-term memory (capped at 20 entries)
-      this.memory.short_term.push(`Player: ${userMessage}`);
-      this.memory.short_term.push(`NPC: ${result.dialogue}`);
-      if (this.memory.short_term.length > 20) {
-        this.memory.short_term = this.memory.short_term.slice(-20);
+      if (result.memory) {
+        // The backend already folded this turn in, plus any finished summary and heard gossip
+        this.memory = result.memory;
+      } else {
+        // Prepared openers come without memory: grow short-term memory (capped at 20 entries)
+        this.memory.short_term.push(`Player: ${userMessage}`);
+        this.memory.short_term.push(`NPC: ${result.dialogue}`);
+        if (this.memory.short_term.length > 20) {
+          this.memory.short_term = this.memory.short_term.slice(-20);
+        }
+
+        // Append-only log the backend indexes for relevant memories. Trimmed like
+        // NPC_MEMORY_LOG_MAX: the oldest tenth at once, so the server's index stays reusable.
+        const log = [...(this.memory.log ?? []),
+          `Action: ${userMessage} | Emotion: ${result.emotion} | Trust: ${result.trust_score}/10`];
+        this.memory.log = log.length > 300 ? log.slice(log.length - 270) : log;
       }
 
       // Keep conversation history for follow-up context
       this.conversationHistory.push({ role: "player", content: userMessage });
       this.conversationHistory.push({ role: "npc",    content: result.dialogue });
+      // The backend only prompts with the last few lines, so don't resend the whole session
+      if (this.conversationHistory.length > 20) {
+        this.conversationHistory = this.conversationHistory.slice(-20);
+      }
 
       // Play TTS audio if the backend provided a URL
       if (result.audio_url) {
@@ -154,6 +173,41 @@ export class AIService {
     }
   }
 
+  /**
+   * Tell the backend the player is walking up to an NPC, so it can prepare the
+   * NPC's reply to a greeting before chat opens. Sends what the first
+   * sendMessage() after setActiveNPC() + restoreState() will send, which is
+   * how the backend matches the two. Fire-and-forget.
+   */
+  public prewarm(
+    npcId: string,
+    npcIdentity: string,
+    greeting: string,
+    voiceId?: string,
+    stored?: { trust_score: number; emotion: string; memory: NPCMemory },
+  ): void {
+    if (!this.isLoaded) return;
+    const baseUrl = this.config.backend_url.replace(/\/$/, "");
+
+    const payload = {
+      npc_id:               npcId,
+      npc_identity:         npcIdentity,
+      voice_id:             voiceId ?? this.config.default_npc?.voice_id ?? "",
+      memory:               stored ? stored.memory : this.memory,
+      trust_score:          stored ? stored.trust_score : this.trustScore,
+      emotion:              stored ? stored.emotion : this.emotion,
+      world_state:          worldService.getWorldState(),
+      conversation_history: [{ role: "npc", content: greeting }],
+      session_id:           worldService.getSessionId(),
+    };
+
+    fetch(`${baseUrl}/api/npc/prewarm`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify(payload),
+    }).catch((e) => console.debug("[AIService] Prewarm failed:", e));
+  }
+
   /** POST to /api/npc/react and return the parsed response. */
   private async callBackend(userMessage: string): Promise<BackendNPCResponse> {
     const baseUrl = this.config.backend_url.replace(/\/$/, "");
@@ -168,6 +222,7 @@ export class AIService {
       world_state:          worldService.getWorldState(),
       recent_events:        [{ source: "player", action: userMessage, time: Math.floor(Date.now() / 1000) }],
       conversation_history: this.conversationHistory,
+      session_id:           worldService.getSessionId(),  // scopes NPC gossip to this player
     };
 
     const response = await fetch(`${baseUrl}/api/npc/react`, {
@@ -356,6 +356,9 @@ export class Game {
   // Track which NPC the player is currently chatting with
   private _activeNpcId: string | null = null;
 
+  // NPC the backend was last asked to prewarm (nearest one in interact range)
+  private _prewarmedNpcId: string | null = null;
+
   // Accumulated time for periodic events
   private _posEventAccum = 0;
 
@@ -387,15 +390,7 @@ export class Game {
           document.exitPointerLock();
 
           // ── Resolve per-NPC identity and prime AIService ────────────────
-          const npcInfo = this.npcManager.getNPC(this._activeNpcId);
-          const rawNpcs = this.configManager.get("npcs");
-          const rawInst = rawNpcs?.instances?.find((i: any) => i.id === this._activeNpcId);
-          const npcIdentity =
-            rawInst?.npc_identity ??
-            this.aiService.getConfig().default_npc.npc_identity;
-          const npcName    = npcInfo?.name    ?? this._activeNpcId;
-          const greeting   = npcInfo?.greeting || this.aiService.getConfig().default_npc.greeting;
-          const voiceId    = rawInst?.voice_id;
+          const { npcInfo, rawInst, npcIdentity, npcName, greeting, voiceId } = this._npcProfile(this._activeNpcId);
           this.aiService.setActiveNPC(this._activeNpcId, npcName, npcIdentity, greeting, voiceId);
 
           // Restore persisted trust / emotion / memory from WorldService
@@ -412,6 +407,7 @@ export class Game {
           this.npcManager.startTalking(this._activeNpcId, 2500); // greeting → auto listen
           worldService.setActiveChatNpc(this._activeNpcId);
           this.chatUI.open();
+          this._prewarmedNpcId = null; // prepare the next conversation once this one closes
 
           // ── Quest system: track NPC conversation ────────────────────────
           const npcTemplate = npcInfo?.template ?? rawInst?.template ?? "villager";
@@ -453,9 +449,33 @@ export class Game {
       } else {
         promptEl?.classList.remove("visible");
       }
+
+      // Entering an NPC's interactDistance: let the backend prepare its opener
+      const nearest = nearby[0] ?? null;
+      if (nearest !== this._prewarmedNpcId) {
+        this._prewarmedNpcId = nearest;
+        if (nearest) {
+          const { npcIdentity, greeting, voiceId } = this._npcProfile(nearest);
+          this.aiService.prewarm(nearest, npcIdentity, greeting, voiceId, worldService.getNPCState(nearest));
+        }
+      }
     });
   }
 
+  /** Identity, name, greeting and voice of an NPC, as used to open a conversation. */
+  private _npcProfile(npcId: string) {
+    const npcInfo = this.npcManager.getNPC(npcId);
+    const rawNpcs = this.configManager.get("npcs");
+    const rawInst = rawNpcs?.instances?.find((i: any) => i.id === npcId);
+    const npcIdentity: string =
+      rawInst?.npc_identity ??
+      this.aiService.getConfig().default_npc.npc_identity;
+    const npcName: string  = npcInfo?.name ?? npcId;
+    const greeting: string = npcInfo?.greeting || this.aiService.getConfig().default_npc.greeting;
+    const voiceId: string | undefined = rawInst?.voice_id;
+    return { npcInfo, rawInst, npcIdentity, npcName, greeting, voiceId };
+  }
+
   private _showNarrator(text: string): void {
     const el = document.getElementById("narrator-bar");
     if (!el) return;
@@ -39,6 +39,8 @@ export interface TickNPCResult {
   trust_score?: number;
   action_trigger?: string;
   audio_url?: string | null;
+  /** Updated NPC memory after reacting (crowd reactions and full graph runs) */
+  memory?: NPCMemory | null;
   error?: string;
 }
 
@@ -61,6 +63,8 @@ const SPEECH_STAGGER_MS = 5_000;
 
 export class WorldService {
   private backendUrl = "";
+  /** Per-page-load key for server-side per-player state (tick plans, NPC gossip) */
+  private readonly sessionId = `web-${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`;
 
   private worldState: WorldState = {
     location:              "village",
@@ -167,6 +171,8 @@ export class WorldService {
 
   public getWorldState(): WorldState { return { ...this.worldState }; }
 
+  public getSessionId(): string { return this.sessionId; }
+
   // ── Callbacks ─────────────────────────────────────────────────────────────
 
   /** Fires for each NPC speech the orchestrator produces (staggered). */
@@ -210,6 +216,7 @@ export class WorldService {
           world_state:   this.worldState,
           recent_events: this.recentEvents,
           active_npcs:   this.activeNpcs,
+          session_id:    this.sessionId,
         }),
       });
 
@@ -255,6 +262,7 @@ export class WorldService {
           this.updateNPCState(npcResult.npc_id, {
             emotion:     npcResult.emotion    ?? this.activeNpcs[npcResult.npc_id]?.emotion,
             trust_score: npcResult.trust_score ?? this.activeNpcs[npcResult.npc_id]?.trust_score,
+            memory:      npcResult.memory      ?? this.activeNpcs[npcResult.npc_id]?.memory,
           });
 
           setTimeout(() => {